@@ -7,7 +7,6 @@ django_application = get_asgi_application()
 
 # Keyin Channels komponentlarini import qilish
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
 from channels.security.websocket import AllowedHostsOriginValidator
 
 
@@ -16,10 +15,13 @@ def get_websocket_application():
     import meals.routing
     import inventory.routing
     import reports.routing
+    import realtime.routing
+    from realtime.auth import JWTAuthMiddlewareStack
 
     return AllowedHostsOriginValidator(
-        AuthMiddlewareStack(
+        JWTAuthMiddlewareStack(
             URLRouter(
+                realtime.routing.websocket_urlpatterns +
                 meals.routing.websocket_urlpatterns +
                 inventory.routing.websocket_urlpatterns +
                 reports.routing.websocket_urlpatterns
@@ -0,0 +1,58 @@
+"""
+Parsing of date and timestamp inputs shared by the API views and commands.
+
+django.utils.dateparse returns None for malformed input but raises
+ValueError for well-formed impossible values such as 2026-02-30; both are
+treated as invalid here.
+"""
+from datetime import datetime, time
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def to_date(value):
+    """Return the date in `value` (YYYY-MM-DD), or None if it is not a valid date."""
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+def to_datetime(value):
+    """
+    Return the aware datetime in `value`, an ISO timestamp or a date (the
+    start of that day), or None if it is neither. Naive values are local time.
+    """
+    try:
+        moment = parse_datetime(value)
+    except ValueError:
+        return None
+    if moment is None:
+        day = to_date(value)
+        if day is None:
+            return None
+        moment = datetime.combine(day, time.min)
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def parse_date_param(request, name):
+    """The date in query parameter `name`, or None if absent. Raises ValidationError (400) if invalid."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    day = to_date(value)
+    if day is None:
+        raise ValidationError({"error": f"{name} must be a date (YYYY-MM-DD)"})
+    return day
+
+
+def parse_datetime_param(request, name):
+    """Like parse_date_param, for an ISO timestamp or date (see to_datetime)."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    moment = to_datetime(value)
+    if moment is None:
+        raise ValidationError({"error": f"{name} must be an ISO date or datetime"})
+    return moment
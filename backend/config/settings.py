@@ -50,6 +50,8 @@ INSTALLED_APPS = [
     'logfiles',
     'reports',
     'operations',
+    'sync',
+    'realtime',
 ]
 
 MIDDLEWARE = [
@@ -61,6 +63,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'realtime.middleware.BroadcastMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -178,6 +181,17 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Cache (dashboard snapshots, see reports.dashboard)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv(
+            'CACHE_URL',
+            default=f"redis://{os.getenv('REDIS_HOST', default='localhost')}:{os.getenv('REDIS_PORT', default='6379')}/2"
+        ),
+    },
+}
+
 # Celery settings
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', default='redis://localhost:6379/0')
@@ -192,6 +206,10 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'reports.tasks.generate_monthly_reports',
         'schedule': crontab(minute=0, hour=0, day_of_month=1),  # Run on the 1st of each month at midnight
     },
+    'take-stock-snapshots': {
+        'task': 'inventory.tasks.take_stock_snapshots',
+        'schedule': crontab(minute=5, hour=0),  # Daily, shortly after midnight
+    },
 }
 
 # Internationalization
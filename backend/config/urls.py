@@ -28,6 +28,8 @@ urlpatterns = [
     path('logs/', include('logfiles.urls')),
     path('reports/', include('reports.urls')),
     path('operations/', include('operations.urls')),
+    path('sync/', include('sync.urls')),
+    path('realtime/', include('realtime.urls')),
 ]
 
 if settings.DEBUG:
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Unit, Supplier, Product, DeliveryLog, ProductCategory
+from .models import Unit, Supplier, Product, DeliveryLog, ProductCategory, StockMovement, StockSnapshot
 
 @admin.register(Unit)
 class UnitAdmin(admin.ModelAdmin):
@@ -29,4 +29,17 @@ class DeliveryLogAdmin(admin.ModelAdmin):
     search_fields = ('product__name', 'supplier__name', 'notes')
     readonly_fields = ('received_at',)
 
-admin.site.register(ProductCategory)
\ No newline at end of file
+admin.site.register(ProductCategory)
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('id', 'product', 'kind', 'quantity', 'delivery', 'created_by', 'created_at')
+    list_filter = ('kind', 'created_at')
+    search_fields = ('product__name', 'notes')
+    readonly_fields = ('created_at',)
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('id', 'product', 'balance', 'taken_at')
+    list_filter = ('taken_at',)
+    search_fields = ('product__name',)
@@ -0,0 +1,49 @@
+"""
+Realtime deltas about products: the inventory socket and the dashboard get
+the current state of the products that changed, plus the ids of deleted
+ones. Messages are built after commit by realtime.broadcaster, once per
+transaction, for every product id published in it.
+"""
+from realtime.sequences import sequenced_message
+from .low_stock import low_stock_products, low_stock_rows
+from .models import Product
+
+
+def product_changes(product_ids):
+    """Return (rows, deleted_ids) for the given products, in one query."""
+    rows = list(
+        Product.objects.filter(id__in=product_ids).order_by('id').values(
+            'id', 'name', 'total_weight', 'threshold', 'is_active', 'unit__abbreviation'
+        )
+    )
+    for row in rows:
+        row['unit'] = row.pop('unit__abbreviation')
+        row['below_threshold'] = row['threshold'] is not None and row['total_weight'] < row['threshold']
+    deleted = sorted(set(product_ids) - {row['id'] for row in rows})
+    return rows, deleted
+
+
+def inventory_update_message(product_ids):
+    products, deleted = product_changes(product_ids)
+    low_stock = [
+        {"name": row['name'], "total_weight": row['total_weight'], "unit": row['unit_abbreviation']}
+        for row in low_stock_rows()
+    ]
+    return sequenced_message('inventory', 'inventory_update', {
+        "type": "inventory_update",
+        "products": products,
+        "deleted": deleted,
+        "low_stock": low_stock,
+    })
+
+
+def stock_delta_message(product_ids):
+    products, deleted = product_changes(product_ids)
+    return sequenced_message('dashboard', 'dashboard_update', {
+        "type": "dashboard_delta",
+        "kind": "stock",
+        "products": products,
+        "deleted": deleted,
+        "ingredient_count": Product.objects.count(),
+        "low_stock_count": low_stock_products().count(),
+    })
@@ -0,0 +1,118 @@
+"""
+Stock ledger: StockMovement rows are the source of truth for stock levels and
+Product.total_weight is a denormalized cache of their sum.
+
+Periodic StockSnapshot rows hold each product's balance at a point in time,
+so a balance (current or historical) is the latest snapshot plus the short
+tail of movements after it, never a replay of the full history.
+"""
+from datetime import datetime, time
+from django.db.models import Q, Sum
+from django.utils import timezone
+from .models import Product, StockMovement, StockSnapshot
+
+
+def _latest_snapshots(at, product_ids=None):
+    snapshots = StockSnapshot.objects.filter(taken_at__lte=at)
+    if product_ids is not None:
+        snapshots = snapshots.filter(product_id__in=product_ids)
+    # DISTINCT ON (product_id) keeps the newest snapshot of each product
+    return snapshots.order_by('product_id', '-taken_at').distinct('product_id')
+
+
+def tail_movements(at, since, product_ids):
+    """
+    Movements of `product_ids` up to `at` that come after each product's
+    snapshot (`since`: {product_id: taken_at}; products without one replay
+    their whole history). Products sharing a snapshot time share one
+    (product, created_at) index range, which starts at the snapshot.
+    """
+    by_time = {}
+    for product_id in product_ids:
+        by_time.setdefault(since.get(product_id), []).append(product_id)
+    if not by_time:
+        return StockMovement.objects.none()
+    window = Q()
+    for taken_at, ids in by_time.items():
+        window |= Q(product_id__in=ids, created_at__gt=taken_at) if taken_at else Q(product_id__in=ids)
+    return StockMovement.objects.filter(window, created_at__lte=at)
+
+
+def ledger_balances(at=None, product_ids=None):
+    """
+    Return {product_id: balance} as of `at` (default: now) from the ledger.
+    Products without any snapshot or movement are omitted.
+    """
+    at = at or timezone.now()
+    snapshots = list(_latest_snapshots(at, product_ids))
+    if product_ids is None:
+        product_ids = Product.objects.values_list('id', flat=True)
+    balances = {snapshot.product_id: snapshot.balance for snapshot in snapshots}
+    tail = (
+        tail_movements(at, {snapshot.product_id: snapshot.taken_at for snapshot in snapshots}, set(product_ids))
+        .values('product_id')
+        .annotate(total=Sum('quantity'))
+        .values_list('product_id', 'total')
+    )
+    for product_id, total in tail:
+        balances[product_id] = balances.get(product_id, 0) + total
+    return balances
+
+
+def stock_as_of(at, product_ids=None):
+    """
+    Return {product_id: stock on hand} at `at` for every product (or the given
+    ones). Products created after `at` or without any history count as 0.
+    """
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(id__in=product_ids)
+    product_ids = list(products.values_list('id', flat=True))
+    balances = ledger_balances(at, product_ids)
+    return {product_id: balances.get(product_id, 0) for product_id in product_ids}
+
+
+def movement_totals(start, end, kind=None, product_ids=None):
+    """Return {product_id: summed quantity} of movements in [start, end)."""
+    movements = StockMovement.objects.filter(created_at__gte=start, created_at__lt=end)
+    if kind is not None:
+        movements = movements.filter(kind=kind)
+    if product_ids is not None:
+        movements = movements.filter(product_id__in=product_ids)
+    return dict(
+        movements.values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total')
+    )
+
+
+def take_snapshots(at=None):
+    """
+    Store every product's ledger balance at `at` (default: the start of today)
+    and return how many snapshots were written. Existing snapshots for the
+    same moment are left untouched, so the task is safe to re-run.
+    """
+    if at is None:
+        at = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    balances = ledger_balances(at)
+    taken = set(StockSnapshot.objects.filter(taken_at=at).values_list('product_id', flat=True))
+    created = StockSnapshot.objects.bulk_create(
+        [
+            StockSnapshot(product_id=product_id, taken_at=at, balance=balance)
+            for product_id, balance in balances.items() if product_id not in taken
+        ],
+        # A concurrent run may still get there first
+        ignore_conflicts=True
+    )
+    return len(created)
+
+
+def find_discrepancies():
+    """
+    Compare every product's total_weight with its ledger balance.
+    Returns [(product, ledger_balance)] for the products that disagree.
+    """
+    balances = ledger_balances()
+    return [
+        (product, balances.get(product.id, 0))
+        for product in Product.objects.select_related('unit').order_by('id')
+        if product.total_weight != balances.get(product.id, 0)
+    ]
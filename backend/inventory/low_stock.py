@@ -0,0 +1,24 @@
+"""
+Low-stock detection shared by the alerts endpoint, the product warnings, the
+dashboard widget and the inventory websocket.
+
+The filter matches the partial index `product_low_stock_idx` exactly, so
+reads touch only the products that are actually low, and the unit
+abbreviation comes from the same query through a join.
+"""
+from django.db.models import F
+from .models import Product
+
+
+def low_stock_products():
+    """Active products whose stock is below their threshold, ordered by id."""
+    return Product.objects.filter(is_active=True, total_weight__lt=F('threshold')).order_by('id')
+
+
+def low_stock_rows():
+    """Return the low-stock products as plain dicts, in one query."""
+    return list(
+        low_stock_products().values(
+            'id', 'name', 'total_weight', 'threshold', 'delivery_date', unit_abbreviation=F('unit__abbreviation')
+        )
+    )
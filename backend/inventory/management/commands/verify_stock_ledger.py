@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, When, Value, F
+from django.utils import timezone
+from inventory.ledger import find_discrepancies
+from inventory.models import Product, StockMovement
+from inventory.signals import stock_changed
+
+
+class Command(BaseCommand):
+    help = "Check Product.total_weight against the stock ledger"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repair', action='store_true',
+            help="Reset total_weight of mismatching products to their ledger balance"
+        )
+        parser.add_argument(
+            '--open-missing', action='store_true',
+            help="Record an opening balance for products that have no ledger history yet"
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        if options['open_missing']:
+            products = Product.objects.filter(movements__isnull=True).exclude(total_weight=0)
+            opened = StockMovement.objects.bulk_create([
+                StockMovement(product=product, kind=StockMovement.ADJUSTMENT, quantity=product.total_weight,
+                              notes="Opening balance")
+                for product in products
+            ])
+            self.stdout.write(f"Recorded opening balances for {len(opened)} products")
+
+        discrepancies = find_discrepancies()
+        for product, balance in discrepancies:
+            self.stdout.write(self.style.WARNING(
+                f"{product.name}: total_weight={product.total_weight}, ledger={balance} {product.unit.abbreviation}"
+            ))
+
+        if options['repair'] and discrepancies:
+            repaired = {product.id: balance for product, balance in discrepancies}
+            Product.objects.filter(id__in=repaired.keys()).update(
+                total_weight=Case(
+                    *[When(id=product_id, then=Value(balance)) for product_id, balance in repaired.items()],
+                    default=F('total_weight'),
+                ),
+                # update() skips auto_now; delta sync relies on updated_at moving
+                updated_at=timezone.now()
+            )
+            # Cached availability, estimates, websocket deltas and the dashboard follow stock_changed
+            transaction.on_commit(lambda: stock_changed.send(sender=Product, product_ids=list(repaired)))
+
+        if not discrepancies:
+            self.stdout.write(self.style.SUCCESS("Stock levels match the ledger"))
+        elif options['repair']:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {len(discrepancies)} products"))
+        else:
+            self.stdout.write(self.style.ERROR(f"{len(discrepancies)} products disagree with the ledger"))
@@ -6,7 +6,7 @@ class Unit(models.Model):
     name = models.CharField(max_length=20, unique=True)  # gram, liter, piece
     abbreviation = models.CharField(max_length=10, unique=True)  # g, l, pc
     created_at = models.DateTimeField(default=timezone.now)
-    updated_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Delta sync cursor
 
     class Meta:
         db_table = 'Unit'
@@ -31,6 +31,7 @@ class Supplier(models.Model):
 class ProductCategory(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Delta sync cursor
 
     def __str__(self):
         return self.name
@@ -46,11 +47,18 @@ class Product(models.Model):
     is_active = models.BooleanField(default=True)
     created_by = models.ForeignKey(User, on_delete=models.RESTRICT, related_name='products_created')
     created_at = models.DateTimeField(default=timezone.now)
-    updated_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Delta sync cursor
 
     class Meta:
         db_table = 'Product'
         unique_together = ('name', 'unit')
+        indexes = [
+            # Partial index holding only low-stock products; Postgres keeps it current on every write
+            models.Index(
+                fields=['id'], name='product_low_stock_idx',
+                condition=models.Q(is_active=True, total_weight__lt=models.F('threshold'))
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.total_weight} {self.unit.abbreviation})"
@@ -68,4 +76,45 @@ class DeliveryLog(models.Model):
         db_table = 'DeliveryLog'
 
     def __str__(self):
-        return f"Delivery of {self.quantity_received} {self.product.unit.abbreviation} of {self.product.name} on {self.delivery_date}"
\ No newline at end of file
+        return f"Delivery of {self.quantity_received} {self.product.unit.abbreviation} of {self.product.name} on {self.delivery_date}"
+
+class StockMovement(models.Model):
+    # Append-only ledger of every change to Product.total_weight
+    DELIVERY = 'delivery'
+    CONSUMPTION = 'consumption'
+    ADJUSTMENT = 'adjustment'
+    KIND_CHOICES = [
+        (DELIVERY, "Delivery"),
+        (CONSUMPTION, "Consumption"),
+        (ADJUSTMENT, "Adjustment"),
+    ]
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='movements')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    quantity = models.IntegerField()  # Signed change to total_weight
+    delivery = models.ForeignKey(DeliveryLog, on_delete=models.SET_NULL, null=True, blank=True, related_name='movements')
+    notes = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements')
+
+    class Meta:
+        db_table = 'StockMovement'
+        indexes = [models.Index(fields=['product', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.kind} {self.quantity:+d} {self.product.name} at {self.created_at}"
+
+
+class StockSnapshot(models.Model):
+    # Ledger balance of a product at `taken_at`, so balances only replay the tail after it
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='snapshots')
+    taken_at = models.DateTimeField()
+    balance = models.IntegerField()
+
+    class Meta:
+        db_table = 'StockSnapshot'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'taken_at'], name='unique_stock_snapshot')
+        ]
+
+    def __str__(self):
+        return f"{self.product.name}: {self.balance} at {self.taken_at}"
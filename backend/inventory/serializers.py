@@ -25,15 +25,20 @@ class ProductSerializer(serializers.ModelSerializer):
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=ProductCategory.objects.all(), source='category', write_only=True, required=False
     )
+    below_threshold = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = [
             'id', 'name', 'total_weight', 'unit', 'category', 'category_id',
-            'threshold', 'is_active', 'created_by', 'created_at', 'updated_at'
+            'threshold', 'below_threshold', 'is_active', 'created_by', 'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at', 'created_by']
 
+    def get_below_threshold(self, obj):
+        # Read from the instance rather than ProductViewSet's annotation, which is stale after an update
+        return obj.threshold is not None and obj.total_weight < obj.threshold
+
 
 class DeliveryLogSerializer(serializers.ModelSerializer):
     supplier = SupplierSerializer(read_only=True)
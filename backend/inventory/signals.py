@@ -1,8 +1,18 @@
-from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from .models import Product
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver, Signal
+from realtime.broadcaster import publish
+from .models import Product, StockMovement
+
+# Sent by inventory.stock after a batch of stock levels changed through
+# queryset updates, which do not fire post_save. Provides `product_ids`.
+stock_changed = Signal()
+
+
+def notify_inventory(product_ids):
+    from inventory.deltas import inventory_update_message, stock_delta_message
+
+    publish("inventory", "inventory_update", product_ids, build=inventory_update_message)
+    publish("dashboard", "stock", product_ids, build=stock_delta_message)
 
 
 @receiver(post_save, sender=None)
@@ -10,16 +20,37 @@ def product_updated(sender, instance, **kwargs):
     from inventory.models import Product  # 👈 delayed import
 
     if isinstance(instance, Product):
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            "inventory",
-            {"type": "inventory_update"}
+        notify_inventory([instance.id])
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    notify_inventory([instance.id])
+
+@receiver(stock_changed)
+def stock_batch_changed(sender, product_ids, **kwargs):
+    notify_inventory(product_ids)
+
+
+@receiver(pre_save, sender=Product)
+def remember_stock_level(sender, instance, update_fields=None, **kwargs):
+    # Direct saves bypass inventory.stock, so diff against the stored value
+    instance._stock_before = None
+    if update_fields is not None and 'total_weight' not in update_fields:
+        instance._stock_before = instance.total_weight
+    elif instance.pk:
+        instance._stock_before = (
+            Product.objects.filter(pk=instance.pk).values_list('total_weight', flat=True).first()
         )
 
-@receiver([post_save, post_delete], sender=Product)
-def dashboard_product_change(sender, instance, **kwargs):
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        "dashboard",
-        {"type": "dashboard_update"}
-    )
\ No newline at end of file
+@receiver(post_save, sender=Product)
+def record_stock_adjustment(sender, instance, created, **kwargs):
+    before = getattr(instance, '_stock_before', None) or 0
+    change = instance.total_weight - before
+    if change:
+        StockMovement.objects.create(
+            product=instance,
+            kind=StockMovement.ADJUSTMENT,
+            quantity=change,
+            notes="Opening balance" if created else "Manual adjustment",
+            created_by=instance.created_by if created else None
+        )
@@ -0,0 +1,121 @@
+"""
+Stock service: every delivery and deduction of Product.total_weight goes through here.
+
+Products are locked with SELECT ... FOR UPDATE in primary-key order, so two
+concurrent servings that share products always queue up in the same order and
+cannot deadlock or lose each other's updates. The whole batch is then written
+with a single UPDATE using F() expressions instead of one save() per product,
+and mirrored as StockMovement rows in the append-only ledger (see
+inventory.ledger), of which total_weight is a denormalized cache.
+"""
+import math
+from django.db import transaction
+from django.db.models import Case, When, F, Value
+from django.utils import timezone
+from .models import Product, StockMovement
+from .signals import stock_changed
+
+
+class InsufficientStock(Exception):
+    """Raised when a deduction would take a product below zero."""
+
+    def __init__(self, shortages):
+        # shortages: list of dicts with product_id, product, unit, required, available
+        self.shortages = shortages
+        super().__init__("; ".join(
+            f"Insufficient {s['product']}. Required: {s['required']} {s['unit']}, "
+            f"Available: {s['available']} {s['unit']}"
+            for s in shortages
+        ))
+
+
+def required_amount(quantity, portions):
+    """Stock is kept in whole units, so a recipe amount is rounded up."""
+    return math.ceil(round(quantity * portions, 6))
+
+
+def lock_products(product_ids):
+    """
+    Lock the given products for the rest of the current transaction and
+    return {product_id: product}. Must be called inside transaction.atomic().
+    """
+    products = (
+        Product.objects.select_for_update(of=('self',))
+        .select_related('unit')
+        .filter(id__in=set(product_ids))
+        .order_by('id')
+    )
+    return {product.id: product for product in products}
+
+
+def find_shortages(products, requirements):
+    return [
+        {
+            'product_id': product_id,
+            'product': products[product_id].name,
+            'unit': products[product_id].unit.abbreviation,
+            'required': amount,
+            'available': products[product_id].total_weight,
+        }
+        for product_id, amount in sorted(requirements.items())
+        if products[product_id].total_weight < amount
+    ]
+
+
+def apply_stock_changes(deltas, kind, user=None, **movement_fields):
+    """
+    Add `deltas` ({product_id: signed amount}) to total_weight in one UPDATE,
+    append the matching StockMovement rows to the ledger and announce the
+    change through the stock_changed signal. Extra keyword arguments (such as
+    `delivery` or `notes`) are stored on every movement.
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    Product.objects.filter(id__in=deltas.keys()).update(
+        total_weight=Case(
+            *[When(id=product_id, then=F('total_weight') + Value(delta)) for product_id, delta in deltas.items()],
+            default=F('total_weight'),
+        ),
+        # update() skips auto_now; delta sync relies on updated_at moving
+        updated_at=timezone.now()
+    )
+    StockMovement.objects.bulk_create([
+        StockMovement(product_id=product_id, kind=kind, quantity=delta, created_by=user, **movement_fields)
+        for product_id, delta in deltas.items()
+    ])
+    stock_changed.send(sender=Product, product_ids=list(deltas))
+
+
+@transaction.atomic
+def deduct_stock(requirements, user=None):
+    """
+    Atomically deduct `requirements` ({product_id: amount}) from stock.
+
+    Raises InsufficientStock, leaving stock untouched, if any product does not
+    have enough. Returns the locked products as they were before deduction.
+    """
+    products = lock_products(requirements.keys())
+    missing = set(requirements) - products.keys()
+    if missing:
+        raise Product.DoesNotExist(f"Unknown product ids: {sorted(missing)}")
+    shortages = find_shortages(products, requirements)
+    if shortages:
+        raise InsufficientStock(shortages)
+    apply_stock_changes(
+        {product_id: -amount for product_id, amount in requirements.items()},
+        StockMovement.CONSUMPTION,
+        user
+    )
+    return products
+
+
+@transaction.atomic
+def receive_delivery(delivery_log):
+    """Add a delivery to stock and record it in the ledger."""
+    apply_stock_changes(
+        {delivery_log.product_id: delivery_log.quantity_received},
+        StockMovement.DELIVERY,
+        delivery_log.received_by,
+        delivery=delivery_log
+    )
@@ -0,0 +1,6 @@
+from celery import shared_task
+from inventory.ledger import take_snapshots
+
+@shared_task
+def take_stock_snapshots():
+    return take_snapshots()
@@ -1,12 +1,18 @@
-from django.db import models
+from django.db import models, transaction
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
 from django.utils import timezone
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from .models import Unit, Supplier, Product, DeliveryLog, ProductCategory
 from .serializers import UnitSerializer, SupplierSerializer, ProductSerializer, DeliveryLogSerializer, ProductCategorySerializer
+from config.params import parse_datetime_param
 from users.permissions import IsAdminOrManager, IsAdminOrManagerOrCook
+from .stock import receive_delivery
+from .ledger import stock_as_of
+from .low_stock import low_stock_rows
+from realtime.sequences import current_sequence
 
 
 class UnitViewSet(viewsets.ModelViewSet):
@@ -39,10 +45,37 @@ class ProductCategoryViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsAdminOrManagerOrCook]
 
 
+class ProductPagination(PageNumberPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
 class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated, IsAdminOrManagerOrCook]
+    pagination_class = ProductPagination
+
+    def get_queryset(self):
+        queryset = Product.objects.select_related('unit', 'category').annotate(
+            below_threshold=models.ExpressionWrapper(
+                models.Q(threshold__isnull=False, total_weight__lt=models.F('threshold')),
+                output_field=models.BooleanField()
+            )
+        ).order_by('id')
+        below_threshold = self.request.query_params.get('below_threshold')
+        if below_threshold is not None:
+            queryset = queryset.filter(below_threshold=below_threshold.lower() in ('1', 'true', 'yes'))
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = queryset.filter(name__icontains=search)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        # Read before the page (see realtime.sequences); inventory deltas above it are newer than the list
+        sequence = current_sequence('inventory')
+        response = super().list(request, *args, **kwargs)
+        response.data['sequence'] = sequence
+        return response
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -50,36 +83,66 @@ class ProductViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(updated_at=timezone.now())
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        data = serializer.data
-        warnings = []
-        for product in data:
-            if product['threshold'] and product['total_weight'] < product['threshold']:
-                warnings.append(f"Warning: {product['name']} is below threshold ({product['total_weight']}/{product['threshold']})")
-        return Response({'products': data, 'warnings': warnings})
+    @action(detail=False, methods=['get'], url_path='lookup')
+    def lookup(self, request):
+        # Every product for pickers, unpaginated: only what a dropdown shows, in one query
+        products = Product.objects.order_by('name', 'id').values(
+            'id', 'name', unit_abbreviation=models.F('unit__abbreviation')
+        )
+        return Response(list(products), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='warnings')
+    def warnings(self, request):
+        warnings = [
+            f"Warning: {row['name']} is below threshold ({row['total_weight']}/{row['threshold']})"
+            for row in low_stock_rows()
+        ]
+        return Response({'count': len(warnings), 'warnings': warnings}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'], url_path='low-stock-alerts')
     def low_stock_alerts(self, request):
-        low_stock_products = Product.objects.filter(
-            total_weight__lt=models.F('threshold'),
-            threshold__isnull=False,
-            is_active=True
-        )
         alerts = [
             {
-                "id": product.id,
-                "product": product.name,
-                "total_weight": product.total_weight,
-                "threshold": product.threshold,
-                "unit": product.unit.abbreviation,
-                "delivery_date": product.delivery_date
+                "id": row['id'],
+                "product": row['name'],
+                "total_weight": row['total_weight'],
+                "threshold": row['threshold'],
+                "unit": row['unit_abbreviation'],
+                "delivery_date": row['delivery_date']
             }
-            for product in low_stock_products
+            for row in low_stock_rows()
         ]
         return Response({"low_stock_alerts": alerts}, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['get'], url_path='stock-as-of')
+    def stock_as_of(self, request):
+        # ?at=2026-10-01 (start of that day) or a full ISO timestamp; ?product=1,2 to narrow down
+        at = parse_datetime_param(request, 'at')
+        if at is None:
+            return Response({"error": "at must be an ISO date or datetime"}, status=status.HTTP_400_BAD_REQUEST)
+
+        products = Product.objects.select_related('unit').order_by('id')
+        if request.query_params.get('product'):
+            try:
+                product_ids = [int(pk) for pk in request.query_params['product'].split(',')]
+            except ValueError:
+                return Response({"error": "'product' must be a comma-separated list of ids"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            products = products.filter(id__in=product_ids)
+        balances = stock_as_of(at, [product.id for product in products])
+        return Response({
+            "at": at,
+            "products": [
+                {
+                    "id": product.id,
+                    "name": product.name,
+                    "stock": balances[product.id],
+                    "unit": product.unit.abbreviation,
+                }
+                for product in products
+            ]
+        }, status=status.HTTP_200_OK)
+
 
 class DeliveryLogViewSet(viewsets.ModelViewSet):
     queryset = DeliveryLog.objects.all()
@@ -87,7 +150,6 @@ class DeliveryLogViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsAdminOrManager]
 
     def perform_create(self, serializer):
-        delivery_log = serializer.save(received_by=self.request.user)
-        product = delivery_log.product
-        product.total_weight += delivery_log.quantity_received
-        product.save(update_fields=['total_weight'])
\ No newline at end of file
+        with transaction.atomic():
+            delivery_log = serializer.save(received_by=self.request.user)
+            receive_delivery(delivery_log)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import MealCategory, Meal, MealIngredient
+from .models import MealCategory, Meal, MealIngredient, MealAvailability
 
 # @admin.register(MealCategory)
 # class MealCategoryAdmin(admin.ModelAdmin):
@@ -20,4 +20,10 @@ class MealIngredientAdmin(admin.ModelAdmin):
     list_display = ('id', 'meal', 'product', 'quantity', 'created_by', 'created_at', 'updated_at')
     list_filter = ('meal', 'product', 'created_by')
     search_fields = ('meal__name', 'product__name')
-    readonly_fields = ('created_at', 'updated_at')
\ No newline at end of file
+    readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(MealAvailability)
+class MealAvailabilityAdmin(admin.ModelAdmin):
+    list_display = ('meal', 'max_portions', 'bottleneck', 'updated_at')
+    search_fields = ('meal__name',)
+    readonly_fields = ('updated_at',)
@@ -1,86 +1,99 @@
 import json
+from collections import Counter
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from .models import Meal, MealIngredient
-from inventory.models import Product
+from realtime.topics import meal_group
+from .portions import cached_availability
 
-class MealConsumer(AsyncWebsocketConsumer):
-    async def connect(self):
-        # Tokenni olish
-        query_string = self.scope['query_string'].decode()
-        token = dict(q.split("=") for q in query_string.split("&")).get("token", None)
+# Upper bound on meals watched per socket, which bounds its channel-layer group memberships
+MAX_WATCHED_MEALS = 100
 
-        if token:
-            try:
-                # Tokenni autentifikatsiya qilish
-                user = await self.get_user_from_token(token)
-                if user is not None:
-                    self.user = user
-                    await self.channel_layer.group_add("meals", self.channel_name)
-                    await self.accept()
-                    print(f"WebSocket connected for user: {user.username}")
-                else:
-                    print("Invalid token, closing WebSocket")
-                    await self.close()
-            except Exception as e:
-                print(f"WebSocket connection error: {e}")
-                await self.close()
-        else:
-            print("No token provided, closing WebSocket")
-            await self.close()
+# Estimates of the meals watched by sockets of this process. Every watcher gets the
+# meal.<id> updates, so an entry stays current until its last watcher leaves.
+_estimates = {}
+_watchers = Counter()
 
-    @database_sync_to_async
-    def get_user_from_token(self, token):
-        try:
-            jwt_auth = JWTAuthentication()
-            validated_token = jwt_auth.get_validated_token(token)
-            user = jwt_auth.get_user(validated_token)
-            return user
-        except Exception as e:
-            print(f"Token validation error: {e}")
-            return None
+
+def _estimate(meal_id, data):
+    if data is None or data.get('deleted'):
+        return {'meal_id': meal_id, 'max_portions': 0}
+    return {'meal_id': meal_id, 'max_portions': data['max_portions'], 'bottleneck': data['bottleneck']}
+
+
+class MealConsumer(AsyncWebsocketConsumer):
+    """
+    Clients send {"meal_id": id} to get that meal's estimate back (only on
+    their own socket) and to watch it: its updates then arrive as
+    "meal_update" messages. {"action": "unwatch", "meal_id": id} stops them.
+    """
+
+    async def connect(self):
+        # Authenticated once by realtime.auth.JWTAuthMiddleware (?token=<jwt>)
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        self.watched = set()
+        await self.accept()
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard("meals", self.channel_name)
-        print(f"WebSocket disconnected: {close_code}")
+        for meal_id in list(getattr(self, 'watched', ())):
+            await self.unwatch(meal_id)
 
     async def receive(self, text_data):
-        data = json.loads(text_data)
-        meal_id = data.get('meal_id')
-        if meal_id:
-            portion_data = await self.estimate_portions(meal_id)
-            await self.channel_layer.group_send(
-                "meals",
-                {
-                    'type': 'meal_update',
-                    'data': portion_data
-                }
-            )
-
-    async def meal_update(self, event):
+        try:
+            data = json.loads(text_data)
+            meal_id = int(data['meal_id'])
+        except (ValueError, TypeError, KeyError):
+            await self.send(text_data=json.dumps({'type': 'error', 'error': 'meal_id is required'}))
+            return
+        if data.get('action') == 'unwatch':
+            await self.unwatch(meal_id)
+            return
+        if meal_id not in self.watched:
+            if len(self.watched) >= MAX_WATCHED_MEALS:
+                await self.send(text_data=json.dumps({'type': 'error', 'error': 'Too many meals watched'}))
+                return
+            await self.watch(meal_id)
         await self.send(text_data=json.dumps({
-            'type': 'meal_update',
-            'data': event['data']
+            'type': 'meal_estimate',
+            'data': await self.estimate_portions(meal_id)
         }))
 
-    @database_sync_to_async
-    def estimate_portions(self, meal_id):
-        try:
-            meal = Meal.objects.get(pk=meal_id)
-            ingredients = MealIngredient.objects.filter(meal=meal)
+    async def watch(self, meal_id):
+        self.watched.add(meal_id)
+        _watchers[meal_id] += 1
+        # Joined before the estimate is read, so no update can slip in between
+        await self.channel_layer.group_add(meal_group(meal_id), self.channel_name)
+
+    async def unwatch(self, meal_id):
+        if meal_id not in self.watched:
+            return
+        self.watched.discard(meal_id)
+        _watchers[meal_id] -= 1
+        if _watchers[meal_id] <= 0:
+            del _watchers[meal_id]
+            _estimates.pop(meal_id, None)
+        await self.channel_layer.group_discard(meal_group(meal_id), self.channel_name)
 
-            if not ingredients.exists():
-                return {'meal_id': meal_id, 'max_portions': 0}
+    async def estimate_portions(self, meal_id):
+        if meal_id not in _estimates:
+            estimate = await database_sync_to_async(self.read_estimate)(meal_id)
+            # An update that arrived meanwhile is at least as new
+            if meal_id in _watchers:
+                return _estimates.setdefault(meal_id, estimate)
+            return estimate
+        return _estimates[meal_id]
 
-            portion_estimates = []
-            for ingredient in ingredients:
-                if ingredient.quantity <= 0:
-                    return {'meal_id': meal_id, 'max_portions': 0}
-                possible_portions = int(ingredient.product.total_weight // ingredient.quantity)
-                portion_estimates.append(possible_portions)
+    def read_estimate(self, meal_id):
+        return _estimate(meal_id, cached_availability([meal_id]).get(meal_id))
+
+    async def meal_update(self, event):
+        # Absolute state of one watched meal, built once by meals.notifications
+        data = event.get('data')
+        if data is not None and data['meal_id'] in _watchers:
+            _estimates[data['meal_id']] = _estimate(data['meal_id'], data)
+        await self.send(text_data=event['text'])
 
-            max_portions = min(portion_estimates) if portion_estimates else 0
-            return {'meal_id': meal_id, 'max_portions': max_portions}
-        except Meal.DoesNotExist:
-            return {'meal_id': meal_id, 'max_portions': 0}
\ No newline at end of file
+    async def ingredient_warning(self, event):
+        await self.send(text_data=event['text'])
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from meals.models import Meal
+from meals.portions import refresh_availability
+
+
+class Command(BaseCommand):
+    help = "Recompute the cached max portions and bottleneck ingredient of every meal"
+
+    def handle(self, *args, **options):
+        meal_ids = list(Meal.objects.values_list('id', flat=True))
+        refresh_availability(meal_ids)
+        self.stdout.write(self.style.SUCCESS(f"Refreshed availability for {len(meal_ids)} meals"))
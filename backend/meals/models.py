@@ -24,7 +24,7 @@ class Meal(models.Model):
     is_active = models.BooleanField(default=True)
     created_by = models.ForeignKey(User, on_delete=models.RESTRICT, related_name='meals_created')
     created_at = models.DateTimeField(default=timezone.now)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         db_table = 'Meal'
@@ -41,7 +41,7 @@ class MealIngredient(models.Model):
     quantity = models.FloatField()  # Quantity per portion
     created_by = models.ForeignKey(User, on_delete=models.RESTRICT, related_name='meal_ingredients_created')
     created_at = models.DateTimeField(default=timezone.now)
-    updated_at = models.DateTimeField(auto_now=True)  # Avtomatik yangilanish
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Avtomatik yangilanish
 
     class Meta:
         db_table = 'MealIngredient'
@@ -66,4 +66,17 @@ class MealServing(models.Model):
         db_table = 'meals_mealserving'
 
     def __str__(self):
-        return f"{self.meal.name} served on {self.served_at}"
\ No newline at end of file
+        return f"{self.meal.name} served on {self.served_at}"
+
+class MealAvailability(models.Model):
+    # Cached result of meals.portions for one meal, kept in sync by meals.signals
+    meal = models.OneToOneField(Meal, on_delete=models.CASCADE, primary_key=True, related_name='availability')
+    max_portions = models.IntegerField(default=0)
+    bottleneck = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'MealAvailability'
+
+    def __str__(self):
+        return f"{self.meal.name}: {self.max_portions} portions"
@@ -0,0 +1,86 @@
+"""
+Realtime deltas about meals: the meals socket gets the changed meals'
+availability, each meal.<id> group gets the absolute state of its meal and the
+dashboard gets the rows of its available-portions widget. All are built after commit by realtime.broadcaster, once per
+transaction, for every meal id published in it.
+"""
+from realtime.broadcaster import publish, send
+from realtime.sequences import sequenced_message, topic_message
+from realtime.topics import meal_group, meal_topic
+from .models import Meal
+from .portions import cached_availability
+
+
+def meal_update_message(meal_ids):
+    availability = cached_availability(meal_ids)
+    return sequenced_message('meals', 'meal_update', {
+        'type': 'meal_update',
+        'data': {
+            'meal_ids': sorted(meal_ids),
+            'meals': [
+                {
+                    'meal_id': meal_id,
+                    'max_portions': availability[meal_id]['max_portions'],
+                    'bottleneck': availability[meal_id]['bottleneck'],
+                }
+                for meal_id in sorted(availability)
+            ],
+            'deleted': sorted(set(meal_ids) - availability.keys()),
+        }
+    })
+
+
+def availability_delta_message(meal_ids):
+    meals = list(Meal.objects.filter(id__in=meal_ids).order_by('id').values('id', 'name', 'is_active'))
+    availability = cached_availability([meal['id'] for meal in meals])
+    return sequenced_message('dashboard', 'dashboard_update', {
+        'type': 'dashboard_delta',
+        'kind': 'availability',
+        'meals': [
+            {
+                'meal_id': meal['id'],
+                'meal': meal['name'],
+                'is_active': meal['is_active'],
+                'portions': availability[meal['id']]['max_portions'],
+                'bottleneck': availability[meal['id']]['bottleneck'],
+            }
+            for meal in meals
+        ],
+        'deleted': sorted(set(meal_ids) - {meal['id'] for meal in meals}),
+        'active_meals': Meal.objects.filter(is_active=True).count(),
+    })
+
+
+def per_meal_messages(meal_ids):
+    # One message per meal.<id> group, for sockets watching single meals; all from one query
+    availability = cached_availability(meal_ids)
+    messages = []
+    for meal_id in sorted(meal_ids):
+        data = {'meal_id': meal_id, 'deleted': meal_id not in availability}
+        if meal_id in availability:
+            data.update(max_portions=availability[meal_id]['max_portions'],
+                        bottleneck=availability[meal_id]['bottleneck'])
+        message = topic_message(meal_topic(meal_id), 'meal_update', {'type': 'meal_update', 'data': data})
+        # Also unserialized, so MealConsumer can keep its memoized estimate current without parsing
+        message['data'] = data
+        messages.append((meal_group(meal_id), message))
+    return messages
+
+
+def warn_shortage(meal_id, message):
+    """
+    Tell the kitchen that serving a meal failed for lack of stock. The
+    serving's transaction is rolled back, so this is sent straight away.
+    """
+    payload = {'type': 'ingredient_warning', 'data': {'meal_id': meal_id, 'message': message}}
+    send('meals', topic_message('meals', 'ingredient_warning', payload))
+    send(meal_group(meal_id), topic_message(meal_topic(meal_id), 'ingredient_warning', payload))
+
+
+def notify_meals(meal_ids):
+    """Announce that these meals (or their availability) changed."""
+    if not meal_ids:
+        return
+    publish('meals', 'meal_update', meal_ids, build=meal_update_message)
+    publish('meals', 'per_meal_update', meal_ids, build=per_meal_messages)
+    publish('dashboard', 'availability', meal_ids, build=availability_delta_message)
@@ -0,0 +1,165 @@
+"""
+Menu optimizer: decide how many portions of each active meal to cook so the
+total number of portions is as large as current stock allows.
+
+This is an integer program (a multi-dimensional knapsack), so instead of an
+external solver we use a greedy heuristic: repeatedly cook the meal that uses
+the smallest share of the stock still left, re-pricing only the meals that
+share a product with the one just cooked. Per-category minimums are filled
+first. The answer comes with an LP-duality upper bound so callers can see how
+far from optimal it can be at most.
+"""
+import heapq
+import time
+from .models import MealIngredient
+
+DEFAULT_TIME_LIMIT = 1.0
+MAX_TIME_LIMIT = 10.0
+
+
+def load_problem():
+    """
+    Load active meals and stock in one query.
+
+    Returns (meals, stock, names) where meals is
+    {meal_id: {'category_id': id, 'ingredients': {product_id: quantity}}},
+    stock is {product_id: total_weight} and names is {meal_id: name}.
+    """
+    rows = MealIngredient.objects.filter(meal__is_active=True, quantity__gt=0).values_list(
+        'meal_id', 'meal__name', 'meal__category_id', 'product_id', 'quantity', 'product__total_weight'
+    )
+    meals, stock, names = {}, {}, {}
+    for meal_id, meal_name, category_id, product_id, quantity, total_weight in rows:
+        meal = meals.setdefault(meal_id, {'category_id': category_id, 'ingredients': {}})
+        meal['ingredients'][product_id] = quantity
+        stock[product_id] = total_weight
+        names[meal_id] = meal_name
+    return meals, stock, names
+
+
+def upper_bound(meals, stock):
+    """
+    Upper bound on total portions from LP duality.
+
+    For any non-negative product prices w where every meal costs at least c,
+    no plan can exceed sum(w * stock) / c portions. We try a few price vectors
+    and keep the tightest bound.
+    """
+    if not meals:
+        return 0
+    used = {product_id for meal in meals.values() for product_id in meal['ingredients']}
+    price_vectors = [
+        {product_id: 1.0 for product_id in used},
+        {product_id: 1.0 / stock[product_id] for product_id in used},
+    ]
+    best = sum(
+        min(int(stock[p] // q) for p, q in meal['ingredients'].items()) for meal in meals.values()
+    )
+    for prices in price_vectors:
+        cheapest = min(
+            sum(prices[p] * q for p, q in meal['ingredients'].items()) for meal in meals.values()
+        )
+        if cheapest > 0:
+            best = min(best, int(sum(prices[p] * stock[p] for p in used) / cheapest))
+    return best
+
+
+class _Greedy:
+    def __init__(self, meals, stock, deadline):
+        self.remaining = {product_id: max(amount, 0) for product_id, amount in stock.items()}
+        self.deadline = deadline
+        self.timed_out = False
+        # Meals that cannot be cooked even once are dropped up front
+        self.meals = {
+            meal_id: meal for meal_id, meal in meals.items() if self.addable(meal) > 0
+        }
+        self.plan = {}
+        self.users = {}
+        for meal_id, meal in self.meals.items():
+            for product_id in meal['ingredients']:
+                self.users.setdefault(product_id, []).append(meal_id)
+        self.version = dict.fromkeys(self.meals, 0)
+
+    def addable(self, meal):
+        return max(0, min(int(self.remaining[p] // q) for p, q in meal['ingredients'].items()))
+
+    def cost(self, meal):
+        # Share of the remaining stock one portion would use up
+        return sum(q / self.remaining[p] for p, q in meal['ingredients'].items())
+
+    def out_of_time(self):
+        if time.monotonic() > self.deadline:
+            self.timed_out = True
+        return self.timed_out
+
+    def cook(self, meal_id, portions):
+        meal = self.meals[meal_id]
+        for product_id, quantity in meal['ingredients'].items():
+            self.remaining[product_id] -= quantity * portions
+        self.plan[meal_id] = self.plan.get(meal_id, 0) + portions
+        touched = {m for product_id in meal['ingredients'] for m in self.users[product_id]}
+        for m in touched:
+            self.version[m] += 1
+        return touched
+
+    def run(self, candidates, limit=None):
+        """Cook from `candidates` until nothing fits, or `limit` portions are cooked."""
+        heap = []
+
+        def push(meal_id):
+            if self.addable(self.meals[meal_id]) > 0:
+                heapq.heappush(heap, (self.cost(self.meals[meal_id]), meal_id, self.version[meal_id]))
+
+        for meal_id in candidates:
+            push(meal_id)
+        cooked = 0
+        while heap and (limit is None or cooked < limit) and not self.out_of_time():
+            _cost, meal_id, version = heapq.heappop(heap)
+            if version != self.version[meal_id]:
+                continue
+            available = self.addable(self.meals[meal_id])
+            if available <= 0:
+                continue
+            # Cook half of what fits so prices are refreshed as stock shrinks
+            portions = max(1, (available + 1) // 2)
+            if limit is not None:
+                portions = min(portions, limit - cooked)
+            cooked += portions
+            for touched in self.cook(meal_id, portions):
+                if touched in candidates:
+                    push(touched)
+        return cooked
+
+
+def solve(meals, stock, category_minimums=None, time_limit=DEFAULT_TIME_LIMIT):
+    """
+    Maximize total portions of `meals` (see load_problem) without exceeding `stock`.
+
+    `category_minimums` maps category_id -> portions that must be cooked from
+    that category; these are filled before total portions are maximized.
+    Returns a dict with the plan, its total, the upper bound, any unmet
+    minimums and whether the time limit cut the search short.
+    """
+    started = time.monotonic()
+    greedy = _Greedy(meals, stock, started + time_limit)
+
+    unmet_minimums = {}
+    for category_id, minimum in sorted((category_minimums or {}).items()):
+        candidates = {
+            meal_id for meal_id, meal in greedy.meals.items() if meal['category_id'] == category_id
+        }
+        already = sum(greedy.plan.get(meal_id, 0) for meal_id in candidates)
+        cooked = greedy.run(candidates, limit=max(minimum - already, 0)) if minimum > already else 0
+        if already + cooked < minimum:
+            unmet_minimums[category_id] = minimum - already - cooked
+
+    greedy.run(set(greedy.meals))
+
+    return {
+        'portions': {meal_id: portions for meal_id, portions in greedy.plan.items() if portions > 0},
+        'total_portions': sum(greedy.plan.values()),
+        'upper_bound': upper_bound(greedy.meals, stock),
+        'unmet_minimums': unmet_minimums,
+        'timed_out': greedy.timed_out,
+        'elapsed': time.monotonic() - started,
+    }
@@ -0,0 +1,208 @@
+"""
+Portion availability: how many portions of each meal the current stock allows.
+
+Every caller (the estimate-portions endpoint, the meals websocket, the dashboard
+and report generation) goes through this module so the recipe/stock join is
+fetched in a single query no matter how many meals are asked for.
+
+Results are cached per meal in `MealAvailability`. MealIngredient doubles as
+the reverse index from a product to the meals that use it, so a stock change
+only recomputes the meals that depend on the changed products.
+"""
+from inventory.stock import required_amount
+from .models import Meal, MealIngredient, MealAvailability
+
+
+def ingredient_rows(meal_ids=None):
+    """
+    Return (meal_id, product_id, quantity, total_weight) tuples for every
+    ingredient with a positive quantity. `meal_ids` may be any iterable or
+    queryset of ids; None means all meals.
+    """
+    rows = MealIngredient.objects.filter(quantity__gt=0)
+    if meal_ids is not None:
+        rows = rows.filter(meal_id__in=meal_ids)
+    return rows.values_list('meal_id', 'product_id', 'quantity', 'product__total_weight')
+
+
+def estimate_with_bottleneck(meal_ids=None, stock=None):
+    """
+    Return {meal_id: (max_portions, bottleneck_product_id)} in one query.
+    The bottleneck is the product that allows the fewest portions.
+
+    `stock` ({product_id: amount}) replaces the current total_weight, e.g. to
+    estimate from a historical balance; products missing from it count as 0.
+    """
+    estimates = {}
+    for meal_id, product_id, quantity, total_weight in ingredient_rows(meal_ids):
+        if stock is not None:
+            total_weight = stock.get(product_id, 0)
+        possible_portions = int(total_weight // quantity)
+        current = estimates.get(meal_id)
+        if current is None or possible_portions < current[0]:
+            estimates[meal_id] = (possible_portions, product_id)
+    return estimates
+
+
+def estimate_portions(meal_ids=None, stock=None):
+    """
+    Return {meal_id: max_portions} for the given meals in one query.
+
+    Meals without ingredients are left out of the result so callers can tell
+    "no recipe" apart from "out of stock"; use `.get(meal_id, 0)` when that
+    distinction does not matter. See estimate_with_bottleneck for `stock`.
+    """
+    return {
+        meal_id: max_portions
+        for meal_id, (max_portions, _bottleneck) in estimate_with_bottleneck(meal_ids, stock).items()
+    }
+
+
+def refresh_availability(meal_ids):
+    """
+    Recompute and store the cached availability of the given meals.
+    Meals without ingredients are stored with zero portions and no bottleneck;
+    ids of meals that no longer exist are ignored. Returns the refreshed ids.
+    """
+    meal_ids = set(Meal.objects.filter(id__in=set(meal_ids)).values_list('id', flat=True))
+    if not meal_ids:
+        return meal_ids
+    estimates = estimate_with_bottleneck(meal_ids)
+    MealAvailability.objects.bulk_create(
+        [
+            MealAvailability(
+                meal_id=meal_id,
+                max_portions=estimates.get(meal_id, (0, None))[0],
+                bottleneck_id=estimates.get(meal_id, (0, None))[1],
+            )
+            for meal_id in meal_ids
+        ],
+        update_conflicts=True,
+        unique_fields=['meal'],
+        update_fields=['max_portions', 'bottleneck', 'updated_at'],
+    )
+    return meal_ids
+
+
+def refresh_for_products(product_ids):
+    """
+    Recompute the cached availability of every meal that uses one of
+    `product_ids` and return the ids of those meals.
+    """
+    meal_ids = MealIngredient.objects.filter(product_id__in=product_ids).values_list('meal_id', flat=True)
+    return refresh_availability(meal_ids)
+
+
+def _read_availability(meal_ids):
+    rows = MealAvailability.objects.filter(meal_id__in=meal_ids).values(
+        'meal_id', 'max_portions', 'bottleneck_id', 'bottleneck__name'
+    )
+    return {
+        row['meal_id']: {
+            'max_portions': row['max_portions'],
+            'bottleneck_id': row['bottleneck_id'],
+            'bottleneck': row['bottleneck__name'],
+        }
+        for row in rows
+    }
+
+
+def cached_availability(meal_ids):
+    """
+    Return {meal_id: {'max_portions', 'bottleneck_id', 'bottleneck'}} from the
+    cache. Meals that have never been cached are computed and stored first;
+    unknown meal ids are left out.
+    """
+    meal_ids = set(meal_ids)
+    availability = _read_availability(meal_ids)
+    missing = meal_ids - availability.keys()
+    if missing:
+        refresh_availability(missing)
+        availability.update(_read_availability(missing))
+    return availability
+
+
+def product_demand(portions_by_meal):
+    """
+    Aggregate the stock a plan needs, in one query.
+
+    `portions_by_meal` maps meal_id -> [portions of each plan line]. Every line
+    is rounded up to whole stock units like serving it would be
+    (required_amount), so a feasible plan is one serve-batch accepts. Returns
+    {product_id: {'product', 'unit', 'required', 'available'}} summed over every
+    meal that uses the product.
+    """
+    rows = MealIngredient.objects.filter(meal_id__in=portions_by_meal.keys(), quantity__gt=0).values_list(
+        'meal_id', 'product_id', 'quantity', 'product__name', 'product__unit__abbreviation',
+        'product__total_weight'
+    )
+    demand = {}
+    for meal_id, product_id, quantity, name, unit, total_weight in rows:
+        entry = demand.setdefault(product_id, {
+            'product': name, 'unit': unit, 'required': 0, 'available': total_weight
+        })
+        entry['required'] += sum(required_amount(quantity, portions) for portions in portions_by_meal[meal_id])
+    return demand
+
+
+def check_feasibility(lines):
+    """
+    Jointly check a day's plan, given as (meal_id, portions) pairs, against stock.
+
+    Meals compete for the same products, so demand is summed per product before
+    it is compared with `total_weight`. Raises Meal.DoesNotExist listing unknown
+    meal ids.
+    """
+    portions_by_meal = {}
+    for meal_id, portions in lines:
+        portions_by_meal.setdefault(meal_id, []).append(portions)
+
+    known = set(Meal.objects.filter(id__in=portions_by_meal.keys()).values_list('id', flat=True))
+    unknown = sorted(portions_by_meal.keys() - known)
+    if unknown:
+        raise Meal.DoesNotExist(f"Unknown meal ids: {unknown}")
+
+    products = []
+    for product_id, entry in sorted(product_demand(portions_by_meal).items()):
+        required = entry['required']
+        products.append({
+            'product_id': product_id,
+            'product': entry['product'],
+            'unit': entry['unit'],
+            'required': required,
+            'available': entry['available'],
+            'shortfall': max(required - entry['available'], 0),
+        })
+    shortfalls = [product for product in products if product['shortfall'] > 0]
+    return {'feasible': not shortfalls, 'products': products, 'shortfalls': shortfalls}
+
+
+def recipe_quantities(meal_ids):
+    """Return {meal_id: [(product_id, quantity per portion)]} in one query."""
+    recipes = {}
+    rows = MealIngredient.objects.filter(meal_id__in=meal_ids, quantity__gt=0).values_list(
+        'meal_id', 'product_id', 'quantity'
+    )
+    for meal_id, product_id, quantity in rows:
+        recipes.setdefault(meal_id, []).append((product_id, quantity))
+    return recipes
+
+
+def recipe_amounts(portions_by_meal):
+    """
+    Return [(meal_id, product_id, amount)] for serving `portions_by_meal`
+    ({meal_id: portions}), with amounts rounded up to whole stock units.
+    """
+    return [
+        (meal_id, product_id, required_amount(quantity, portions_by_meal[meal_id]))
+        for meal_id, recipe in recipe_quantities(portions_by_meal.keys()).items()
+        for product_id, quantity in recipe
+    ]
+
+
+def stock_requirements(amounts):
+    """Sum recipe_amounts() rows into {product_id: amount}."""
+    totals = {}
+    for _meal_id, product_id, amount in amounts:
+        totals[product_id] = totals.get(product_id, 0) + amount
+    return totals
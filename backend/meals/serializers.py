@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import MealCategory, Meal, MealIngredient, MealServing
+from .optimizer import DEFAULT_TIME_LIMIT, MAX_TIME_LIMIT
 from inventory.models import ProductCategory, Product
 from inventory.serializers import ProductSerializer, ProductCategorySerializer
 from users.serializers import UserSerializer
@@ -65,4 +66,22 @@ class MealServingSerializer(serializers.ModelSerializer):
     def validate_portions_served(self, value):
         if value <= 0:
             raise ValidationError("Portions served must be greater than zero.")
-        return value
\ No newline at end of file
+        return value
+
+class PlanLineSerializer(serializers.Serializer):
+    meal_id = serializers.IntegerField()
+    portions = serializers.IntegerField(min_value=1)
+
+
+class FeasibilityCheckSerializer(serializers.Serializer):
+    lines = PlanLineSerializer(many=True, allow_empty=False)
+
+
+class CategoryMinimumSerializer(serializers.Serializer):
+    category_id = serializers.IntegerField()
+    portions = serializers.IntegerField(min_value=1)
+
+
+class MenuOptimizationSerializer(serializers.Serializer):
+    category_minimums = CategoryMinimumSerializer(many=True, required=False, default=list)
+    time_limit = serializers.FloatField(min_value=0.01, max_value=MAX_TIME_LIMIT, default=DEFAULT_TIME_LIMIT)
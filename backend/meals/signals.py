@@ -1,33 +1,40 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from .models import Meal, MealIngredient, MealServing  # Added MealServing
+from inventory.models import Product
+from inventory.signals import stock_changed
+from .models import Meal, MealIngredient
+from .portions import refresh_availability, refresh_for_products
+from .notifications import notify_meals
 
 
-@receiver(post_save, sender=Meal)
+@receiver([post_save, post_delete], sender=Meal)
 def meal_updated(sender, instance, **kwargs):
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        "meals",
-        {"type": "meal_update", "data": {"meal_id": instance.id}}
-    )
+    notify_meals([instance.id])
 
-@receiver(post_save, sender=MealIngredient)
-@receiver(post_delete, sender=MealIngredient)
-def meal_ingredient_changed(sender, instance, **kwargs):
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        "meals",
-        {"type": "meal_update", "data": {"meal_id": instance.meal.id}}
-    )
+@receiver(post_save, sender=Product)
+def product_stock_changed(sender, instance, **kwargs):
+    # Only meals whose recipe uses this product can change availability
+    notify_meals(refresh_for_products([instance.id]))
+
+@receiver(stock_changed)
+def product_stock_batch_changed(sender, product_ids, **kwargs):
+    notify_meals(refresh_for_products(product_ids))
+
+@receiver(pre_save, sender=MealIngredient)
+def remember_recipe_meal(sender, instance, raw=False, **kwargs):
+    # An ingredient moved to another meal changes the recipe of both
+    instance._meal_before = None
+    if not raw and instance.pk and not instance._state.adding:
+        instance._meal_before = sender.objects.filter(pk=instance.pk).values_list('meal_id', flat=True).first()
 
-@receiver([post_save, post_delete], sender=Meal)
 @receiver([post_save, post_delete], sender=MealIngredient)
-@receiver([post_save, post_delete], sender=MealServing)
-def dashboard_related_change(sender, instance, **kwargs):
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        "dashboard",
-        {"type": "dashboard_update"}
-    )
\ No newline at end of file
+def meal_recipe_changed(sender, instance, origin=None, **kwargs):
+    # Skip ingredients removed by a cascading meal delete; the cache row goes with the meal
+    if isinstance(origin, Meal) or getattr(origin, 'model', None) is Meal:
+        return
+    meal_ids = [instance.meal_id]
+    before = getattr(instance, '_meal_before', None)
+    if before is not None and before != instance.meal_id:
+        meal_ids.append(before)
+    refresh_availability(meal_ids)
+    notify_meals(meal_ids)
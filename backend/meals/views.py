@@ -1,13 +1,18 @@
 from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import transaction
 from django.utils import timezone
-from inventory.models import Product
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from inventory.stock import deduct_stock, InsufficientStock
 from rest_framework.permissions import IsAuthenticated
 from .models import MealCategory, Meal, MealIngredient, MealServing
-from .serializers import MealCategorySerializer, MealSerializer, MealIngredientSerializer, MealServingSerializer
+from .serializers import (
+    MealCategorySerializer, MealSerializer, MealIngredientSerializer, MealServingSerializer,
+    FeasibilityCheckSerializer, MenuOptimizationSerializer
+)
+from .portions import cached_availability, check_feasibility, recipe_amounts, stock_requirements
+from .optimizer import load_problem, solve
+from .notifications import notify_meals, warn_shortage
 from users.permissions import IsAdminOrManager, IsCook, IsAdminOnly, IsAdminOrManagerOrCook
 
 class MealCategoryViewSet(viewsets.ModelViewSet):
@@ -34,43 +39,60 @@ class MealViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'], url_path='estimate-portions')
     def estimate_portions(self, request, pk=None):
-        try:
-            meal = self.get_object()
-            ingredients = MealIngredient.objects.filter(meal=meal)
-
-            if not ingredients.exists():
-                return Response(
-                    {"message": "No ingredients defined for this meal"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            portion_estimates = []
-            for ingredient in ingredients:
-                if ingredient.quantity <= 0:
-                    return Response(
-                        {"message": f"Invalid quantity for ingredient {ingredient.product.name}"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                possible_portions = int(ingredient.product.total_weight // ingredient.quantity)
-                portion_estimates.append(possible_portions)
+        meal = self.get_object()
+        availability = cached_availability([meal.id])[meal.id]
 
-            max_portions = min(portion_estimates) if portion_estimates else 0
-
-            return Response(
-                {"meal": meal.name, "max_portions": max_portions},
-                status=status.HTTP_200_OK
-            )
-        except Meal.DoesNotExist:
+        # Every meal with ingredients has a bottleneck product
+        if availability['bottleneck_id'] is None:
             return Response(
-                {"error": "Meal not found"},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        except ZeroDivisionError:
-            return Response(
-                {"error": "Division by zero error in portion estimation"},
+                {"message": "No ingredients defined for this meal"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        return Response(
+            {
+                "meal": meal.name,
+                "max_portions": availability['max_portions'],
+                "bottleneck": availability['bottleneck'],
+            },
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['post'], url_path='feasibility')
+    def feasibility(self, request):
+        serializer = FeasibilityCheckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lines = [(line['meal_id'], line['portions']) for line in serializer.validated_data['lines']]
+        try:
+            result = check_feasibility(lines)
+        except Meal.DoesNotExist as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='optimize-menu')
+    def optimize_menu(self, request):
+        serializer = MenuOptimizationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        minimums = {}
+        for entry in serializer.validated_data['category_minimums']:
+            minimums[entry['category_id']] = minimums.get(entry['category_id'], 0) + entry['portions']
+
+        meals, stock, names = load_problem()
+        result = solve(meals, stock, minimums, serializer.validated_data['time_limit'])
+        return Response({
+            "total_portions": result['total_portions'],
+            "upper_bound": result['upper_bound'],
+            "timed_out": result['timed_out'],
+            "plan": [
+                {"meal_id": meal_id, "meal": names[meal_id], "portions": portions}
+                for meal_id, portions in sorted(result['portions'].items())
+            ],
+            "unmet_minimums": [
+                {"category_id": category_id, "missing_portions": missing}
+                for category_id, missing in result['unmet_minimums'].items()
+            ],
+        }, status=status.HTTP_200_OK)
+
 class MealIngredientViewSet(viewsets.ModelViewSet):
     queryset = MealIngredient.objects.all()
     serializer_class = MealIngredientSerializer
@@ -90,43 +112,22 @@ class MealServingViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         meal = serializer.validated_data['meal']
         portions = serializer.validated_data['portions_served']
-        ingredients = MealIngredient.objects.filter(meal=meal)
-        channel_layer = get_channel_layer()
-
-        # Ingredient yetishmovchiligini tekshirish va WebSocket orqali ogohlantirish
-        for ingredient in ingredients:
-            required_quantity = ingredient.quantity * portions
-            if ingredient.product.total_weight < required_quantity:
-                async_to_sync(channel_layer.group_send)(
-                    'meals',
-                    {
-                        'type': 'ingredient_warning',
-                        'data': {
-                            'message': f"Insufficient {ingredient.product.name}: {ingredient.product.total_weight} available, {required_quantity} needed."
-                        }
-                    }
-                )
-                raise serializers.ValidationError(
-                    f"Insufficient {ingredient.product.name}: {ingredient.product.total_weight} available, {required_quantity} needed."
+        requirements = stock_requirements(recipe_amounts({meal.id: portions}))
+
+        with transaction.atomic():
+            try:
+                deduct_stock(requirements, self.request.user)
+            except InsufficientStock as e:
+                # Ingredient yetishmovchiligini WebSocket orqali ogohlantirish
+                shortage = e.shortages[0]
+                message = (
+                    f"Insufficient {shortage['product']}: {shortage['available']} available, "
+                    f"{shortage['required']} needed."
                 )
+                warn_shortage(meal.id, message)
+                raise serializers.ValidationError(message)
 
-        # Ingredientlarni inventardan ayirish
-        for ingredient in ingredients:
-            required_quantity = ingredient.quantity * portions
-            ingredient.product.total_weight -= required_quantity
-            ingredient.product.save()
-
-        # Saqlash va WebSocket orqali yangilash
-        serializer.save(served_by=self.request.user)
-        self.notify_portion_update(meal.id)
-        # self.generate_monthly_report(meal, portions)  # <-- COMMENTED OUT, now safe!
-
-    def notify_portion_update(self, meal_id):
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            'meals',
-            {
-                'type': 'meal_update',
-                'data': {'meal_id': meal_id}
-            }
-        )
\ No newline at end of file
+            # Saqlash va WebSocket orqali yangilash
+            serializer.save(served_by=self.request.user)
+            notify_meals([meal.id])
+        # self.generate_monthly_report(meal, portions)  # <-- COMMENTED OUT, now safe!
\ No newline at end of file
@@ -11,9 +11,15 @@ class MealServing(models.Model):
     notes = models.TextField(null=True, blank=True)
     served_at = models.DateTimeField(default=timezone.now)
     created_by = models.ForeignKey(User, on_delete=models.RESTRICT, related_name='meal_servings_created')
+    # Client-generated key so offline tablets can safely replay the same serving
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
 
     class Meta:
         db_table = 'MealServing'
+        indexes = [
+            # Time-range scans per meal (reports.rollups rebuilds, recent activity)
+            models.Index(fields=['served_at', 'meal'], name='serving_time_meal_idx'),
+        ]
 
     def __str__(self):
         return f"{self.meal.name} served by {self.user.username} at {self.served_at}"
@@ -27,6 +33,11 @@ class IngredientUsage(models.Model):
 
     class Meta:
         db_table = 'IngredientUsage'
+        indexes = [
+            # Usage per meal over time (reports.analytics), and rollup rebuilds per product
+            models.Index(fields=['used_at', 'meal_serving'], name='usage_time_serving_idx'),
+            models.Index(fields=['used_at', 'product'], name='usage_time_product_idx'),
+        ]
 
     def __str__(self):
         return f"Used {self.quantity_used} {self.product.unit.abbreviation} of {self.product.name} for {self.meal_serving}"
\ No newline at end of file
@@ -0,0 +1,36 @@
+"""
+Realtime deltas about servings: the dashboard's recent-activity widget gets
+the new or changed servings instead of re-fetching the whole dashboard.
+"""
+from django.utils import timezone
+from realtime.broadcaster import publish
+from realtime.sequences import sequenced_message
+from .models import MealServing
+
+
+def activity_delta_message(serving_ids):
+    servings = list(
+        MealServing.objects.filter(id__in=serving_ids).order_by('-served_at').values(
+            'id', 'portion_count', 'served_at', 'meal__name', 'user__username'
+        )
+    )
+    return sequenced_message('dashboard', 'dashboard_update', {
+        'type': 'dashboard_delta',
+        'kind': 'activity',
+        'servings': [
+            {
+                'id': serving['id'],
+                'meal': serving['meal__name'] or "Unknown",
+                'portion_count': serving['portion_count'],
+                'served_by': serving['user__username'] or "Unknown",
+                'served_at': serving['served_at'],
+            }
+            for serving in servings
+        ],
+        'deleted': sorted(set(serving_ids) - {serving['id'] for serving in servings}),
+        'meals_served_today': MealServing.objects.filter(served_at__date=timezone.localdate()).count(),
+    })
+
+
+def notify_activity(serving_ids):
+    publish('dashboard', 'activity', serving_ids, build=activity_delta_message)
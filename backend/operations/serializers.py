@@ -4,7 +4,7 @@ from .models import MealServing, IngredientUsage
 class MealServingSerializer(serializers.ModelSerializer):
     class Meta:
         model = MealServing
-        fields = ['id', 'meal', 'user', 'portion_count', 'notes', 'served_at', 'created_by']
+        fields = ['id', 'meal', 'user', 'portion_count', 'notes', 'served_at', 'created_by', 'idempotency_key']
         read_only_fields = ['served_at']
 
 
@@ -12,4 +12,22 @@ class IngredientUsageSerializer(serializers.ModelSerializer):
     class Meta:
         model = IngredientUsage
         fields = ['id', 'meal_serving', 'product', 'quantity_used', 'used_at', 'recorded_by']
-        read_only_fields = ['used_at']
\ No newline at end of file
+        read_only_fields = ['used_at']
+
+class BatchServingEntrySerializer(serializers.Serializer):
+    meal = serializers.IntegerField()
+    portion_count = serializers.IntegerField(min_value=1)
+    served_at = serializers.DateTimeField(required=False)
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class BatchServingSerializer(serializers.Serializer):
+    servings = BatchServingEntrySerializer(many=True, allow_empty=False)
+
+
+class OfflineServingEventSerializer(BatchServingEntrySerializer):
+    idempotency_key = serializers.CharField(max_length=64)
+
+
+class OfflineSyncSerializer(serializers.Serializer):
+    events = OfflineServingEventSerializer(many=True, allow_empty=False, max_length=1000)
@@ -0,0 +1,162 @@
+"""
+Serving ledger: deduct stock and write MealServing/IngredientUsage rows.
+
+Serving rows are created first and their ingredient usages are bulk-inserted
+already linked to them, so recording servings costs the same number of
+queries whatever the size of the recipes or of the batch. Stock for the whole
+batch is checked and deducted once, per product, through inventory.stock.
+
+Offline tablets replay queued servings through replay_servings(), which uses
+each event's idempotency key to skip servings that were already recorded.
+"""
+from django.db import transaction
+from django.utils import timezone
+from inventory.stock import deduct_stock, lock_products, apply_stock_changes, required_amount
+from inventory.models import StockMovement
+from meals.models import Meal
+from meals.notifications import notify_meals
+from meals.portions import recipe_quantities
+from reports.rollups import add_servings
+from .models import MealServing, IngredientUsage
+from .notifications import notify_activity
+
+
+def plan_usages(entries, recipes):
+    """Return, per entry, the [(product_id, amount)] its recipe takes from stock."""
+    return [
+        [
+            (product_id, required_amount(quantity, entry['portion_count']))
+            for product_id, quantity in recipes.get(entry['meal_id'], [])
+        ]
+        for entry in entries
+    ]
+
+
+def write_servings(entries, usages_per_entry, user):
+    """
+    Bulk-insert MealServing rows for `entries` and their IngredientUsage rows.
+    Stock must already have been deducted by the caller.
+    """
+    now = timezone.now()
+    meal_servings = MealServing.objects.bulk_create([
+        MealServing(
+            meal_id=entry['meal_id'],
+            user=user,
+            portion_count=entry['portion_count'],
+            notes=entry.get('notes'),
+            served_at=entry.get('served_at') or now,
+            created_by=user,
+            idempotency_key=entry.get('idempotency_key')
+        )
+        for entry in entries
+    ])
+    usages = IngredientUsage.objects.bulk_create([
+        IngredientUsage(
+            meal_serving=meal_serving,
+            product_id=product_id,
+            quantity_used=quantity_used,
+            used_at=meal_serving.served_at,
+            recorded_by=user
+        )
+        for meal_serving, usages in zip(meal_servings, usages_per_entry)
+        for product_id, quantity_used in usages
+    ])
+
+    # bulk_create fires no signals: count the rows in the daily rollups here, and the
+    # broadcaster sends these once the transaction commits
+    add_servings(meal_servings, usages)
+    notify_meals({entry['meal_id'] for entry in entries})
+    notify_activity([meal_serving.id for meal_serving in meal_servings])
+    return meal_servings
+
+
+@transaction.atomic
+def record_servings(entries, user):
+    """
+    Serve a batch of meals in one transaction and return the MealServing rows.
+
+    Each entry is a dict with `meal_id` and `portion_count`, and optionally
+    `served_at`, `notes` and `idempotency_key`. Raises
+    inventory.stock.InsufficientStock, writing nothing, if the batch as a whole
+    needs more of any product than is in stock.
+    """
+    recipes = recipe_quantities({entry['meal_id'] for entry in entries})
+    usages_per_entry = plan_usages(entries, recipes)
+    requirements = {}
+    for usages in usages_per_entry:
+        for product_id, amount in usages:
+            requirements[product_id] = requirements.get(product_id, 0) + amount
+    deduct_stock(requirements, user)
+    return write_servings(entries, usages_per_entry, user)
+
+
+@transaction.atomic
+def replay_servings(events, user):
+    """
+    Apply a queue of offline serving events in order, skipping replays.
+
+    Each event is a record_servings entry with an `idempotency_key`. Events
+    whose key was already recorded are reported as duplicates; events that no
+    longer fit the remaining stock, or name an unknown meal, are rejected while
+    the rest of the batch still goes through. Returns one status dict per event.
+    """
+    meal_ids = {event['meal_id'] for event in events}
+    known_meals = set(Meal.objects.filter(id__in=meal_ids).values_list('id', flat=True))
+    recipes = recipe_quantities(known_meals)
+    usages_per_event = plan_usages(events, recipes)
+
+    # Lock before the duplicate lookup so a concurrent replay of the same
+    # events waits here and then sees them as already applied.
+    products = lock_products({product_id for recipe in recipes.values() for product_id, _ in recipe})
+    applied = dict(
+        MealServing.objects.filter(idempotency_key__in={event['idempotency_key'] for event in events})
+        .values_list('idempotency_key', 'id')
+    )
+
+    remaining = {product_id: product.total_weight for product_id, product in products.items()}
+    statuses, accepted, accepted_usages = [], [], []
+    for event, usages in zip(events, usages_per_event):
+        key = event['idempotency_key']
+        status = {'idempotency_key': key}
+        statuses.append(status)
+        if key in applied:
+            status.update(status='duplicate', serving_id=applied[key])
+            continue
+        if event['meal_id'] not in known_meals:
+            status.update(status='rejected', error="Meal not found")
+            continue
+        short = [product_id for product_id, amount in usages if remaining[product_id] < amount]
+        if short:
+            product = products[short[0]]
+            status.update(status='rejected', error=f"Insufficient {product.name}")
+            continue
+        for product_id, amount in usages:
+            remaining[product_id] -= amount
+        # A key repeated later in the same batch is a duplicate of this event
+        applied[key] = None
+        status['status'] = 'applied'
+        accepted.append(event)
+        accepted_usages.append(usages)
+
+    if accepted:
+        apply_stock_changes(
+            {product_id: remaining[product_id] - product.total_weight for product_id, product in products.items()},
+            StockMovement.CONSUMPTION,
+            user
+        )
+        meal_servings = write_servings(accepted, accepted_usages, user)
+        by_key = {meal_serving.idempotency_key: meal_serving.id for meal_serving in meal_servings}
+        for status in statuses:
+            if status['status'] == 'applied':
+                status['serving_id'] = by_key[status['idempotency_key']]
+            elif status['status'] == 'duplicate' and status['serving_id'] is None:
+                status['serving_id'] = by_key[status['idempotency_key']]
+    return statuses
+
+
+def record_serving(meal, portion_count, user, served_at=None, notes=None):
+    """Serve `portion_count` portions of a single `meal`; see record_servings."""
+    return record_servings(
+        [{'meal_id': meal.id, 'portion_count': portion_count, 'served_at': served_at, 'notes': notes}],
+        user
+    )[0]
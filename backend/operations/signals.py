@@ -0,0 +1,9 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import MealServing
+from .notifications import notify_activity
+
+
+@receiver([post_save, post_delete], sender=MealServing)
+def serving_changed(sender, instance, **kwargs):
+    notify_activity([instance.id])
@@ -1,14 +1,17 @@
+from django.db import IntegrityError
 from django.db.models import Sum
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db import transaction
 from .models import MealServing, IngredientUsage
-from .serializers import MealServingSerializer, IngredientUsageSerializer
+from .serializers import MealServingSerializer, IngredientUsageSerializer, BatchServingSerializer, OfflineSyncSerializer
+from config.params import parse_date_param
 from users.permissions import IsCookOrAdmin, IsAdminOrManager
-from meals.models import Meal, MealIngredient
-from inventory.models import Product
+from meals.models import Meal
+from reports.models import DailyProductRollup
+from inventory.stock import InsufficientStock
+from .serving import record_serving, record_servings, replay_servings
 
 class MealServingViewSet(viewsets.ModelViewSet):
     queryset = MealServing.objects.all()
@@ -29,49 +32,10 @@ class MealServingViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Ingredientlarni tekshirish va inventardan ayirish
-            with transaction.atomic():
-                ingredients = MealIngredient.objects.filter(meal=meal)
-                for ingredient in ingredients:
-                    required_quantity = ingredient.quantity * portion_count
-                    product = ingredient.product
-                    if product.total_weight < required_quantity:
-                        return Response(
-                            {
-                                "error": f"Insufficient {product.name}. Required: {required_quantity} {product.unit.abbreviation}, Available: {product.total_weight} {product.unit.abbreviation}"
-                            },
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
-
-                # Inventardan ayirish
-                for ingredient in ingredients:
-                    required_quantity = ingredient.quantity * portion_count
-                    product = ingredient.product
-                    product.total_weight -= required_quantity
-                    product.save()
-
-                    # IngredientUsage log
-                    IngredientUsage.objects.create(
-                        meal_serving=None,  # Hozircha meal_serving yaratilmadi
-                        product=product,
-                        quantity_used=required_quantity,
-                        recorded_by=request.user
-                    )
-
-                # MealServing log
-                meal_serving = MealServing.objects.create(
-                    meal=meal,
-                    user=request.user,
-                    portion_count=portion_count,
-                    created_by=request.user
-                )
-
-                # IngredientUsage ga meal_serving ni yangilash
-                IngredientUsage.objects.filter(
-                    meal_serving__isnull=True,
-                    recorded_by=request.user,
-                    used_at__gte=meal_serving.served_at
-                ).update(meal_serving=meal_serving)
+            try:
+                record_serving(meal, portion_count, request.user, notes=request.data.get('notes'))
+            except InsufficientStock as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
             return Response(
                 {"message": f"Successfully served {portion_count} portion(s) of {meal.name}"},
@@ -89,6 +53,65 @@ class MealServingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['post'], url_path='serve-batch')
+    def serve_batch(self, request):
+        serializer = BatchServingSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        entries = [
+            {
+                'meal_id': entry['meal'],
+                'portion_count': entry['portion_count'],
+                'served_at': entry.get('served_at'),
+                'notes': entry.get('notes'),
+            }
+            for entry in serializer.validated_data['servings']
+        ]
+        meal_ids = {entry['meal_id'] for entry in entries}
+        unknown = sorted(meal_ids - set(Meal.objects.filter(id__in=meal_ids).values_list('id', flat=True)))
+        if unknown:
+            return Response({"error": f"Meal not found: {unknown}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            meal_servings = record_servings(entries, request.user)
+        except InsufficientStock as e:
+            return Response(
+                {"error": str(e), "shortages": e.shortages},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            {
+                "message": f"Successfully recorded {len(meal_servings)} serving(s)",
+                "servings": [meal_serving.id for meal_serving in meal_servings],
+                "portions": sum(meal_serving.portion_count for meal_serving in meal_servings),
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+
+    @action(detail=False, methods=['post'], url_path='offline-sync')
+    def offline_sync(self, request):
+        serializer = OfflineSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        events = [
+            {
+                'idempotency_key': event['idempotency_key'],
+                'meal_id': event['meal'],
+                'portion_count': event['portion_count'],
+                'served_at': event.get('served_at'),
+                'notes': event.get('notes'),
+            }
+            for event in serializer.validated_data['events']
+        ]
+        try:
+            statuses = replay_servings(events, request.user)
+        except IntegrityError:
+            # A concurrent upload committed one of these keys first; a retry will report it as duplicate
+            return Response(
+                {"error": "Conflicting upload in progress, please retry"},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({"events": statuses}, status=status.HTTP_200_OK)
+
 
 class IngredientUsageViewSet(viewsets.ModelViewSet):
     queryset = IngredientUsage.objects.all()
@@ -100,12 +123,12 @@ class IngredientUsageViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='usage-report')
     def usage_report(self, request):
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
+        start, end = parse_date_param(request, 'start_date'), parse_date_param(request, 'end_date')
 
-        usages = IngredientUsage.objects.all()
-        if start_date and end_date:
-            usages = usages.filter(used_at__range=[start_date, end_date])
+        # Read from the daily rollups, one row per product and day
+        usages = DailyProductRollup.objects.filter(quantity_used__gt=0)
+        if start and end:
+            usages = usages.filter(day__range=[start, end])
 
         usage_data = usages.values('product__name').annotate(
             total_used=Sum('quantity_used')
@@ -0,0 +1,6 @@
+from django.contrib import admin
+from .models import TopicSequence
+
+@admin.register(TopicSequence)
+class TopicSequenceAdmin(admin.ModelAdmin):
+    list_display = ('topic', 'value')
@@ -0,0 +1,37 @@
+"""
+JWT authentication for websocket connections, shared by every consumer.
+
+Browsers cannot set headers on a websocket handshake, so the access token is
+passed as `?token=<jwt>`. The middleware validates it once per connection
+and puts the user in scope['user']; consumers only check
+scope['user'].is_authenticated.
+"""
+from urllib.parse import parse_qs
+from channels.auth import AuthMiddlewareStack
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed, TokenError
+
+
+@database_sync_to_async
+def get_user_from_token(token):
+    jwt_auth = JWTAuthentication()
+    try:
+        return jwt_auth.get_user(jwt_auth.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed, TokenError):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    async def __call__(self, scope, receive, send):
+        token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+        if token:
+            scope = dict(scope, user=await get_user_from_token(token))
+        return await super().__call__(scope, receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    # Session auth first, so a valid token takes precedence over it
+    return AuthMiddlewareStack(JWTAuthMiddleware(inner))
@@ -0,0 +1,202 @@
+"""
+Websocket load test: many authenticated clients on the meals, inventory and
+dashboard sockets of config.asgi.application, all in this process, while
+stock changes are driven through inventory.stock like a real serving. The
+changes go to a product and meal created for the run (benchmark_meal) and
+removed with their ledger rows afterwards.
+
+Reports how long each broadcast takes to reach the clients, how many
+messages per second they receive and how long the event loop was blocked,
+so a consumer that starts doing synchronous work per message shows up here
+rather than in production. Used by the benchmark_websockets command.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from config.asgi import application
+from inventory.models import Product, ProductCategory, StockMovement, Unit
+from inventory.stock import apply_stock_changes
+from meals.models import Meal, MealIngredient
+
+ENDPOINTS = ('/ws/meals/', '/ws/inventory/', '/ws/dashboard/')
+# Interval of the probe that measures how late the event loop wakes up
+LOOP_PROBE_INTERVAL = 0.005
+# Name of the product and meal created for a run
+BENCHMARK_NAME = "Websocket benchmark"
+BENCHMARK_STOCK = 1000
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of `values` (0 when there are none)."""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+@contextmanager
+def benchmark_meal(user):
+    """
+    Yield a throwaway product and an active meal made from it, for the
+    benchmark to change and watch, and delete both afterwards. Deleting the
+    product takes its ledger rows (movements, snapshots, rollups) with it,
+    so the benchmark leaves no ADJUSTMENT movements behind for reports.
+    """
+    created = []
+    unit = Unit.objects.order_by('id').first()
+    if unit is None:
+        unit = Unit.objects.create(name=BENCHMARK_NAME, abbreviation='bench')
+        created.append(unit)
+    category = ProductCategory.objects.order_by('id').first()
+    if category is None:
+        category = ProductCategory.objects.create(name=BENCHMARK_NAME)
+        created.append(category)
+    product = Product.objects.create(
+        name=BENCHMARK_NAME, total_weight=BENCHMARK_STOCK, unit=unit, category=category, created_by=user
+    )
+    meal = Meal.objects.create(name=BENCHMARK_NAME, category=category, created_by=user)
+    MealIngredient.objects.create(meal=meal, product=product, quantity=1, created_by=user)
+    try:
+        yield product, meal.id
+    finally:
+        meal.delete()
+        product.delete()
+        for instance in reversed(created):
+            instance.delete()
+
+
+def channel_layer_settings(layer, redis_url=None):
+    if layer == 'memory':
+        # The in-memory layer only works on the event loop of the consumers, so send inline
+        return {
+            'CHANNEL_LAYERS': {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+            'REALTIME_BROADCAST_INLINE': True,
+        }
+    return {
+        'CHANNEL_LAYERS': {
+            'default': {'BACKEND': 'channels_redis.core.RedisChannelLayer', 'CONFIG': {'hosts': [redis_url]}}
+        },
+    }
+
+
+class Client:
+    def __init__(self, path, token):
+        self.path = path
+        self.communicator = WebsocketCommunicator(
+            application, f"{path}?token={token}", headers=[(b'origin', b'http://localhost')]
+        )
+        self.received = []
+
+    async def read(self):
+        while True:
+            await self.communicator.receive_output(timeout=None)
+            self.received.append(time.perf_counter())
+
+
+class LoopProbe:
+    """Sleeps in short steps and records how late each wake-up was."""
+
+    def __init__(self):
+        self.lags = []
+
+    async def run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(LOOP_PROBE_INTERVAL)
+            self.lags.append(max(0.0, time.perf_counter() - started - LOOP_PROBE_INTERVAL))
+
+
+async def _connect(clients, meal_id, timeout):
+    for client in clients:
+        connected, code = await client.communicator.connect(timeout)
+        if not connected:
+            raise RuntimeError(f"{client.path} refused the connection ({code})")
+        if client.path == '/ws/meals/':
+            # Meal sockets only hear about the meals they watch
+            await client.communicator.send_json_to({'meal_id': meal_id})
+            await client.communicator.receive_json_from(timeout)
+
+
+def _change_stock(product_id, delta, user):
+    with transaction.atomic():
+        apply_stock_changes({product_id: delta}, StockMovement.ADJUSTMENT, user, notes="Websocket benchmark")
+
+
+async def _wait_for_all(clients, counts, timeout):
+    deadline = time.perf_counter() + timeout
+    while any(len(client.received) <= count for client, count in zip(clients, counts)):
+        if time.perf_counter() > deadline:
+            return False
+        await asyncio.sleep(0.001)
+    return True
+
+
+async def run_benchmark(user, product, meal_id, clients_per_endpoint, changes, pause=0.05, timeout=10.0):
+    """
+    Connect `clients_per_endpoint` sockets to each endpoint as `user`, then
+    change `product` stock `changes` times (alternately down and up by one
+    unit, so an even count leaves it as it was) and wait for every client to
+    hear about each change. Returns the report as a dict.
+    """
+    token = str(AccessToken.for_user(user))
+    clients = [Client(path, token) for path in ENDPOINTS for _ in range(clients_per_endpoint)]
+    await _connect(clients, meal_id, timeout)
+    probe = LoopProbe()
+    tasks = [asyncio.ensure_future(client.read()) for client in clients]
+    probe_task = asyncio.ensure_future(probe.run())
+
+    latencies = {path: [] for path in ENDPOINTS}
+    missed = 0
+    try:
+        started = time.perf_counter()
+        for change in range(changes):
+            counts = [len(client.received) for client in clients]
+            sent_at = time.perf_counter()
+            await database_sync_to_async(_change_stock)(product.id, -1 if change % 2 == 0 else 1, user)
+            if not await _wait_for_all(clients, counts, timeout):
+                missed += sum(len(client.received) <= count for client, count in zip(clients, counts))
+            # Let the remaining messages of this change arrive before the next one
+            await asyncio.sleep(pause)
+            for client, count in zip(clients, counts):
+                latencies[client.path].extend(at - sent_at for at in client.received[count:])
+        elapsed = time.perf_counter() - started
+    finally:
+        probe_task.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(probe_task, *tasks, return_exceptions=True)
+        for client in clients:
+            await client.communicator.disconnect()
+
+    all_latencies = [latency for values in latencies.values() for latency in values]
+    return {
+        'clients': len(clients),
+        'changes': changes,
+        'messages': len(all_latencies),
+        'missed': missed,
+        'elapsed': elapsed,
+        'messages_per_second': len(all_latencies) / elapsed if elapsed else 0,
+        'latency': {
+            path: {p: percentile(values, p) for p in (50, 95, 99, 100)}
+            for path, values in [('all', all_latencies), *latencies.items()]
+        },
+        'loop_blocked': {
+            'total': sum(probe.lags),
+            'max': max(probe.lags, default=0),
+            'p99': percentile(probe.lags, 99),
+        },
+    }
+
+
+def benchmark(user, product, meal_id, clients_per_endpoint, changes, layer='memory', redis_url=None, **options):
+    """Run run_benchmark on a fresh event loop with the chosen channel layer."""
+    with override_settings(**channel_layer_settings(layer, redis_url)):
+        return async_to_sync(run_benchmark)(user, product, meal_id, clients_per_endpoint, changes, **options)
+
@@ -0,0 +1,241 @@
+"""
+Realtime broadcaster: the one place that sends websocket notifications.
+
+Signal handlers and services call publish(group, event_type) instead of
+group_send. Publishes are collected per transaction, and per request when
+BroadcastMiddleware is installed, and flushed on commit as a single message
+per (group, event_type), so serving a meal that touches a dozen products
+still notifies each websocket group once. Ids passed along are merged, and
+messages are built at flush time, after the data they describe is committed.
+
+Messages are handed to a background thread that owns its own event loop, so
+the request never waits on the channel layer. Set REALTIME_BROADCAST_INLINE
+to send synchronously instead (used by the websocket tests).
+"""
+import asyncio
+import atexit
+import logging
+import queue
+import threading
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Messages waiting for the sender thread; further messages are dropped when it is full
+QUEUE_SIZE = 1000
+# How long an exiting process waits for queued messages to go out
+EXIT_TIMEOUT = 5
+
+_local = threading.local()
+_metrics = Counter()
+_metrics_lock = threading.Lock()
+
+
+def _count(name, amount=1):
+    with _metrics_lock:
+        _metrics[name] += amount
+
+
+def metrics():
+    """
+    Return the counters of this process: `published` calls, how many of them
+    were `coalesced` into an already pending message, messages `sent` to the
+    sender, and messages `delivered`, `failed` or `dropped` by it.
+    """
+    with _metrics_lock:
+        counters = dict.fromkeys(('published', 'coalesced', 'sent', 'delivered', 'failed', 'dropped'), 0)
+        counters.update(_metrics)
+    return counters
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+class _Batch:
+    def __init__(self, alias=None):
+        # (group, event_type) -> [ids, build]
+        self.pending = {}
+        # Transaction batches: their connection and a weak reference to their on_commit callback
+        self.alias = alias
+        self.callback = None
+
+    def add(self, group, event_type, ids, build):
+        """Add a publish; returns True when it was merged into a pending message."""
+        entry = self.pending.get((group, event_type))
+        if entry is None:
+            self.pending[(group, event_type)] = [set(ids), build]
+            return False
+        entry[0].update(ids)
+        entry[1] = build or entry[1]
+        return True
+
+    def merge(self, other):
+        for (group, event_type), (ids, build) in other.pending.items():
+            if self.add(group, event_type, ids, build):
+                _count('coalesced')
+
+    def commit(self):
+        batches = getattr(_local, 'transaction_batches', {})
+        if batches.get(self.alias) is self:
+            del batches[self.alias]
+        request_batch = getattr(_local, 'request_batch', None)
+        if request_batch is not None:
+            request_batch.merge(self)
+        else:
+            _flush(self)
+
+
+def _transaction_batch(using=None):
+    """The batch of the current transaction, or None in autocommit mode."""
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        return None
+    if getattr(_local, 'transaction_batches', None) is None:
+        _local.transaction_batches = {}
+    batches = _local.transaction_batches
+    batch = batches.get(connection.alias)
+    # A rollback discards the transaction's on_commit callbacks, which drops the
+    # last reference to the batch's callback; its batch is then abandoned with it
+    if batch is None or batch.callback() is None:
+        batch = batches[connection.alias] = _Batch(connection.alias)
+
+        def commit():
+            batch.commit()
+
+        batch.callback = weakref.ref(commit)
+        transaction.on_commit(commit, using=connection.alias)
+    return batch
+
+
+def publish(group, event_type, ids=(), build=None):
+    """
+    Schedule a `event_type` message to `group`.
+
+    `build(ids)` returns the message from the ids of every coalesced publish;
+    without it the message is just {"type": event_type}. It may also return a
+    list of (group, message) pairs to fan one query out to several groups.
+    """
+    _count('published')
+    batch = _transaction_batch() or getattr(_local, 'request_batch', None)
+    if batch is None:
+        batch = _Batch()
+        batch.add(group, event_type, ids, build)
+        _flush(batch)
+    elif batch.add(group, event_type, ids, build):
+        _count('coalesced')
+
+
+def send(group, message):
+    """Send `message` right away, outside any batching (e.g. while a transaction rolls back)."""
+    _count('published')
+    _dispatch(group, message)
+
+
+@contextmanager
+def collect():
+    """Hold every publish made inside the block and flush them together at its end."""
+    if getattr(_local, 'request_batch', None) is not None:
+        yield
+        return
+    batch = _local.request_batch = _Batch()
+    try:
+        yield
+    finally:
+        _local.request_batch = None
+        _flush(batch)
+
+
+def _flush(batch):
+    for (group, event_type), (ids, build) in batch.pending.items():
+        try:
+            message = build(ids) if build else {"type": event_type}
+        except Exception:
+            logger.exception("Could not build %s message for group %s", event_type, group)
+            _count('failed')
+            continue
+        for target, target_message in (message if isinstance(message, list) else [(group, message)]):
+            _dispatch(target, target_message)
+
+
+def _dispatch(group, message):
+    _count('sent')
+    if getattr(settings, 'REALTIME_BROADCAST_INLINE', False):
+        _deliver(async_to_sync, group, message)
+        return
+    try:
+        _sender().queue.put_nowait((group, message))
+    except queue.Full:
+        logger.warning("Realtime queue is full, dropping %s message for group %s", message.get('type'), group)
+        _count('dropped')
+
+
+def _deliver(run, group, message):
+    try:
+        run(get_channel_layer().group_send)(group, message)
+        _count('delivered')
+    except Exception:
+        logger.exception("Could not send %s message to group %s", message.get('type'), group)
+        _count('failed')
+
+
+class _Sender(threading.Thread):
+    def __init__(self):
+        super().__init__(name='realtime-broadcaster', daemon=True)
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+
+    def run(self):
+        loop = asyncio.new_event_loop()
+
+        def run_in_loop(func):
+            return lambda *args: loop.run_until_complete(func(*args))
+
+        while True:
+            group, message = self.queue.get()
+            _deliver(run_in_loop, group, message)
+            self.queue.task_done()
+
+
+_sender_thread = None
+_sender_lock = threading.Lock()
+
+
+def _sender():
+    global _sender_thread
+    with _sender_lock:
+        if _sender_thread is None or not _sender_thread.is_alive():
+            if _sender_thread is None:
+                # The sender is a daemon thread; short-lived processes (commands,
+                # scripts) would otherwise exit with their messages still queued
+                atexit.register(_send_before_exit)
+            _sender_thread = _Sender()
+            _sender_thread.start()
+    return _sender_thread
+
+
+def wait_until_sent(timeout=None):
+    """
+    Block until the sender thread has handled every queued message, or for at
+    most `timeout` seconds. Returns whether everything was handled.
+    """
+    if _sender_thread is None:
+        return True
+    if timeout is None:
+        _sender_thread.queue.join()
+        return True
+    waiter = threading.Thread(target=_sender_thread.queue.join, daemon=True)
+    waiter.start()
+    waiter.join(timeout)
+    return not waiter.is_alive()
+
+
+def _send_before_exit():
+    if not wait_until_sent(EXIT_TIMEOUT):
+        logger.warning("Exiting with %d realtime messages unsent", _sender_thread.queue.qsize())
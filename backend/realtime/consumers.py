@@ -0,0 +1,71 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from users.permissions import get_role_name
+from .sequences import current_sequence
+from .topics import topic_group, can_subscribe, is_sequenced
+
+# Upper bound on topics per socket, which bounds its channel-layer group memberships
+MAX_SUBSCRIPTIONS = 100
+
+
+class RealtimeConsumer(AsyncJsonWebsocketConsumer):
+    """
+    One authenticated socket per client, multiplexing every topic.
+
+    Clients send {"action": "subscribe" | "unsubscribe", "topic": ...} with a
+    topic from realtime.topics and get {"type": "subscribed" | "unsubscribed",
+    "topic", "sequence"} or {"type": "error", "error"} back. Messages of a
+    topic carry its name in "topic".
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        self.role = await database_sync_to_async(get_role_name)(user)
+        self.subscriptions = set()
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        for topic in getattr(self, 'subscriptions', ()):
+            await self.channel_layer.group_discard(topic_group(topic), self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        action = content.get('action') if isinstance(content, dict) else None
+        topic = content.get('topic') if isinstance(content, dict) else None
+        group = topic_group(topic)
+        if action not in ('subscribe', 'unsubscribe'):
+            await self.send_json({"type": "error", "error": "Unknown action"})
+        elif group is None:
+            await self.send_json({"type": "error", "error": "Unknown topic", "topic": topic})
+        elif action == 'subscribe':
+            await self.subscribe(topic, group)
+        else:
+            if topic in self.subscriptions:
+                self.subscriptions.discard(topic)
+                await self.channel_layer.group_discard(group, self.channel_name)
+            await self.send_json({"type": "unsubscribed", "topic": topic})
+
+    async def subscribe(self, topic, group):
+        if not can_subscribe(self.role, topic):
+            await self.send_json({"type": "error", "error": "Not allowed", "topic": topic})
+            return
+        if topic not in self.subscriptions:
+            if len(self.subscriptions) >= MAX_SUBSCRIPTIONS:
+                await self.send_json({"type": "error", "error": "Too many subscriptions", "topic": topic})
+                return
+            self.subscriptions.add(topic)
+            await self.channel_layer.group_add(group, self.channel_name)
+        sequence = await database_sync_to_async(current_sequence)(topic) if is_sequenced(topic) else None
+        await self.send_json({"type": "subscribed", "topic": topic, "sequence": sequence})
+
+    async def forward(self, event):
+        # Built once by the sender (see realtime.sequences), so it is only passed on
+        await self.send(text_data=event['text'])
+
+    dashboard_update = forward
+    inventory_update = forward
+    meal_update = forward
+    report_job = forward
+    ingredient_warning = forward
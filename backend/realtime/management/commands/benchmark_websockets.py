@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from users.models import User
+from users.permissions import get_role_name
+from realtime.benchmark import ENDPOINTS, benchmark, benchmark_meal
+from realtime.topics import can_subscribe
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the meals, inventory and dashboard websockets in process and report broadcast "
+        "latency, throughput and event-loop blocking. Changes the stock of a product created for "
+        "the run, which is deleted afterwards with its stock movements"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=210,
+                            help="Total websocket clients, split evenly over the endpoints")
+        parser.add_argument('--changes', type=int, default=20, help="Number of stock changes to broadcast")
+        parser.add_argument('--layer', choices=['memory', 'redis'], default='memory',
+                            help="Channel layer to run on")
+        parser.add_argument('--redis-url', default='redis://localhost:6379/1',
+                            help="Redis (or compatible) server for --layer redis")
+        parser.add_argument('--username', help="Connect as this user (default: the first admin)")
+        parser.add_argument('--timeout', type=float, default=10.0,
+                            help="Seconds to wait for every client to hear about a change")
+
+    def handle(self, *args, **options):
+        if options['username']:
+            user = User.objects.select_related('role').filter(username=options['username']).first()
+        else:
+            user = User.objects.select_related('role').filter(role__name__iexact='admin', is_active=True).order_by('id').first()
+        if user is None:
+            raise CommandError("No such user; pass --username of an admin or manager")
+        if not can_subscribe(get_role_name(user), 'dashboard'):
+            raise CommandError(f"{user.username} may not open the dashboard socket; use an admin or manager")
+
+        clients_per_endpoint = max(1, options['clients'] // len(ENDPOINTS))
+        self.stdout.write(
+            f"{clients_per_endpoint * len(ENDPOINTS)} clients on {options['layer']} layer, "
+            f"{options['changes']} stock changes"
+        )
+        with benchmark_meal(user) as (product, meal_id):
+            report = benchmark(
+                user, product, meal_id, clients_per_endpoint, options['changes'],
+                layer=options['layer'], redis_url=options['redis_url'], timeout=options['timeout']
+            )
+
+        self.stdout.write(
+            f"{report['messages']} messages in {report['elapsed']:.2f} s "
+            f"({report['messages_per_second']:.0f} messages/s)"
+        )
+        self.stdout.write("Broadcast latency (ms):        p50      p95      p99      max")
+        for path, latency in report['latency'].items():
+            self.stdout.write(f"  {path:<26}" + "".join(f"{latency[p] * 1000:9.1f}" for p in (50, 95, 99, 100)))
+        blocked = report['loop_blocked']
+        self.stdout.write(
+            f"Event loop blocked: {blocked['total'] * 1000:.1f} ms in total, "
+            f"longest {blocked['max'] * 1000:.1f} ms, p99 {blocked['p99'] * 1000:.1f} ms"
+        )
+        if report['missed']:
+            self.stdout.write(self.style.ERROR(f"{report['missed']} client notifications did not arrive in time"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Every client received every change"))
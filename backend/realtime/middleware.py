@@ -0,0 +1,12 @@
+from .broadcaster import collect
+
+
+class BroadcastMiddleware:
+    """Coalesce the realtime notifications of a whole request into one flush."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with collect():
+            return self.get_response(request)
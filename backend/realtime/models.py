@@ -0,0 +1,13 @@
+from django.db import models
+
+
+class TopicSequence(models.Model):
+    # Last sequence number sent to a websocket group; clients use it to detect missed messages
+    topic = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'TopicSequence'
+
+    def __str__(self):
+        return f"{self.topic}: {self.value}"
@@ -0,0 +1,46 @@
+"""
+Sequence-numbered delta messages for the websocket groups.
+
+Every message sent to a group carries the next number of that group's
+sequence. Clients apply deltas whose number follows the last one they saw,
+ignore older ones and re-fetch a snapshot when they notice a gap. Snapshot
+endpoints return current_sequence() read before the data, so a delta that
+raced the snapshot is at worst applied twice; deltas carry absolute values,
+so that is harmless.
+"""
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from .models import TopicSequence
+
+
+def next_sequence(topic):
+    """Atomically increment and return the sequence of `topic`."""
+    table = connection.ops.quote_name(TopicSequence._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (topic, value) VALUES (%s, 1) "
+            f"ON CONFLICT (topic) DO UPDATE SET value = {table}.value + 1 "
+            f"RETURNING value",
+            [topic]
+        )
+        return cursor.fetchone()[0]
+
+
+def current_sequence(topic):
+    return TopicSequence.objects.filter(topic=topic).values_list('value', flat=True).first() or 0
+
+
+def topic_message(topic, handler, payload):
+    """
+    Wrap `payload` as a channel-layer event for the consumer method
+    `handler`, which forwards the ready-made text to its clients. The topic
+    name is included so multiplexed sockets can route it.
+    """
+    payload = {**payload, 'topic': topic}
+    return {'type': handler, 'text': json.dumps(payload, cls=DjangoJSONEncoder)}
+
+
+def sequenced_message(topic, handler, payload):
+    """Like topic_message, numbered with the next sequence of `topic`."""
+    return topic_message(topic, handler, {**payload, 'sequence': next_sequence(topic)})
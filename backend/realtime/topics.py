@@ -0,0 +1,49 @@
+"""
+Websocket topics clients can subscribe to, and the channel-layer group
+behind each of them.
+"""
+import re
+
+# Topic -> channel-layer group; meal:<id> topics map to per-meal groups
+STATIC_TOPICS = {
+    'dashboard': 'dashboard',
+    'inventory': 'inventory',
+    'meals': 'meals',
+    'reports': 'reports',
+}
+# Topics whose messages carry absolute state and are not numbered
+UNSEQUENCED_TOPICS = {'reports'}
+MEAL_TOPIC = re.compile(r'^meal:(\d{1,18})$')
+
+# Topics limited to some roles, mirroring the REST permissions of the same data
+TOPIC_ROLES = {
+    'dashboard': {'admin', 'manager'},
+    'reports': {'admin', 'manager'},
+}
+
+
+def meal_topic(meal_id):
+    return f"meal:{meal_id}"
+
+
+def meal_group(meal_id):
+    return f"meal.{meal_id}"
+
+
+def topic_group(topic):
+    """Return the group of `topic`, or None if there is no such topic."""
+    if not isinstance(topic, str):
+        return None
+    if topic in STATIC_TOPICS:
+        return STATIC_TOPICS[topic]
+    match = MEAL_TOPIC.match(topic)
+    return meal_group(match.group(1)) if match else None
+
+
+def can_subscribe(role, topic):
+    roles = TOPIC_ROLES.get(topic)
+    return roles is None or role in roles
+
+
+def is_sequenced(topic):
+    return topic not in UNSEQUENCED_TOPICS and not MEAL_TOPIC.match(topic)
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import BroadcastMetricsView
+
+urlpatterns = [
+    path('metrics/', BroadcastMetricsView.as_view(), name='realtime-metrics'),
+]
@@ -0,0 +1,14 @@
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from users.permissions import IsAdminOnly
+from .broadcaster import metrics
+
+
+class BroadcastMetricsView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminOnly]
+
+    def get(self, request):
+        # Counters are per process, since the last restart
+        return Response(metrics(), status=status.HTTP_200_OK)
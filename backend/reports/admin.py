@@ -1,9 +1,15 @@
 from django.contrib import admin
-from .models import MonthlyReport
+from .models import MonthlyReport, ReportJob
 
 @admin.register(MonthlyReport)
 class MonthlyReportAdmin(admin.ModelAdmin):
     list_display = ('id', 'meal', 'month_year', 'portions_served', 'portions_possible', 'discrepancy_rate', 'generated_at', 'generated_by')
     list_filter = ('meal', 'month_year', 'generated_by')
     search_fields = ('meal__name', 'month_year')
-    readonly_fields = ('generated_at',)
\ No newline at end of file
+    readonly_fields = ('generated_at',)
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'start_month', 'end_month', 'status', 'chunks_done', 'chunks_total', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
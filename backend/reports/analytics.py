@@ -0,0 +1,140 @@
+"""
+Time-bucketed usage analytics for charts.
+
+Ingredient usage and portions served are summed into day, week or month
+buckets, optionally split per product, meal or category, with the date
+truncation and grouping done in one database query. Whatever the daily
+rollups (reports.rollups) can answer is read from them; usage per meal
+needs the IngredientUsage rows themselves, which are indexed on
+(used_at, meal_serving) for it.
+
+The result uses parallel arrays: one list of bucket dates, and per series
+one list of values in the same order, with zeros for empty buckets.
+"""
+from datetime import datetime, time, timedelta
+from django.db.models import DateField, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from operations.models import IngredientUsage
+from .models import DailyMealRollup, DailyProductRollup
+
+BUCKETS = ('day', 'week', 'month')
+MEASURES = ('usage', 'servings')
+# Upper bound on the number of buckets in one response
+MAX_BUCKETS = 1000
+# Period covered when no start date is given, ending with the end date (default: today)
+DEFAULT_WINDOWS = {
+    'day': timedelta(days=90),
+    'week': timedelta(weeks=52),
+    'month': timedelta(days=365),
+}
+
+# (measure, by) -> (queryset, date field, whether the date field is a datetime, value, (id, name) fields)
+SOURCES = {
+    ('usage', None): (DailyProductRollup.objects, 'day', False, 'quantity_used', ()),
+    ('usage', 'product'): (DailyProductRollup.objects, 'day', False, 'quantity_used', ('product_id', 'product__name')),
+    ('usage', 'category'): (
+        DailyProductRollup.objects, 'day', False, 'quantity_used',
+        ('product__category_id', 'product__category__name')
+    ),
+    ('usage', 'meal'): (
+        IngredientUsage.objects, 'used_at', True, 'quantity_used',
+        ('meal_serving__meal_id', 'meal_serving__meal__name')
+    ),
+    ('servings', None): (DailyMealRollup.objects, 'day', False, 'portions', ()),
+    ('servings', 'meal'): (DailyMealRollup.objects, 'day', False, 'portions', ('meal_id', 'meal__name')),
+    ('servings', 'category'): (
+        DailyMealRollup.objects, 'day', False, 'portions', ('meal__category_id', 'meal__category__name')
+    ),
+}
+
+
+class AnalyticsError(ValueError):
+    """Raised for parameter combinations the analytics cannot answer."""
+
+
+def bucket_start(day, bucket):
+    """First day of the bucket containing `day` (weeks start on Monday, as in PostgreSQL)."""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, bucket):
+    if bucket == 'day':
+        return day + timedelta(days=1)
+    if bucket == 'week':
+        return day + timedelta(weeks=1)
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def bucket_range(first, last, bucket):
+    """Every bucket start from the bucket of `first` to that of `last`."""
+    days, day, last = [], bucket_start(first, bucket), bucket_start(last, bucket)
+    while day <= last:
+        if len(days) >= MAX_BUCKETS:
+            raise AnalyticsError(f"More than {MAX_BUCKETS} {bucket} buckets; use a larger bucket or a shorter range")
+        days.append(day)
+        day = next_bucket(day, bucket)
+    return days
+
+
+def usage_series(measure='usage', bucket='day', by=None, start=None, end=None):
+    """
+    Sum `measure` ('usage' or 'servings') per `bucket` between the dates
+    `start` and `end` (inclusive), split into one series per `by`
+    ('product', 'meal', 'category' or None for a single total). `end`
+    defaults to today and `start` to DEFAULT_WINDOWS[bucket] before it.
+
+    Returns {'measure', 'bucket', 'by', 'buckets': [date], 'series':
+    [{'id', 'name', 'values': [number]}]}.
+    """
+    if measure not in MEASURES or bucket not in BUCKETS:
+        raise AnalyticsError("measure must be one of usage, servings and bucket one of day, week, month")
+    if (measure, by) not in SOURCES:
+        raise AnalyticsError(f"{measure} cannot be split by {by}")
+    queryset, date_field, is_datetime, value_field, pivot = SOURCES[(measure, by)]
+    if end is None:
+        end = timezone.localdate()
+    if start is None:
+        start = end - DEFAULT_WINDOWS[bucket] + timedelta(days=1)
+    # Checked before querying
+    buckets = bucket_range(start, end, bucket)
+    position = {day: index for index, day in enumerate(buckets)}
+
+    if is_datetime:
+        # Local-day boundaries, so the range filter can use the index on the timestamp
+        queryset = queryset.filter(**{
+            f'{date_field}__gte': timezone.make_aware(datetime.combine(start, time.min)),
+            f'{date_field}__lt': timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+        })
+    else:
+        queryset = queryset.filter(**{f'{date_field}__gte': start, f'{date_field}__lte': end})
+
+    rows = list(
+        queryset.annotate(bucket=Trunc(date_field, bucket, output_field=DateField()))
+        .values('bucket', *pivot)
+        .annotate(total=Sum(value_field))
+        .order_by('bucket')
+    )
+
+    series = {}
+    for row in rows:
+        key = row[pivot[0]] if pivot else None
+        entry = series.get(key)
+        if entry is None:
+            entry = series[key] = {
+                'id': key,
+                'name': row[pivot[1]] if pivot else "Total",
+                'values': [0] * len(buckets),
+            }
+        entry['values'][position[row['bucket']]] += row['total'] or 0
+    return {
+        'measure': measure,
+        'bucket': bucket,
+        'by': by,
+        'buckets': buckets,
+        'series': sorted(series.values(), key=lambda entry: (entry['name'] is None, entry['name'] or "")),
+    }
@@ -1,8 +1,19 @@
-import json
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from realtime.topics import can_subscribe
+from users.permissions import get_role_name
 
 class DashboardConsumer(AsyncWebsocketConsumer):
     async def connect(self):
+        # Same audience as the dashboard endpoint; authenticated by realtime.auth.JWTAuthMiddleware
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        role = await database_sync_to_async(get_role_name)(user)
+        if not can_subscribe(role, "dashboard"):
+            await self.close(code=4403)
+            return
         await self.channel_layer.group_add("dashboard", self.channel_name)
         await self.accept()
 
@@ -10,7 +21,5 @@ class DashboardConsumer(AsyncWebsocketConsumer):
         await self.channel_layer.group_discard("dashboard", self.channel_name)
 
     async def dashboard_update(self, event):
-        await self.send(text_data=json.dumps({
-            "type": "dashboard_update",
-            "message": "Dashboard data updated"
-        }))
\ No newline at end of file
+        # Sequence-numbered delta, built once by the sender (see realtime.sequences)
+        await self.send(text_data=event["text"])
\ No newline at end of file
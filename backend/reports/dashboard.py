@@ -0,0 +1,123 @@
+"""
+Dashboard snapshot: the payload of the dashboard endpoint, cached.
+
+Snapshots are versioned by the dashboard topic's sequence
+(realtime.sequences). Every change the dashboard shows already bumps it,
+once per transaction and after commit, when its dashboard_update delta is
+built. So a change moves readers to a new key and stale snapshots simply
+expire; nothing has to be deleted. A snapshot may be newer than the
+version it is stored under, never older, and clients apply later deltas
+on top of it either way.
+
+A burst of requests after a change is single-flighted: the first one takes
+a short cache.add() lock and recomputes, the others wait for its result.
+"""
+import time
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+from inventory.low_stock import low_stock_rows
+from inventory.models import Product
+from meals.models import Meal
+from meals.portions import cached_availability
+from operations.models import MealServing
+from realtime.sequences import current_sequence
+from .models import DailyMealRollup
+
+# Snapshots outlive most versions anyway; this only bounds memory for idle dashboards
+SNAPSHOT_TIMEOUT = 10 * 60
+# How long a recomputation may hold the lock before others compute on their own
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+
+
+def snapshot_key(sequence, day):
+    # "Served today" rolls over at midnight, so the local date is part of the version
+    return f"dashboard:snapshot:{day.isoformat()}:{sequence}"
+
+
+def build_dashboard(sequence):
+    """Compute the dashboard payload, labelled with the sequence read before it."""
+    # --- 1. Available Portions ---
+    meals = list(Meal.objects.filter(is_active=True))
+    availability = cached_availability([meal.id for meal in meals])
+    available_portions = [
+        {
+            "meal_id": meal.id,
+            "meal": meal.name,
+            "portions": availability[meal.id]['max_portions'],
+            "bottleneck": availability[meal.id]['bottleneck'],
+        }
+        for meal in meals
+    ]
+
+    # --- 2. Low Stock Ingredients ---
+    low_stock_ingredients = [
+        {
+            "id": row['id'],
+            "name": row['name'],
+            "total_weight": row['total_weight'],
+            "threshold": row['threshold'],
+            "unit": row['unit_abbreviation'],
+        }
+        for row in low_stock_rows()
+    ]
+
+    # --- 3. Recent Activity ---
+    recent_servings = MealServing.objects.select_related('meal', 'user').order_by('-served_at')[:5]
+    recent_activities = [
+        {
+            "id": serving.id,
+            "meal": serving.meal.name if serving.meal else "Unknown",
+            "portion_count": serving.portion_count,
+            "served_by": serving.user.username if serving.user else "Unknown",
+            "served_at": serving.served_at,
+        }
+        for serving in recent_servings
+    ]
+
+    # Meals served today
+    meals_served_today = DailyMealRollup.objects.filter(day=timezone.localdate()).aggregate(
+        total=Sum('servings')
+    )['total'] or 0
+
+    return {
+        "sequence": sequence,
+        # Main dashboard stats
+        "ingredient_count": Product.objects.count(),
+        "active_meals": len(meals),
+        "low_stock_count": len(low_stock_ingredients),
+        "meals_served_today": meals_served_today,
+        # Dashboard widgets
+        "available_portions": available_portions,
+        "low_stock_ingredients": low_stock_ingredients,
+        "recent_activities": recent_activities,
+    }
+
+
+def dashboard_snapshot():
+    """Return the dashboard payload from the cache, computing it at most once per version."""
+    # Read before the data: websocket deltas numbered after this are applied on top of it
+    sequence = current_sequence("dashboard")
+    key = snapshot_key(sequence, timezone.localdate())
+    snapshot = cache.get(key)
+    if snapshot is not None:
+        return snapshot
+
+    lock_key = f"{key}:lock"
+    locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while not locked and time.monotonic() < deadline:
+        # Someone else is computing this version
+        time.sleep(WAIT_INTERVAL)
+        snapshot = cache.get(key)
+        if snapshot is not None:
+            return snapshot
+        locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    try:
+        snapshot = build_dashboard(sequence)
+        cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return snapshot
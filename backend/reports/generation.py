@@ -0,0 +1,108 @@
+"""
+Monthly report generation.
+
+A month is aggregated in a fixed number of queries whatever the number of
+meals: portions served are summed from the daily rollups (reports.rollups),
+ingredient usage is grouped per meal and product in the database,
+possible portions come from the stock available during the month, and the
+rows are written with one upsert, so regenerating a month replaces its
+reports instead of failing on the (meal, month_year) unique constraint.
+"""
+from datetime import datetime
+from decimal import Decimal
+from django.db.models import Sum
+from django.utils import timezone
+from inventory.ledger import stock_as_of, movement_totals
+from inventory.models import StockMovement
+from meals.models import Meal
+from meals.portions import estimate_portions
+from operations.models import IngredientUsage
+from .models import MonthlyReport, DailyMealRollup
+
+# Largest magnitude MonthlyReport.discrepancy_rate (5 digits, 2 decimals) can hold
+MAX_DISCREPANCY_RATE = Decimal('999.99')
+
+
+def month_bounds(year, month):
+    """Return the aware [start, end) datetimes of a month in the local timezone."""
+    start = timezone.make_aware(datetime(year, month, 1))
+    end = timezone.make_aware(datetime(year + month // 12, month % 12 + 1, 1))
+    return start, end
+
+
+def month_stock(start, end):
+    """Stock available during a month: what was on hand when it started plus its deliveries."""
+    stock = stock_as_of(start)
+    for product_id, delivered in movement_totals(start, end, StockMovement.DELIVERY).items():
+        stock[product_id] = stock.get(product_id, 0) + delivered
+    return stock
+
+
+def discrepancy_rate(possible, served):
+    """Share of possible portions that were not served, in percent."""
+    if possible <= 0:
+        return Decimal('0')
+    rate = Decimal((possible - served) * 100) / Decimal(possible)
+    return max(-MAX_DISCREPANCY_RATE, min(MAX_DISCREPANCY_RATE, rate.quantize(Decimal('0.01'))))
+
+
+def ingredients_used(start, end):
+    """
+    Return {meal_id: {product_id (str): {'product', 'unit', 'quantity'}}} summed
+    from the IngredientUsage rows of servings in [start, end).
+    """
+    rows = (
+        IngredientUsage.objects.filter(meal_serving__served_at__gte=start, meal_serving__served_at__lt=end)
+        .values('meal_serving__meal_id', 'product_id', 'product__name', 'product__unit__abbreviation')
+        .annotate(quantity=Sum('quantity_used'))
+    )
+    used = {}
+    for row in rows:
+        used.setdefault(row['meal_serving__meal_id'], {})[str(row['product_id'])] = {
+            'product': row['product__name'],
+            'unit': row['product__unit__abbreviation'],
+            'quantity': row['quantity'],
+        }
+    return used
+
+
+def generate_monthly_report(year, month, user=None):
+    """
+    Write the MonthlyReport of every active meal, and of every meal served
+    that month, for `year`-`month`. Existing reports of the month are
+    updated in place. Returns the number of reports written.
+    """
+    start, end = month_bounds(year, month)
+    served = dict(
+        DailyMealRollup.objects.filter(day__gte=start.date(), day__lt=end.date())
+        .values('meal_id').annotate(total=Sum('portions')).values_list('meal_id', 'total')
+    )
+    meal_ids = set(Meal.objects.filter(is_active=True).values_list('id', flat=True)) | served.keys()
+    estimates = estimate_portions(meal_ids, month_stock(start, end))
+    used = ingredients_used(start, end)
+    now = timezone.now()
+
+    reports = []
+    for meal_id in sorted(meal_ids):
+        possible = estimates.get(meal_id, 0)
+        portions_served = served.get(meal_id, 0)
+        reports.append(MonthlyReport(
+            meal_id=meal_id,
+            month_year=f"{year}-{month:02d}",
+            portions_served=portions_served,
+            portions_possible=possible,
+            discrepancy_rate=discrepancy_rate(possible, portions_served),
+            ingredients_used=used.get(meal_id, {}),
+            generated_at=now,
+            generated_by=user,
+        ))
+    MonthlyReport.objects.bulk_create(
+        reports,
+        update_conflicts=True,
+        unique_fields=['meal', 'month_year'],
+        update_fields=[
+            'portions_served', 'portions_possible', 'discrepancy_rate', 'ingredients_used',
+            'generated_at', 'generated_by',
+        ],
+    )
+    return len(reports)
@@ -0,0 +1,139 @@
+"""
+Report jobs: monthly report generation in the background.
+
+A ReportJob covers a range of months. Starting it fans the range out as a
+Celery chord with one chunk per month (reports.generation handles a month
+in a fixed number of queries, so months are the natural unit), run in
+parallel across workers; the chord's callback combines the chunk
+summaries into the job's stored result.
+
+Progress is stored on the job, for polling, and pushed to the "reports"
+websocket topic after every chunk.
+"""
+import re
+from celery import chord
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from realtime.broadcaster import publish
+from realtime.sequences import topic_message
+from .generation import generate_monthly_report
+from .models import MonthlyReport, ReportJob
+
+MONTH = re.compile(r'^(\d{4})-(0[1-9]|1[0-2])$')
+# Upper bound on the months of one job
+MAX_MONTHS = 120
+
+
+class ReportJobError(ValueError):
+    """Raised for a month range that cannot be turned into a job."""
+
+
+def parse_month(value):
+    match = MONTH.match(value) if isinstance(value, str) else None
+    if match is None:
+        raise ReportJobError(f"{value!r} is not a month (YYYY-MM)")
+    return int(match.group(1)), int(match.group(2))
+
+
+def month_range(start_month, end_month):
+    """Return [(year, month)] from `start_month` to `end_month` (YYYY-MM, inclusive)."""
+    year, month = parse_month(start_month)
+    end = parse_month(end_month)
+    if (year, month) > end:
+        raise ReportJobError("start_month is after end_month")
+    months = []
+    while (year, month) <= end:
+        if len(months) >= MAX_MONTHS:
+            raise ReportJobError(f"A job covers at most {MAX_MONTHS} months")
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def job_state(job):
+    return {
+        'id': job.id,
+        'start_month': job.start_month,
+        'end_month': job.end_month,
+        'status': job.status,
+        'chunks_done': job.chunks_done,
+        'chunks_total': job.chunks_total,
+        'error': job.error,
+    }
+
+
+def report_job_message(job_ids):
+    return [
+        ('reports', topic_message('reports', 'report_job', {'type': 'report_job', 'job': job_state(job)}))
+        for job in ReportJob.objects.filter(id__in=job_ids).order_by('id')
+    ]
+
+
+def notify_job(job_id):
+    publish('reports', 'report_job', [job_id], build=report_job_message)
+
+
+def create_job(start_month, end_month, user=None):
+    """
+    Create a job for the months from `start_month` to `end_month` and start
+    it once the current transaction commits. Raises ReportJobError for an
+    invalid range.
+    """
+    months = month_range(start_month, end_month)
+    job = ReportJob.objects.create(
+        start_month=start_month, end_month=end_month, chunks_total=len(months), created_by=user
+    )
+    # Workers must be able to read the job
+    transaction.on_commit(lambda: start_job(job.id, months))
+    return job
+
+
+def start_job(job_id, months):
+    from .tasks import generate_report_chunk, finish_report_job
+
+    chord(generate_report_chunk.s(job_id, year, month) for year, month in months)(finish_report_job.s(job_id))
+
+
+def run_chunk(job_id, year, month):
+    """Generate one month of a job and return its summary for finish_job()."""
+    month_year = f"{year}-{month:02d}"
+    ReportJob.objects.filter(pk=job_id, status=ReportJob.PENDING).update(
+        status=ReportJob.RUNNING, started_at=timezone.now()
+    )
+    job = ReportJob.objects.select_related('created_by').get(pk=job_id)
+    try:
+        with transaction.atomic():
+            count = generate_monthly_report(year, month, job.created_by)
+        totals = MonthlyReport.objects.filter(month_year=month_year).aggregate(
+            portions_served=Sum('portions_served'), portions_possible=Sum('portions_possible')
+        )
+        summary = {
+            'month': month_year,
+            'reports': count,
+            'portions_served': totals['portions_served'] or 0,
+            'portions_possible': totals['portions_possible'] or 0,
+        }
+    except Exception as e:  # noqa: BLE001 - recorded on the job; the chord still has to finish
+        summary = {'month': month_year, 'error': str(e)}
+    ReportJob.objects.filter(pk=job_id).update(chunks_done=F('chunks_done') + 1)
+    notify_job(job_id)
+    return summary
+
+
+def finish_job(job_id, summaries):
+    """Combine the chunk summaries into the job's result."""
+    months = sorted(summaries, key=lambda summary: summary['month'])
+    failed = [summary for summary in months if 'error' in summary]
+    ReportJob.objects.filter(pk=job_id).update(
+        status=ReportJob.FAILED if failed else ReportJob.DONE,
+        error="; ".join(f"{summary['month']}: {summary['error']}" for summary in failed) or None,
+        result={
+            'months': months,
+            'reports': sum(summary.get('reports', 0) for summary in months),
+            'portions_served': sum(summary.get('portions_served', 0) for summary in months),
+            'portions_possible': sum(summary.get('portions_possible', 0) for summary in months),
+        },
+        finished_at=timezone.now(),
+    )
+    notify_job(job_id)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from config.params import to_date
+from reports.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily serving, usage and delivery rollups from the source tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day to rebuild (YYYY-MM-DD, default: the beginning)")
+        parser.add_argument('--end', help="Last day to rebuild (YYYY-MM-DD, default: today and later)")
+
+    def handle(self, *args, **options):
+        days = {}
+        for option in ('start', 'end'):
+            value = options[option]
+            days[option] = to_date(value) if value else None
+            if value and days[option] is None:
+                raise CommandError(f"--{option} must be a date in YYYY-MM-DD format")
+        meal_rows, product_rows = rebuild(days['start'], days['end'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {meal_rows} daily meal rollups and {product_rows} daily product rollups"
+        ))
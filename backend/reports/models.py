@@ -1,5 +1,6 @@
 from django.db import models
 from django.utils import timezone
+from inventory.models import Product
 from meals.models import Meal
 from users.models import User
 
@@ -11,11 +12,74 @@ class MonthlyReport(models.Model):
     discrepancy_rate = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     ingredients_used = models.JSONField(default=dict)  # Stage 4 talabi
     generated_at = models.DateTimeField(default=timezone.now)
-    generated_by = models.ForeignKey(User, on_delete=models.RESTRICT, related_name='monthly_reports_generated')
+    # Empty for reports generated by scheduled jobs
+    generated_by = models.ForeignKey(User, on_delete=models.RESTRICT, null=True, blank=True,
+                                     related_name='monthly_reports_generated')
 
     class Meta:
         db_table = 'MonthlyReport'
         unique_together = ('meal', 'month_year')
 
     def __str__(self):
-        return f"Report for {self.meal.name} ({self.month_year})"
\ No newline at end of file
+        return f"Report for {self.meal.name} ({self.month_year})"
+
+# Daily rollups, kept current by reports.rollups as servings, usages and
+# deliveries are written, so reports over a range read one row per day.
+class DailyMealRollup(models.Model):
+    day = models.DateField()
+    meal = models.ForeignKey(Meal, on_delete=models.CASCADE, related_name='daily_rollups')
+    portions = models.IntegerField(default=0)
+    servings = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'DailyMealRollup'
+        unique_together = ('day', 'meal')
+
+    def __str__(self):
+        return f"{self.meal.name} on {self.day}: {self.portions} portions"
+
+
+class DailyProductRollup(models.Model):
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_rollups')
+    quantity_used = models.IntegerField(default=0)
+    quantity_delivered = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'DailyProductRollup'
+        unique_together = ('day', 'product')
+
+    def __str__(self):
+        return f"{self.product.name} on {self.day}: {self.quantity_used} used, {self.quantity_delivered} delivered"
+
+
+class ReportJob(models.Model):
+    # Monthly reports for a range of months, generated by Celery (see reports.jobs)
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+    start_month = models.CharField(max_length=7)  # Format: YYYY-MM
+    end_month = models.CharField(max_length=7)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    chunks_total = models.IntegerField(default=0)
+    chunks_done = models.IntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='report_jobs')
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'ReportJob'
+
+    def __str__(self):
+        return f"Reports {self.start_month}..{self.end_month} ({self.status})"
@@ -0,0 +1,108 @@
+"""
+Daily rollups of servings, ingredient usage and deliveries.
+
+DailyMealRollup holds portions and servings per (day, meal) and
+DailyProductRollup the quantity used and delivered per (day, product), by
+local date. They are updated incrementally in the transaction that writes
+the source rows: reports.signals handles single-row saves and deletes, and
+bulk writers (operations.serving) call add_servings(). Each update is one
+INSERT ... ON CONFLICT DO UPDATE that adds to the stored totals, so
+concurrent writers never lose an increment.
+
+rebuild() recomputes them from the source tables (see the
+rebuild_report_rollups command).
+"""
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from inventory.models import DeliveryLog
+from operations.models import MealServing, IngredientUsage
+from .models import DailyMealRollup, DailyProductRollup
+
+
+def local_day(moment):
+    return timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+
+
+def _increment(table, key_columns, value_columns, totals):
+    """Add `totals` ({key tuple: value tuple}) to `table` in one statement."""
+    totals = {key: values for key, values in totals.items() if any(values)}
+    if not totals:
+        return
+    columns = key_columns + value_columns
+    rows = ", ".join(["(" + ", ".join(["%s"] * len(columns)) + ")"] * len(totals))
+    updates = ", ".join(f'"{column}" = "{table}"."{column}" + EXCLUDED."{column}"' for column in value_columns)
+    sql = (
+        f'INSERT INTO "{table}" ({", ".join(columns)}) VALUES {rows} '
+        f'ON CONFLICT ({", ".join(key_columns)}) DO UPDATE SET {updates}'
+    )
+    params = [value for key, values in totals.items() for value in (*key, *values)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def add_meal_portions(rows):
+    """Add [(day, meal_id, portions, servings)] to DailyMealRollup."""
+    totals = {}
+    for day, meal_id, portions, servings in rows:
+        current = totals.get((day, meal_id), (0, 0))
+        totals[(day, meal_id)] = (current[0] + portions, current[1] + servings)
+    _increment(DailyMealRollup._meta.db_table, ['day', 'meal_id'], ['portions', 'servings'], totals)
+
+
+def add_product_quantities(rows):
+    """Add [(day, product_id, used, delivered)] to DailyProductRollup."""
+    totals = {}
+    for day, product_id, used, delivered in rows:
+        current = totals.get((day, product_id), (0, 0))
+        totals[(day, product_id)] = (current[0] + used, current[1] + delivered)
+    _increment(
+        DailyProductRollup._meta.db_table, ['day', 'product_id'], ['quantity_used', 'quantity_delivered'], totals
+    )
+
+
+def add_servings(meal_servings, usages):
+    """Count newly inserted MealServing and IngredientUsage rows (e.g. after bulk_create)."""
+    add_meal_portions([
+        (local_day(serving.served_at), serving.meal_id, serving.portion_count, 1) for serving in meal_servings
+    ])
+    add_product_quantities([
+        (local_day(usage.used_at), usage.product_id, usage.quantity_used, 0) for usage in usages
+    ])
+
+
+@transaction.atomic
+def rebuild(start=None, end=None):
+    """
+    Recompute the rollups of the days in [start, end] (dates, both optional)
+    from the source tables. Returns (meal rows, product rows) written.
+    """
+    def in_range(queryset, day_field):
+        if start is not None:
+            queryset = queryset.filter(**{f'{day_field}__gte': start})
+        if end is not None:
+            queryset = queryset.filter(**{f'{day_field}__lte': end})
+        return queryset
+
+    in_range(DailyMealRollup.objects.all(), 'day').delete()
+    in_range(DailyProductRollup.objects.all(), 'day').delete()
+
+    servings = in_range(MealServing.objects.annotate(day=TruncDate('served_at')), 'day')
+    meal_rows = DailyMealRollup.objects.bulk_create(
+        DailyMealRollup(day=row['day'], meal_id=row['meal_id'], portions=row['portions'], servings=row['servings'])
+        for row in servings.values('day', 'meal_id').annotate(portions=Sum('portion_count'), servings=Count('id'))
+    )
+
+    products = {}
+    usages = in_range(IngredientUsage.objects.annotate(day=TruncDate('used_at')), 'day')
+    for row in usages.values('day', 'product_id').annotate(total=Sum('quantity_used')):
+        products[(row['day'], row['product_id'])] = [row['total'], 0]
+    deliveries = in_range(DeliveryLog.objects.all(), 'delivery_date')
+    for row in deliveries.values('delivery_date', 'product_id').annotate(total=Sum('quantity_received')):
+        products.setdefault((row['delivery_date'], row['product_id']), [0, 0])[1] = row['total']
+    product_rows = DailyProductRollup.objects.bulk_create(
+        DailyProductRollup(day=day, product_id=product_id, quantity_used=used, quantity_delivered=delivered)
+        for (day, product_id), (used, delivered) in products.items()
+    )
+    return len(meal_rows), len(product_rows)
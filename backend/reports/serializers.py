@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import MonthlyReport
+from .models import MonthlyReport, ReportJob
+from .jobs import create_job, month_range, ReportJobError
 from meals.serializers import MealSerializer
 from users.serializers import UserSerializer
 
@@ -10,4 +11,26 @@ class MonthlyReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = MonthlyReport
         fields = ['id', 'meal', 'month_year', 'portions_served', 'portions_possible', 'discrepancy_rate', 'ingredients_used', 'generated_at', 'generated_by']
-        read_only_fields = ['generated_at']
\ No newline at end of file
+        read_only_fields = ['generated_at']
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    created_by = UserSerializer(read_only=True)
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = ['id', 'start_month', 'end_month', 'status', 'chunks_done', 'chunks_total', 'progress', 'result', 'error', 'created_by', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = ['status', 'chunks_done', 'chunks_total', 'result', 'error', 'created_at', 'started_at', 'finished_at']
+
+    def get_progress(self, obj):
+        return round(obj.chunks_done * 100 / obj.chunks_total) if obj.chunks_total else 0
+
+    def validate(self, attrs):
+        try:
+            month_range(attrs['start_month'], attrs['end_month'])
+        except ReportJobError as e:
+            raise serializers.ValidationError(str(e))
+        return attrs
+
+    def create(self, validated_data):
+        return create_job(validated_data['start_month'], validated_data['end_month'], validated_data.get('created_by'))
@@ -0,0 +1,58 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from inventory.models import DeliveryLog
+from operations.models import MealServing, IngredientUsage
+from .rollups import add_meal_portions, add_product_quantities, local_day
+
+# What one row of each model adds to the daily rollups, and where
+ROLLUPS = {
+    MealServing: (
+        add_meal_portions,
+        lambda serving: (local_day(serving.served_at), serving.meal_id, serving.portion_count, 1)
+    ),
+    IngredientUsage: (
+        add_product_quantities,
+        lambda usage: (local_day(usage.used_at), usage.product_id, usage.quantity_used, 0)
+    ),
+    DeliveryLog: (
+        add_product_quantities,
+        lambda delivery: (delivery.delivery_date, delivery.product_id, 0, delivery.quantity_received)
+    ),
+}
+
+
+def negated(row):
+    day, key, first, second = row
+    return day, key, -first, -second
+
+
+@receiver(pre_save, sender=MealServing)
+@receiver(pre_save, sender=IngredientUsage)
+@receiver(pre_save, sender=DeliveryLog)
+def remember_rollup_row(sender, instance, raw=False, **kwargs):
+    # An update moves the old contribution out before the new one goes in
+    instance._rollup_before = None
+    if not raw and instance.pk and not instance._state.adding:
+        instance._rollup_before = sender.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=MealServing)
+@receiver(post_save, sender=IngredientUsage)
+@receiver(post_save, sender=DeliveryLog)
+def rollup_saved_row(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    add, contribution = ROLLUPS[sender]
+    rows = [contribution(instance)]
+    before = getattr(instance, '_rollup_before', None)
+    if before is not None:
+        rows.append(negated(contribution(before)))
+    add(rows)
+
+
+@receiver(post_delete, sender=MealServing)
+@receiver(post_delete, sender=IngredientUsage)
+@receiver(post_delete, sender=DeliveryLog)
+def rollup_deleted_row(sender, instance, **kwargs):
+    add, contribution = ROLLUPS[sender]
+    add([negated(contribution(instance))])
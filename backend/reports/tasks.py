@@ -1,19 +1,31 @@
 from celery import shared_task
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from realtime.broadcaster import publish
+from realtime.sequences import sequenced_message
 from django.utils import timezone
-from reports.views import MonthlyReportViewSet
+from .jobs import create_job, run_chunk, finish_job
+
+
+def dashboard_resync_message(ids):
+    # Not expressible as a delta; clients re-fetch the dashboard snapshot
+    return sequenced_message("dashboard", "dashboard_update", {"type": "dashboard_delta", "kind": "resync"})
+
 
 @shared_task
-def generate_monthly_reports():
-    year = timezone.now().year
-    month = timezone.now().month
-    # Mimic a request object for the report generator, or adjust if your viewset expects different data
-    request = type('Request', (), {'data': {'year': year, 'month': month}})
-    MonthlyReportViewSet().generate_report(request)
+def generate_report_chunk(job_id, year, month):
+    return run_chunk(job_id, year, month)
+
+
+@shared_task
+def finish_report_job(summaries, job_id):
+    finish_job(job_id, summaries)
     # Notify dashboard group via WebSocket
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        "dashboard",
-        {"type": "dashboard_update"}
-    )
\ No newline at end of file
+    publish("dashboard", "resync", build=dashboard_resync_message)
+
+
+@shared_task
+def generate_monthly_reports():
+    # Runs on the 1st, so report the month that just ended
+    today = timezone.localdate()
+    year, month = (today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)
+    month_year = f"{year}-{month:02d}"
+    return create_job(month_year, month_year).id
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import MonthlyReportViewSet, IngredientUsageReportView
+from .views import MonthlyReportViewSet, ReportJobViewSet, IngredientUsageReportView, UsageAnalyticsView
 
 router = DefaultRouter()
 router.register(r'monthly-reports', MonthlyReportViewSet, basename='monthlyreport')
+router.register(r'report-jobs', ReportJobViewSet, basename='reportjob')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('ingredients-usage/', IngredientUsageReportView.as_view(), name='ingredient-usage-report'),
+    path('analytics/', UsageAnalyticsView.as_view(), name='usage-analytics'),
 ]
\ No newline at end of file
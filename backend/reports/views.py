@@ -1,16 +1,19 @@
 from rest_framework.views import APIView
-from rest_framework import viewsets, status
+from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
-from django.db.models import Sum, F
-from .models import MonthlyReport
-from .serializers import MonthlyReportSerializer
+from django.db.models import Sum, Q
+from django.db.models.functions import Coalesce
+from config.params import parse_date_param
+from .models import MonthlyReport, ReportJob
+from .serializers import MonthlyReportSerializer, ReportJobSerializer
+from .jobs import create_job, ReportJobError
+from .analytics import usage_series, AnalyticsError
+from .dashboard import dashboard_snapshot
 from users.permissions import IsAdminOrManager, IsAdminOnly, IsManagerOnly
-from meals.models import Meal, MealIngredient
-from operations.models import MealServing, IngredientUsage
-from inventory.models import Product, DeliveryLog
+from inventory.models import Product
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,36 +28,14 @@ class MonthlyReportViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'], url_path='generate')
     def generate_report(self, request):
-        # This is a basic example — you should adjust as needed!
-        month = request.data.get('month', timezone.now().month)
-        year = request.data.get('year', timezone.now().year)
-        for meal in Meal.objects.filter(is_active=True):
-            servings = MealServing.objects.filter(
-                meal=meal,
-                served_at__year=year,
-                served_at__month=month
-            )
-            # FIX: Use the correct field name 'portion_count' (not 'portions_served')
-            portions_served = servings.aggregate(total=Sum('portion_count'))['total'] or 0
-            # Calculate possible portions for the month (simplified)
-            meal_ingredients = MealIngredient.objects.filter(meal=meal)
-            possible_portions = min([
-                int(ingredient.product.total_weight // ingredient.quantity)
-                for ingredient in meal_ingredients if ingredient.quantity > 0
-            ]) if meal_ingredients.exists() else 0
-            discrepancy = (
-                ((possible_portions - portions_served) / possible_portions * 100)
-                if possible_portions > 0 else 0
-            )
-            MonthlyReport.objects.create(
-                meal=meal,
-                month_year=f"{year}-{month:02d}",
-                portions_served=portions_served,
-                portions_possible=possible_portions,
-                discrepancy_rate=discrepancy,
-                generated_by=request.user
-            )
-        return Response({"status": "Report generated"}, status=200)
+        # Runs as a one-month report job; poll report-jobs/<id>/ or subscribe to "reports" for the result
+        month = int(request.data.get('month', timezone.now().month))
+        year = int(request.data.get('year', timezone.now().year))
+        try:
+            job = create_job(f"{year}-{month:02d}", f"{year}-{month:02d}", request.user)
+        except ReportJobError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(ReportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
     @action(detail=False, methods=['get'], url_path='summary')
     def monthly_summary(self, request):
@@ -64,95 +45,85 @@ class MonthlyReportViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='dashboard')
     def dashboard(self, request):
         logger.info(f"Dashboard request by user: {request.user.username}, role: {request.user.role.name}")
-        year = int(request.query_params.get('year', timezone.now().year))
-        month = int(request.query_params.get('month', timezone.now().month))
-        month_year = f"{year}-{month:02d}"
-
-        # --- 1. Available Portions ---
-        available_portions = []
-        meals = Meal.objects.filter(is_active=True)
-        for meal in meals:
-            ingredients = MealIngredient.objects.filter(meal=meal)
-            portion_estimates = []
-            for ingredient in ingredients:
-                # Avoid division by zero
-                if ingredient.quantity > 0:
-                    possible_portions = int(ingredient.product.total_weight // ingredient.quantity)
-                    portion_estimates.append(possible_portions)
-            max_portions = min(portion_estimates) if portion_estimates else 0
-            available_portions.append({
-                "meal": meal.name,
-                "portions": max_portions
-            })
-
-        # --- 2. Low Stock Ingredients ---
-        low_stock_products = Product.objects.filter(
-            total_weight__lt=F('threshold'),
-            threshold__isnull=False,
-            is_active=True
-        )
-        low_stock_ingredients = [
-            {
-                "id": product.id,
-                "name": product.name,
-                "total_weight": product.total_weight,
-                "threshold": product.threshold,
-                "unit": product.unit.abbreviation if product.unit else "N/A",
-            }
-            for product in low_stock_products
-        ]
+        return Response(dashboard_snapshot(), status=status.HTTP_200_OK)
 
-        # --- 3. Recent Activity ---
-        recent_servings = MealServing.objects.all().order_by('-served_at')[:5]
-        recent_activities = [
-            {
-                "meal": serving.meal.name if serving.meal else "Unknown",
-                "portion_count": serving.portion_count,
-                "served_by": serving.user.username if serving.user else "Unknown",
-                "served_at": serving.served_at,
-            }
-            for serving in recent_servings
-        ]
 
-        # --- Other summary cards ---
-        meal_count = meals.count()
-        active_meals = meals.filter(is_active=True).count()
-        products_count = Product.objects.count()
-
-        # Meals served today
-        today = timezone.now().date()
-        meals_served_today = MealServing.objects.filter(served_at__date=today).count()
+class ReportJobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin,
+                       viewsets.GenericViewSet):
+    """
+    Background report generation: POST {"start_month", "end_month"}
+    (YYYY-MM) enqueues a job and answers 202; GET it for its status,
+    progress and, once done, its result. See reports.jobs.
+    """
+    queryset = ReportJob.objects.select_related('created_by').order_by('-created_at')
+    serializer_class = ReportJobSerializer
+    permission_classes = [IsAuthenticated, IsAdminOrManager]
 
-        return Response({
-            # Main dashboard stats
-            "ingredient_count": products_count,
-            "active_meals": active_meals,
-            "low_stock_count": len(low_stock_ingredients),
-            "meals_served_today": meals_served_today,
-            # Dashboard widgets
-            "available_portions": available_portions,
-            "low_stock_ingredients": low_stock_ingredients,
-            "recent_activities": recent_activities,
-        }, status=status.HTTP_200_OK)
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(created_by=request.user)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
 
 class IngredientUsageReportView(APIView):
+    """
+    Real consumption against deliveries per active product, optionally over
+    ?start_date=&end_date= (YYYY-MM-DD, inclusive) and for one ?category=.
+    One grouped query over the daily rollups, whatever the number of products.
+    """
     permission_classes = [IsAuthenticated, IsAdminOrManager]
 
     def get(self, request):
+        days = Q()
+        for param, lookup in (('start_date', 'daily_rollups__day__gte'), ('end_date', 'daily_rollups__day__lte')):
+            day = parse_date_param(request, param)
+            if day is not None:
+                days &= Q(**{lookup: day})
+
         products = Product.objects.filter(is_active=True)
-        data = []
-        for product in products:
-            used = MealIngredient.objects.filter(product=product).aggregate(
-                total=Sum('quantity')
-            )['total'] or 0
-            delivered = DeliveryLog.objects.filter(product=product).aggregate(
-                total=Sum('quantity_received')
-            )['total'] or 0
-            data.append({
-                "name": product.name,
-                "used": round(used, 2),
-                "delivered": round(delivered, 2),
-                "unit": product.unit.abbreviation if product.unit else ""
-            })
-        return Response(data)
\ No newline at end of file
+        category = request.query_params.get('category')
+        if category:
+            if not category.isdigit():
+                return Response({"error": "category must be an id"}, status=status.HTTP_400_BAD_REQUEST)
+            products = products.filter(category_id=int(category))
+        rows = products.annotate(
+            used=Coalesce(Sum('daily_rollups__quantity_used', filter=days), 0),
+            delivered=Coalesce(Sum('daily_rollups__quantity_delivered', filter=days), 0),
+        ).order_by('name').values('id', 'name', 'used', 'delivered', 'unit__abbreviation')
+        data = [
+            {
+                "id": row['id'],
+                "name": row['name'],
+                "used": row['used'],
+                "delivered": row['delivered'],
+                "unit": row['unit__abbreviation'] or "",
+            }
+            for row in rows
+        ]
+        return Response(data)
+
+
+class UsageAnalyticsView(APIView):
+    """
+    Usage or portions served per day, week or month, for charts:
+    ?measure=usage|servings&bucket=day|week|month&by=product|meal|category
+    &start_date=&end_date= (YYYY-MM-DD; by default a recent window ending
+    today). Values come as parallel arrays aligned with "buckets"; see
+    reports.analytics.
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrManager]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            data = usage_series(
+                measure=params.get('measure', 'usage'),
+                bucket=params.get('bucket', 'day'),
+                by=params.get('by') or None,
+                start=parse_date_param(request, 'start_date'),
+                end=parse_date_param(request, 'end_date'),
+            )
+        except AnalyticsError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data, status=status.HTTP_200_OK)
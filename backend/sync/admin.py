@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import Tombstone
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ('id', 'model', 'object_id', 'deleted_at')
+    list_filter = ('model',)
+    readonly_fields = ('deleted_at',)
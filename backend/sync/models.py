@@ -0,0 +1,14 @@
+from django.db import models
+from django.utils import timezone
+
+class Tombstone(models.Model):
+    # Remembers deleted rows so delta-sync clients can drop them locally
+    model = models.CharField(max_length=50)  # product, meal, meal_ingredient, unit, product_category
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        db_table = 'Tombstone'
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} deleted at {self.deleted_at}"
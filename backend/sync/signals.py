@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from inventory.models import Product, Unit, ProductCategory
+from meals.models import Meal, MealIngredient
+from .models import Tombstone
+
+SYNCED_MODELS = {
+    Product: 'product',
+    Meal: 'meal',
+    MealIngredient: 'meal_ingredient',
+    Unit: 'unit',
+    ProductCategory: 'product_category',
+}
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Meal)
+@receiver(post_delete, sender=MealIngredient)
+@receiver(post_delete, sender=Unit)
+@receiver(post_delete, sender=ProductCategory)
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(model=SYNCED_MODELS[sender], object_id=instance.pk)
@@ -0,0 +1,63 @@
+from datetime import timedelta
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from inventory.models import Product, Unit, ProductCategory
+from meals.models import Meal, MealIngredient
+from config.params import parse_datetime_param
+from users.permissions import IsAdminOrManagerOrCook
+from .models import Tombstone
+
+# Rows written by transactions that were still open when the previous cursor
+# was issued can carry an earlier updated_at; re-sending a short window keeps
+# them from being skipped. Clients apply changes as upserts, so repeats are harmless.
+CURSOR_OVERLAP = timedelta(seconds=5)
+
+# Response key -> (queryset, flat fields). Foreign keys are sent as ids.
+SYNC_SOURCES = {
+    'products': (Product.objects.all(), [
+        'id', 'name', 'total_weight', 'unit_id', 'category_id', 'threshold', 'is_active', 'updated_at'
+    ]),
+    'meals': (Meal.objects.all(), ['id', 'name', 'category_id', 'is_active', 'updated_at']),
+    'meal_ingredients': (MealIngredient.objects.all(), ['id', 'meal_id', 'product_id', 'quantity', 'updated_at']),
+    'units': (Unit.objects.all(), ['id', 'name', 'abbreviation', 'updated_at']),
+    'product_categories': (ProductCategory.objects.all(), ['id', 'name', 'description', 'updated_at']),
+}
+
+TOMBSTONE_KEYS = {
+    'product': 'products',
+    'meal': 'meals',
+    'meal_ingredient': 'meal_ingredients',
+    'unit': 'units',
+    'product_category': 'product_categories',
+}
+
+
+class ChangesView(APIView):
+    """
+    GET /sync/changes/?since=<cursor> returns the catalog rows changed after
+    `cursor` plus the ids deleted since then. Without `since` the full catalog
+    is returned. Clients store the returned `cursor` for their next call.
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrManagerOrCook]
+
+    def get(self, request):
+        since = parse_datetime_param(request, 'since')
+        if since is not None:
+            since -= CURSOR_OVERLAP
+
+        cursor = timezone.now()
+        data = {"cursor": cursor, "full": since is None}
+        for key, (queryset, fields) in SYNC_SOURCES.items():
+            if since is not None:
+                queryset = queryset.filter(updated_at__gt=since)
+            data[key] = list(queryset.order_by('id').values(*fields))
+
+        deleted = {key: [] for key in TOMBSTONE_KEYS.values()}
+        if since is not None:
+            for model, object_id in Tombstone.objects.filter(deleted_at__gt=since).values_list('model', 'object_id'):
+                deleted[TOMBSTONE_KEYS[model]].append(object_id)
+        data["deleted"] = deleted
+        return Response(data, status=status.HTTP_200_OK)
@@ -0,0 +1,169 @@
+import threading
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.test import APIClient
+from users.models import User, Role
+from inventory.models import Product, Unit, Supplier, ProductCategory
+from meals.models import Meal, MealIngredient
+
+# --------- FIXTURES ---------
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings):
+    # A per-process cache instead of the Redis one from settings, emptied for every test since
+    # cached snapshots are keyed by sequences that restart with every test database
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}}
+    cache.clear()
+
+@pytest.fixture
+def eager_celery():
+    """Run Celery tasks inline; jobs still start on commit (see django_capture_on_commit_callbacks)."""
+    from config.celery import app
+
+    app.conf.task_always_eager = True
+    app.conf.task_eager_propagates = True
+    yield
+    app.conf.task_always_eager = False
+    app.conf.task_eager_propagates = False
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def admin_role(db):
+    return Role.objects.create(name="admin")
+
+@pytest.fixture
+def admin_user(db, admin_role):
+    return User.objects.create_user(
+        username="admin",
+        email="admin@example.com",
+        password="adminpass",
+        role=admin_role,
+        is_active=True
+    )
+
+@pytest.fixture
+def cook_role(db):
+    return Role.objects.create(name="cook")
+
+@pytest.fixture
+def cook_user(db, cook_role):
+    return User.objects.create_user(
+        username="cook",
+        email="cook@example.com",
+        password="cookpass",
+        role=cook_role,
+        is_active=True
+    )
+
+@pytest.fixture
+def manager_role(db):
+    return Role.objects.create(name="manager")
+
+@pytest.fixture
+def manager_user(db, manager_role):
+    return User.objects.create_user(
+        username="manager",
+        email="manager@example.com",
+        password="managerpass",
+        role=manager_role,
+        is_active=True
+    )
+
+@pytest.fixture
+def unit_gram(db):
+    return Unit.objects.create(name="Gram", abbreviation="g")
+
+@pytest.fixture
+def supplier(db):
+    return Supplier.objects.create(name="SupplierX", phone="12345678")
+
+@pytest.fixture
+def product_category(db):
+    return ProductCategory.objects.create(name="Vegetables")
+
+@pytest.fixture
+def product_beef(db, unit_gram, admin_user, product_category):
+    return Product.objects.create(
+        name="Beef", total_weight=1000, threshold=300, unit=unit_gram,
+        is_active=True, created_by=admin_user, category=product_category
+    )
+
+@pytest.fixture
+def product_potato(db, unit_gram, admin_user, product_category):
+    return Product.objects.create(
+        name="Potato", total_weight=500, threshold=100, unit=unit_gram,
+        is_active=True, created_by=admin_user, category=product_category
+    )
+
+@pytest.fixture
+def product_salt(db, unit_gram, admin_user, product_category):
+    return Product.objects.create(
+        name="Salt", total_weight=10, threshold=100, unit=unit_gram,
+        is_active=True, created_by=admin_user, category=product_category
+    )
+
+@pytest.fixture
+def meal_plov(db, admin_user, product_category):
+    return Meal.objects.create(
+        name="Plov", is_active=True, created_by=admin_user, category=product_category
+    )
+
+@pytest.fixture
+def meal_ingredient_beef(db, meal_plov, product_beef, admin_user):
+    return MealIngredient.objects.create(
+        meal=meal_plov, product=product_beef, quantity=200, created_by=admin_user
+    )
+
+@pytest.fixture
+def meal_ingredient_potato(db, meal_plov, product_potato, admin_user):
+    return MealIngredient.objects.create(
+        meal=meal_plov, product=product_potato, quantity=100, created_by=admin_user
+    )
+
+# --------- HELPERS ---------
+
+@pytest.fixture
+def serve_url():
+    def url(meal_id):
+        # meals and operations both register a 'mealserving' route name
+        return f'/operations/meal-servings/{meal_id}/serve/'
+    return url
+
+@pytest.fixture
+def run_concurrently():
+    def run(worker, count):
+        """Run `worker(i)` in `count` threads released at the same moment; returns their errors."""
+        barrier = threading.Barrier(count)
+        errors = []
+
+        def target(i):
+            try:
+                barrier.wait()
+                worker(i)
+            except Exception as e:  # noqa: BLE001 - collected and returned to the test
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+    return run
+
+@pytest.fixture
+def make_catalog():
+    def make(user, unit, count):
+        # Every tenth product is below its threshold
+        Product.objects.bulk_create([
+            Product(name=f"Product {i}", total_weight=50 if i % 10 == 0 else 500, threshold=100,
+                    unit=unit, created_by=user)
+            for i in range(count)
+        ], batch_size=5000)
+    return make
@@ -1,110 +1,7 @@
 import pytest
 from django.urls import reverse
-from rest_framework.test import APIClient
-from users.models import User, Role
-from inventory.models import Product, Unit, Supplier, ProductCategory
-from meals.models import Meal, MealIngredient
 from django.utils import timezone
 
-# --------- FIXTURES ---------
-
-@pytest.fixture
-def api_client():
-    return APIClient()
-
-@pytest.fixture
-def admin_role(db):
-    return Role.objects.create(name="admin")
-
-@pytest.fixture
-def admin_user(db, admin_role):
-    return User.objects.create_user(
-        username="admin",
-        email="admin@example.com",
-        password="adminpass",
-        role=admin_role,
-        is_active=True
-    )
-
-@pytest.fixture
-def cook_role(db):
-    return Role.objects.create(name="cook")
-
-@pytest.fixture
-def cook_user(db, cook_role):
-    return User.objects.create_user(
-        username="cook",
-        email="cook@example.com",
-        password="cookpass",
-        role=cook_role,
-        is_active=True
-    )
-
-@pytest.fixture
-def manager_role(db):
-    return Role.objects.create(name="manager")
-
-@pytest.fixture
-def manager_user(db, manager_role):
-    return User.objects.create_user(
-        username="manager",
-        email="manager@example.com",
-        password="managerpass",
-        role=manager_role,
-        is_active=True
-    )
-
-@pytest.fixture
-def unit_gram(db):
-    return Unit.objects.create(name="Gram", abbreviation="g")
-
-@pytest.fixture
-def supplier(db):
-    return Supplier.objects.create(name="SupplierX", phone="12345678")
-
-@pytest.fixture
-def product_category(db):
-    return ProductCategory.objects.create(name="Vegetables")
-
-@pytest.fixture
-def product_beef(db, unit_gram, admin_user, product_category):
-    return Product.objects.create(
-        name="Beef", total_weight=1000, threshold=300, unit=unit_gram,
-        is_active=True, created_by=admin_user, category=product_category
-    )
-
-@pytest.fixture
-def product_potato(db, unit_gram, admin_user, product_category):
-    return Product.objects.create(
-        name="Potato", total_weight=500, threshold=100, unit=unit_gram,
-        is_active=True, created_by=admin_user, category=product_category
-    )
-
-@pytest.fixture
-def product_salt(db, unit_gram, admin_user, product_category):
-    return Product.objects.create(
-        name="Salt", total_weight=10, threshold=100, unit=unit_gram,
-        is_active=True, created_by=admin_user, category=product_category
-    )
-
-@pytest.fixture
-def meal_plov(db, admin_user, product_category):
-    return Meal.objects.create(
-        name="Plov", is_active=True, created_by=admin_user, category=product_category
-    )
-
-@pytest.fixture
-def meal_ingredient_beef(db, meal_plov, product_beef, admin_user):
-    return MealIngredient.objects.create(
-        meal=meal_plov, product=product_beef, quantity=200, created_by=admin_user
-    )
-
-@pytest.fixture
-def meal_ingredient_potato(db, meal_plov, product_potato, admin_user):
-    return MealIngredient.objects.create(
-        meal=meal_plov, product=product_potato, quantity=100, created_by=admin_user
-    )
-
 # ------------- USER/ROLE TESTS -------------
 
 @pytest.mark.django_db
@@ -0,0 +1,160 @@
+from datetime import datetime, timedelta
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.urls import reverse
+from django.utils import timezone
+from inventory.ledger import ledger_balances, take_snapshots, find_discrepancies, tail_movements
+from inventory.models import Product, StockMovement, StockSnapshot
+from inventory.signals import stock_changed
+from inventory.stock import deduct_stock
+
+
+@pytest.mark.django_db
+def test_every_stock_change_is_in_the_ledger(api_client, admin_user, product_beef, supplier):
+    api_client.force_authenticate(admin_user)
+    resp = api_client.post(reverse('deliverylog-list'), {
+        "product_id": product_beef.id,
+        "quantity_received": 250,
+        "delivery_date": timezone.now().date(),
+        "supplier_id": supplier.id
+    })
+    assert resp.status_code == 201
+    deduct_stock({product_beef.id: 100}, admin_user)
+    product_beef.total_weight = 1100
+    product_beef.save()
+
+    movements = list(product_beef.movements.order_by('id').values_list('kind', 'quantity'))
+    print("LEDGER:", movements)
+    assert movements == [
+        (StockMovement.ADJUSTMENT, 1000),
+        (StockMovement.DELIVERY, 250),
+        (StockMovement.CONSUMPTION, -100),
+        (StockMovement.ADJUSTMENT, -50),
+    ]
+    assert product_beef.movements.get(kind=StockMovement.DELIVERY).delivery_id == resp.data['id']
+    assert ledger_balances()[product_beef.id] == 1100
+    assert find_discrepancies() == []
+
+
+@pytest.mark.django_db
+def test_balances_are_snapshot_plus_tail(product_beef):
+    now = timezone.now()
+    StockMovement.objects.filter(product=product_beef).update(created_at=now - timedelta(days=3))
+    assert take_snapshots(now - timedelta(days=2)) == 1
+    # Re-running for the same moment writes nothing
+    assert take_snapshots(now - timedelta(days=2)) == 0
+    # Movements older than the snapshot are not replayed again
+    movement = StockMovement.objects.create(product=product_beef, kind=StockMovement.CONSUMPTION, quantity=-200)
+    StockMovement.objects.filter(pk=movement.pk).update(created_at=now - timedelta(days=1))
+
+    assert ledger_balances(now - timedelta(days=4)).get(product_beef.id) is None
+    assert ledger_balances(now - timedelta(days=2))[product_beef.id] == 1000
+    assert ledger_balances(now)[product_beef.id] == 800
+    assert StockSnapshot.objects.get(product=product_beef).balance == 1000
+
+
+@pytest.mark.django_db
+def test_balance_reads_only_the_tail_after_the_snapshot(product_beef, product_potato, unit_gram, admin_user,
+                                                        product_category):
+    now = timezone.now()
+    StockMovement.objects.update(created_at=now - timedelta(days=20))
+    StockMovement.objects.bulk_create([
+        StockMovement(product=product_beef, kind=StockMovement.ADJUSTMENT, quantity=1,
+                      created_at=now - timedelta(days=10, minutes=i))
+        for i in range(200)
+    ])
+    take_snapshots(now - timedelta(days=5))
+    StockMovement.objects.create(product=product_beef, kind=StockMovement.CONSUMPTION, quantity=-300,
+                                 created_at=now - timedelta(days=1))
+    # No snapshot yet: its whole (short) history is the tail
+    lamb = Product.objects.create(name="Lamb", total_weight=40, unit=unit_gram, created_by=admin_user,
+                                  category=product_category)
+    now = timezone.now()
+
+    since = dict(StockSnapshot.objects.values_list('product_id', 'taken_at'))
+    tail = tail_movements(now, since, {product_beef.id, product_potato.id, lamb.id})
+    assert sorted(tail.values_list('product_id', 'quantity')) == [(product_beef.id, -300), (lamb.id, 40)]
+    balances = ledger_balances(now)
+    assert (balances[product_beef.id], balances[product_potato.id], balances[lamb.id]) == (900, 500, 40)
+
+    # The snapshot bounds the index range; it is not a per-row subquery filter
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        sql, params = tail.values('product_id').annotate(total=Sum('quantity')).query.sql_with_params()
+        cursor.execute(f"EXPLAIN {sql}", params)
+        plan = "\n".join(row[0] for row in cursor.fetchall())
+    print("TAIL PLAN:", plan)
+    assert "SubPlan" not in plan
+    assert "Index Cond" in plan and "created_at >" in plan
+
+
+@pytest.mark.django_db
+def test_verify_stock_ledger_repairs_drift(product_beef, product_potato, django_capture_on_commit_callbacks):
+    # A queryset update bypasses both the stock service and the signals
+    stale = timezone.now() - timedelta(hours=1)
+    Product.objects.filter(pk=product_beef.pk).update(total_weight=5, updated_at=stale)
+    assert [(product.id, balance) for product, balance in find_discrepancies()] == [(product_beef.id, 1000)]
+
+    changed = []
+    receiver = lambda sender, product_ids, **kwargs: changed.extend(product_ids)  # noqa: E731
+    stock_changed.connect(receiver)
+    try:
+        with django_capture_on_commit_callbacks(execute=True):
+            call_command('verify_stock_ledger', '--repair')
+    finally:
+        stock_changed.disconnect(receiver)
+    product_beef.refresh_from_db()
+    assert product_beef.total_weight == 1000
+    assert product_beef.updated_at > stale
+    assert changed == [product_beef.id]
+    assert find_discrepancies() == []
+
+
+@pytest.mark.django_db
+def test_stock_as_of_endpoint(api_client, manager_user, product_beef, product_potato):
+    api_client.force_authenticate(manager_user)
+    now = timezone.now()
+    StockMovement.objects.update(created_at=now - timedelta(days=10))
+    take_snapshots(now - timedelta(days=5))
+    movement = StockMovement.objects.create(product=product_beef, kind=StockMovement.CONSUMPTION, quantity=-300)
+    StockMovement.objects.filter(pk=movement.pk).update(created_at=now - timedelta(days=3))
+
+    url = reverse('product-stock-as-of')
+    at = (now - timedelta(days=4)).isoformat()
+    resp = api_client.get(url, {"at": at, "product": f"{product_beef.id},{product_potato.id}"})
+    print("STOCK AS OF:", resp.status_code, resp.data)
+    assert resp.status_code == 200
+    assert {row['id']: row['stock'] for row in resp.data['products']} == {product_beef.id: 1000, product_potato.id: 500}
+
+    resp = api_client.get(url, {"at": (now - timedelta(days=1)).date().isoformat(), "product": product_beef.id})
+    assert resp.data['products'][0]['stock'] == 700
+    resp = api_client.get(url, {"at": (now - timedelta(days=20)).isoformat()})
+    assert all(row['stock'] == 0 for row in resp.data['products'])
+    assert api_client.get(url, {"at": "last tuesday"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_generate_report_uses_stock_of_the_reported_month(api_client, admin_user, meal_plov, meal_ingredient_beef,
+                                                          meal_ingredient_potato, product_beef, eager_celery,
+                                                          django_capture_on_commit_callbacks):
+    from reports.models import MonthlyReport
+
+    api_client.force_authenticate(admin_user)
+    # Stock was delivered in September, and it was all used up by today
+    StockMovement.objects.update(kind=StockMovement.DELIVERY,
+                                 created_at=timezone.make_aware(datetime(2026, 9, 10)))
+    Product.objects.filter(pk=product_beef.pk).update(total_weight=0)
+
+    def generate(month):
+        with django_capture_on_commit_callbacks(execute=True):
+            return api_client.post(reverse('monthlyreport-generate-report'), {"year": 2026, "month": month})
+
+    assert generate(9).status_code == 202
+    # September started empty but received 1000g of beef and 500g of potatoes
+    assert MonthlyReport.objects.get(meal=meal_plov, month_year="2026-09").portions_possible == 5
+    generate(10)
+    assert MonthlyReport.objects.get(meal=meal_plov, month_year="2026-10").portions_possible == 5
+    generate(8)
+    assert MonthlyReport.objects.get(meal=meal_plov, month_year="2026-08").portions_possible == 0
@@ -0,0 +1,82 @@
+import random
+import pytest
+from django.urls import reverse
+from inventory.models import ProductCategory
+from meals.models import Meal, MealIngredient
+from meals.optimizer import solve
+
+
+def random_catalog(meal_count, product_count, ingredients_per_meal=8, seed=7):
+    rng = random.Random(seed)
+    stock = {product_id: rng.randint(0, 50000) for product_id in range(product_count)}
+    meals = {
+        meal_id: {
+            'category_id': meal_id % 5,
+            'ingredients': {
+                product_id: rng.choice([5, 10, 25, 50, 120, 0.5])
+                for product_id in rng.sample(range(product_count), ingredients_per_meal)
+            },
+        }
+        for meal_id in range(meal_count)
+    }
+    return meals, stock
+
+
+def assert_within_stock(meals, stock, portions):
+    used = {}
+    for meal_id, count in portions.items():
+        for product_id, quantity in meals[meal_id]['ingredients'].items():
+            used[product_id] = used.get(product_id, 0) + quantity * count
+    for product_id, amount in used.items():
+        assert amount <= stock[product_id] + 1e-6
+
+
+def test_solver_realistic_catalog_under_a_second():
+    meals, stock = random_catalog(500, 2000)
+    result = solve(meals, stock, time_limit=1.0)
+    print("OPTIMIZER:", result['total_portions'], "portions, bound", result['upper_bound'],
+          f"{result['elapsed'] * 1000:.0f} ms")
+    assert result['elapsed'] < 1.0
+    assert not result['timed_out']
+    assert_within_stock(meals, stock, result['portions'])
+    assert 0 < result['total_portions'] <= result['upper_bound']
+
+
+def test_solver_fills_category_minimums_first():
+    meals = {
+        1: {'category_id': 'soup', 'ingredients': {'beef': 10}},
+        2: {'category_id': 'main', 'ingredients': {'beef': 1}},
+    }
+    stock = {'beef': 100}
+    # Without a minimum the cheap main course takes all the beef
+    assert solve(meals, stock)['portions'] == {2: 100}
+    result = solve(meals, stock, category_minimums={'soup': 3})
+    assert result['portions'] == {1: 3, 2: 70}
+    assert result['unmet_minimums'] == {}
+    assert solve(meals, stock, category_minimums={'soup': 20})['unmet_minimums'] == {'soup': 10}
+
+
+def test_solver_respects_time_limit():
+    meals, stock = random_catalog(500, 2000)
+    result = solve(meals, stock, time_limit=0.0)
+    assert result['timed_out']
+    assert_within_stock(meals, stock, result['portions'])
+
+
+@pytest.mark.django_db
+def test_optimize_menu_endpoint(api_client, admin_user, meal_plov, meal_ingredient_beef, meal_ingredient_potato,
+                                product_beef, product_potato, product_category):
+    api_client.force_authenticate(admin_user)
+    soups = ProductCategory.objects.create(name="Soups")
+    soup = Meal.objects.create(name="Potato soup", created_by=admin_user, category=soups)
+    MealIngredient.objects.create(meal=soup, product=product_potato, quantity=50, created_by=admin_user)
+    resp = api_client.post(reverse('meal-optimize-menu'), {
+        "category_minimums": [{"category_id": soups.id, "portions": 2}]
+    }, format='json')
+    print("OPTIMIZE MENU:", resp.status_code, resp.data)
+    assert resp.status_code == 200
+    plan = {line['meal_id']: line['portions'] for line in resp.data['plan']}
+    assert plan[soup.id] >= 2
+    assert 200 * plan.get(meal_plov.id, 0) <= product_beef.total_weight
+    assert 100 * plan.get(meal_plov.id, 0) + 50 * plan[soup.id] <= product_potato.total_weight
+    assert resp.data['total_portions'] <= resp.data['upper_bound']
@@ -0,0 +1,191 @@
+import time
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from inventory.models import Product
+from meals.models import Meal, MealIngredient, MealAvailability
+from meals.portions import estimate_portions, cached_availability
+
+
+def make_meals(count, admin_user, unit, category, ingredients_per_meal=4):
+    products = Product.objects.bulk_create([
+        Product(name=f"Bench product {count}-{i}", total_weight=1000 + i, unit=unit,
+                created_by=admin_user, category=category)
+        for i in range(ingredients_per_meal * 2)
+    ])
+    meals = Meal.objects.bulk_create([
+        Meal(name=f"Bench meal {i}", created_by=admin_user, category=category)
+        for i in range(count)
+    ])
+    MealIngredient.objects.bulk_create([
+        MealIngredient(meal=meal, product=products[(i + j) % len(products)],
+                       quantity=10 + j, created_by=admin_user)
+        for i, meal in enumerate(meals)
+        for j in range(ingredients_per_meal)
+    ])
+    return meals
+
+
+@pytest.mark.django_db
+def test_estimate_portions_matches_recipe(meal_plov, meal_ingredient_beef, meal_ingredient_potato,
+                                          product_beef, product_potato, admin_user, product_category):
+    empty_meal = Meal.objects.create(name="Empty", created_by=admin_user, category=product_category)
+    estimates = estimate_portions([meal_plov.id, empty_meal.id])
+    assert estimates == {meal_plov.id: min(1000 // 200, 500 // 100)}
+    assert empty_meal.id not in estimates
+
+
+@pytest.mark.django_db
+def test_estimate_portions_benchmark(admin_user, unit_gram, product_category):
+    """Query count must not grow with the number of meals; latency is printed for comparison."""
+    results = {}
+    for count in (10, 100, 400):
+        Meal.objects.all().delete()
+        meals = make_meals(count, admin_user, unit_gram, product_category)
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            estimates = estimate_portions([meal.id for meal in meals])
+            elapsed = time.perf_counter() - started
+        assert len(estimates) == count
+        results[count] = (len(ctx.captured_queries), elapsed)
+        print(f"PORTIONS BENCHMARK: {count} meals -> {len(ctx.captured_queries)} queries, {elapsed * 1000:.1f} ms")
+    assert len({queries for queries, _ in results.values()}) == 1
+
+
+@pytest.mark.django_db
+def test_dashboard_query_count_is_flat(api_client, admin_user, unit_gram, product_category):
+    api_client.force_authenticate(admin_user)
+    url = reverse('monthlyreport-dashboard')
+    counts = []
+    for count in (5, 50):
+        Meal.objects.all().delete()
+        make_meals(count, admin_user, unit_gram, product_category)
+        # Nothing commits in this test, so drop the snapshot to measure a recomputation
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            resp = api_client.get(url)
+        assert resp.status_code == 200
+        assert len(resp.data['available_portions']) == count
+        counts.append(len(ctx.captured_queries))
+    print("DASHBOARD QUERIES:", counts)
+    assert counts[0] == counts[1]
+
+
+@pytest.mark.django_db
+def test_availability_cache_tracks_stock_and_recipe(meal_plov, meal_ingredient_beef, meal_ingredient_potato,
+                                                    product_beef, product_potato, admin_user, product_category):
+    other_meal = Meal.objects.create(name="Soup", created_by=admin_user, category=product_category)
+    MealIngredient.objects.create(meal=other_meal, product=product_potato, quantity=50, created_by=admin_user)
+    availability = MealAvailability.objects.get(meal=meal_plov)
+    assert (availability.max_portions, availability.bottleneck_id) == (5, product_beef.id)
+    soup_stamp = MealAvailability.objects.get(meal=other_meal).updated_at
+
+    product_beef.total_weight = 2000
+    product_beef.save()
+    availability.refresh_from_db()
+    assert (availability.max_portions, availability.bottleneck_id) == (5, product_potato.id)
+    # Soup does not use beef, so its cache row is left alone
+    assert MealAvailability.objects.get(meal=other_meal).updated_at == soup_stamp
+
+    meal_ingredient_potato.delete()
+    availability.refresh_from_db()
+    assert (availability.max_portions, availability.bottleneck_id) == (10, product_beef.id)
+
+
+@pytest.mark.django_db
+def test_moving_an_ingredient_refreshes_both_meals(api_client, admin_user, meal_plov, meal_ingredient_beef,
+                                                   meal_ingredient_potato, product_beef, product_potato,
+                                                   product_category):
+    product_beef.total_weight = 2000
+    product_beef.save()
+    assert MealAvailability.objects.get(meal=meal_plov).bottleneck_id == product_potato.id
+    salad = Meal.objects.create(name="Salad", created_by=admin_user, category=product_category)
+    api_client.force_authenticate(admin_user)
+    resp = api_client.patch(reverse('mealingredient-detail', args=[meal_ingredient_potato.id]), {"meal": salad.id})
+    assert resp.status_code == 200
+
+    # Plov lost its potatoes, Salad gained them
+    plov = MealAvailability.objects.get(meal=meal_plov)
+    assert (plov.max_portions, plov.bottleneck_id) == (10, product_beef.id)
+    salad_availability = MealAvailability.objects.get(meal=salad)
+    assert (salad_availability.max_portions, salad_availability.bottleneck_id) == (5, product_potato.id)
+
+
+@pytest.mark.django_db
+def test_cached_availability_reads_are_single_query(meal_plov, meal_ingredient_beef, product_beef):
+    with CaptureQueriesContext(connection) as ctx:
+        availability = cached_availability([meal_plov.id])
+    assert len(ctx.captured_queries) == 1
+    assert availability[meal_plov.id] == {
+        'max_portions': 5, 'bottleneck_id': product_beef.id, 'bottleneck': product_beef.name
+    }
+
+
+@pytest.mark.django_db
+def test_meal_delete_drops_availability(meal_plov, meal_ingredient_beef):
+    meal_plov.delete()
+    assert not MealAvailability.objects.exists()
+
+
+@pytest.mark.django_db
+def test_feasibility_accounts_for_shared_products(api_client, admin_user, meal_plov, meal_ingredient_beef,
+                                                  meal_ingredient_potato, product_beef, product_category):
+    api_client.force_authenticate(admin_user)
+    stew = Meal.objects.create(name="Stew", created_by=admin_user, category=product_category)
+    MealIngredient.objects.create(meal=stew, product=product_beef, quantity=100, created_by=admin_user)
+    url = reverse('meal-feasibility')
+
+    # Each line fits on its own (800g and 600g of 1000g beef) but not together
+    resp = api_client.post(url, {"lines": [
+        {"meal_id": meal_plov.id, "portions": 4},
+        {"meal_id": stew.id, "portions": 6},
+    ]}, format='json')
+    print("FEASIBILITY:", resp.status_code, resp.data)
+    assert resp.status_code == 200
+    assert resp.data['feasible'] is False
+    assert resp.data['shortfalls'] == [{
+        'product_id': product_beef.id, 'product': "Beef", 'unit': "g",
+        'required': 1400, 'available': 1000, 'shortfall': 400,
+    }]
+
+    resp = api_client.post(url, {"lines": [{"meal_id": stew.id, "portions": 6}]}, format='json')
+    assert resp.data['feasible'] is True
+
+    resp = api_client.post(url, {"lines": [{"meal_id": 999999, "portions": 1}]}, format='json')
+    assert resp.status_code == 400
+
+
+@pytest.mark.django_db
+def test_feasibility_rounds_like_serving(api_client, admin_user, product_salt, product_category):
+    api_client.force_authenticate(admin_user)
+    seasoning = Meal.objects.create(name="Seasoning", created_by=admin_user, category=product_category)
+    MealIngredient.objects.create(meal=seasoning, product=product_salt, quantity=2.5, created_by=admin_user)
+
+    # 4 x 2.5g is exactly the 10g in stock, but each serving takes a whole 3g
+    for count in (4, 3):
+        resp = api_client.post(reverse('meal-feasibility'), {
+            "lines": [{"meal_id": seasoning.id, "portions": 1}] * count
+        }, format='json')
+        assert resp.data['products'][0]['required'] == 3 * count
+        served = api_client.post('/operations/meal-servings/serve-batch/', {
+            "servings": [{"meal": seasoning.id, "portion_count": 1}] * count
+        }, format='json')
+        assert resp.data['feasible'] is (served.status_code < 300) is (count == 3)
+
+
+@pytest.mark.django_db
+def test_feasibility_query_count_is_flat(api_client, admin_user, unit_gram, product_category):
+    api_client.force_authenticate(admin_user)
+    meals = make_meals(300, admin_user, unit_gram, product_category)
+    url = reverse('meal-feasibility')
+    counts = []
+    for size in (3, 300):
+        lines = [{"meal_id": meal.id, "portions": 1} for meal in meals[:size]]
+        with CaptureQueriesContext(connection) as ctx:
+            resp = api_client.post(url, {"lines": lines}, format='json')
+        assert resp.status_code == 200
+        counts.append(len(ctx.captured_queries))
+    print("FEASIBILITY QUERIES:", counts)
+    assert counts[0] == counts[1]
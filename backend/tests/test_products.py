@@ -0,0 +1,102 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from inventory.models import Product
+from realtime.sequences import next_sequence
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('count', [30, 50000])
+def test_product_list_is_paginated(api_client, admin_user, unit_gram, count, make_catalog):
+    api_client.force_authenticate(admin_user)
+    make_catalog(admin_user, unit_gram, count)
+    url = reverse('product-list')
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get(url)
+    print("PRODUCT LIST:", count, "products,", len(ctx.captured_queries), "queries,", len(resp.content), "bytes")
+    assert resp.status_code == 200
+    assert resp.data['count'] == count
+    assert len(resp.data['results']) == 20
+    assert resp.data['next'] is not None
+    assert 'warnings' not in resp.data
+    # sequence + count + page, whatever the catalog size
+    assert len(ctx.captured_queries) == 3
+    assert [p['below_threshold'] for p in resp.data['results'][:2]] == [True, False]
+
+    resp = api_client.get(url, {"below_threshold": "true", "page_size": 500})
+    assert resp.data['count'] == count // 10
+    assert len(resp.data['results']) == min(count // 10, 500)
+    assert all(p['below_threshold'] for p in resp.data['results'])
+    assert api_client.get(url, {"below_threshold": "false"}).data['count'] == count - count // 10
+
+
+@pytest.mark.django_db
+def test_product_list_search(api_client, cook_user, product_beef, product_potato):
+    api_client.force_authenticate(cook_user)
+    resp = api_client.get(reverse('product-list'), {"search": "pot"})
+    assert resp.status_code == 200
+    assert [p['name'] for p in resp.data['results']] == ["Potato"]
+
+
+@pytest.mark.django_db
+def test_product_list_carries_the_inventory_sequence(api_client, cook_user, product_beef):
+    api_client.force_authenticate(cook_user)
+    url = reverse('product-list')
+    assert api_client.get(url).data['sequence'] == 0
+    # As sending an inventory delta does
+    sequence = next_sequence('inventory')
+    assert api_client.get(url).data['sequence'] == sequence
+
+
+@pytest.mark.django_db
+def test_product_lookup_is_one_light_query(api_client, admin_user, unit_gram, make_catalog):
+    api_client.force_authenticate(admin_user)
+    make_catalog(admin_user, unit_gram, 2000)
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get(reverse('product-lookup'))
+    assert resp.status_code == 200
+    assert len(ctx.captured_queries) == 1
+    assert len(resp.data) == 2000
+    assert resp.data[0] == {"id": resp.data[0]['id'], "name": "Product 0", "unit_abbreviation": unit_gram.abbreviation}
+
+
+@pytest.mark.django_db
+def test_product_warnings_endpoint(api_client, cook_user, product_beef, product_potato):
+    api_client.force_authenticate(cook_user)
+    Product.objects.filter(pk=product_beef.pk).update(total_weight=100)
+    resp = api_client.get(reverse('product-warnings'))
+    print("PRODUCT WARNINGS:", resp.status_code, resp.data)
+    assert resp.status_code == 200
+    assert resp.data == {'count': 1, 'warnings': ["Warning: Beef is below threshold (100/300)"]}
+
+
+@pytest.mark.django_db
+def test_low_stock_reads_use_partial_index(product_beef, product_potato, product_salt):
+    from inventory.low_stock import low_stock_products, low_stock_rows
+
+    Product.objects.filter(pk=product_beef.pk).update(total_weight=100)
+    with CaptureQueriesContext(connection) as ctx:
+        rows = low_stock_rows()
+    assert len(ctx.captured_queries) == 1
+    assert [(row["name"], row["unit_abbreviation"]) for row in rows] == [("Beef", "g"), ("Salt", "g")]
+
+    with connection.cursor() as cursor:
+        # The test tables are tiny, so make the planner show which index it can use
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = low_stock_products().explain()
+    print("LOW STOCK PLAN:", plan)
+    assert 'product_low_stock_idx' in plan
+
+
+@pytest.mark.django_db
+def test_low_stock_alerts_endpoint(api_client, manager_user, product_beef, product_potato):
+    api_client.force_authenticate(manager_user)
+    Product.objects.filter(pk=product_beef.pk).update(total_weight=100)
+    Product.objects.filter(pk=product_potato.pk).update(threshold=600, is_active=False)
+    resp = api_client.get(reverse('product-low-stock-alerts'))
+    print("LOW STOCK ALERTS:", resp.status_code, resp.data)
+    assert resp.status_code == 200
+    assert [(alert['product'], alert['unit']) for alert in resp.data['low_stock_alerts']] == [("Beef", "g")]
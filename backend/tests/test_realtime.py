@@ -0,0 +1,326 @@
+import json
+import os
+import subprocess
+import sys
+import asyncio
+import time
+import pytest
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core.management import call_command
+from django.db import transaction
+from django.db.backends.utils import CursorWrapper
+from rest_framework_simplejwt.tokens import AccessToken
+from config.asgi import application
+from django.urls import reverse
+from inventory.models import Product, StockMovement
+from meals.models import Meal
+from realtime import broadcaster
+
+
+@pytest.fixture
+def in_memory_channel_layer(settings):
+    settings.CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+    # The in-memory layer only works on the event loop of the consumers
+    settings.REALTIME_BROADCAST_INLINE = True
+
+
+@pytest.fixture
+def count_queries(monkeypatch):
+    """Count SQL statements from every thread, including database_sync_to_async workers."""
+    executed = []
+    execute = CursorWrapper.execute
+
+    def counting_execute(self, sql, params=None):
+        executed.append(sql)
+        return execute(self, sql, params)
+
+    monkeypatch.setattr(CursorWrapper, 'execute', counting_execute)
+    return executed
+
+
+def connect_to(path):
+    # Through the whole ASGI stack, including origin checks and JWT middleware
+    return WebsocketCommunicator(application, path, headers=[(b'origin', b'http://localhost')])
+
+
+def broadcast_to_clients(user, product, client_count, executed):
+    """Connect `client_count` inventory sockets, change stock once and time the fan-out."""
+    token = str(AccessToken.for_user(user))
+
+    async def run():
+        clients = [connect_to(f"/ws/inventory/?token={token}") for _ in range(client_count)]
+        for client in clients:
+            connected, _ = await client.connect()
+            assert connected
+        executed.clear()
+        started = time.perf_counter()
+        product.total_weight = 100
+        await database_sync_to_async(product.save)()
+        messages = [await client.receive_json_from(timeout=5) for client in clients]
+        elapsed = time.perf_counter() - started
+        queries = len(executed)
+        for client in clients:
+            await client.disconnect()
+        return messages, queries, elapsed
+
+    return async_to_sync(run)()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_inventory_fan_out_cost_is_independent_of_clients(in_memory_channel_layer, count_queries,
+                                                          admin_user, product_beef):
+    results = {}
+    for client_count in (1, 50):
+        Product.objects.filter(pk=product_beef.pk).update(total_weight=1000)
+        product_beef.refresh_from_db()
+        messages, queries, elapsed = broadcast_to_clients(admin_user, product_beef, client_count, count_queries)
+        results[client_count] = queries
+        print(f"INVENTORY FAN-OUT: {client_count} clients, {queries} queries, {elapsed * 1000:.1f} ms")
+        assert len(messages) == client_count
+        assert all(message == messages[0] for message in messages)
+        assert messages[0]["type"] == "inventory_update"
+        assert [(p["id"], p["total_weight"], p["below_threshold"]) for p in messages[0]["products"]] == [
+            (product_beef.id, 100, True)
+        ]
+        assert messages[0]["low_stock"] == [{"name": "Beef", "total_weight": 100, "unit": "g"}]
+    assert results[1] == results[50]
+
+
+@pytest.fixture
+def delivered(monkeypatch):
+    """Record what the broadcaster sends instead of going through a channel layer."""
+    # Let messages queued by earlier tests go out first
+    broadcaster.wait_until_sent()
+    sent = []
+    monkeypatch.setattr(broadcaster, '_deliver', lambda run, group, message: sent.append((group, message)))
+    broadcaster.reset_metrics()
+    return sent
+
+
+# Transactional, so that commits really happen and trigger the flush
+@pytest.mark.django_db(transaction=True)
+def test_serving_sends_one_message_per_group(settings, api_client, cook_user, meal_plov, meal_ingredient_beef,
+                                             meal_ingredient_potato, delivered):
+    settings.REALTIME_BROADCAST_INLINE = True
+    api_client.force_authenticate(cook_user)
+    resp = api_client.post('/meals/meal-servings/', {"meal": meal_plov.id, "portions_served": 2})
+    assert resp.status_code == 201
+    print("SERVING BROADCAST:", delivered, broadcaster.metrics())
+    # Stock and availability deltas for the dashboard, one message each for the meals and inventory sockets
+    # and one for the meal's own topic
+    assert sorted(group for group, _message in delivered) == [
+        'dashboard', 'dashboard', 'inventory', f'meal.{meal_plov.id}', 'meals'
+    ]
+    meals_update = json.loads(dict(delivered)['meals']['text'])
+    assert [(meal['meal_id'], meal['max_portions']) for meal in meals_update['data']['meals']] == [(meal_plov.id, 3)]
+    metrics = broadcaster.metrics()
+    assert metrics['sent'] == 5
+    assert metrics['coalesced'] == metrics['published'] - 5
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rolled_back_publishes_are_discarded(settings, product_beef, delivered):
+    settings.REALTIME_BROADCAST_INLINE = True
+    try:
+        with transaction.atomic():
+            product_beef.total_weight = 10
+            product_beef.save()
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert delivered == []
+    with transaction.atomic():
+        product_beef.name = "Lamb"
+        product_beef.save()
+        assert delivered == []
+    assert sorted(group for group, _message in delivered) == ['dashboard', 'inventory']
+
+    # A rolled back savepoint drops the batch it started; later publishes still flush on commit
+    delivered.clear()
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                product_beef.total_weight = 20
+                product_beef.save()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        product_beef.name = "Mutton"
+        product_beef.save()
+        assert delivered == []
+    assert sorted(group for group, _message in delivered) == ['dashboard', 'inventory']
+
+
+def test_publish_does_not_wait_for_the_channel_layer(monkeypatch):
+    class SlowLayer:
+        async def group_send(self, group, message):
+            await asyncio.sleep(0.3)
+            received.append(group)
+
+    received = []
+    monkeypatch.setattr(broadcaster, 'get_channel_layer', lambda: SlowLayer())
+    started = time.perf_counter()
+    for _ in range(3):
+        broadcaster.publish('dashboard', 'dashboard_update')
+    elapsed = time.perf_counter() - started
+    print(f"PUBLISH: {elapsed * 1000:.2f} ms")
+    assert elapsed < 0.1
+    broadcaster.wait_until_sent()
+    assert received == ['dashboard'] * 3
+
+
+EXITING_PUBLISHER = """
+import asyncio, django
+django.setup()
+from realtime import broadcaster
+
+class SlowLayer:
+    async def group_send(self, group, message):
+        await asyncio.sleep(0.3)
+        print("delivered", group, flush=True)
+
+broadcaster.get_channel_layer = lambda: SlowLayer()
+broadcaster.publish("dashboard", "resync")
+"""
+
+
+def test_exiting_process_sends_queued_messages(settings):
+    # A one-off command publishes in autocommit and exits right away
+    result = subprocess.run([sys.executable, "-c", EXITING_PUBLISHER], capture_output=True, text=True, timeout=60,
+                            cwd=settings.BASE_DIR, env={**os.environ, "DJANGO_SETTINGS_MODULE": "config.settings"})
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines() == ["delivered dashboard"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_dashboard_deltas_follow_the_snapshot(settings, api_client, admin_user, meal_plov, meal_ingredient_beef,
+                                              meal_ingredient_potato, delivered, serve_url):
+    settings.REALTIME_BROADCAST_INLINE = True
+    api_client.force_authenticate(admin_user)
+    snapshot = api_client.get(reverse('monthlyreport-dashboard')).data
+    resp = api_client.post(serve_url(meal_plov.id), {"portion_count": 2})
+    assert resp.status_code == 200
+
+    deltas = [json.loads(message['text']) for group, message in delivered if group == 'dashboard']
+    print("DASHBOARD DELTAS:", deltas)
+    # Numbered right after the snapshot, with no gap
+    assert [delta['sequence'] for delta in deltas] == [snapshot['sequence'] + 1, snapshot['sequence'] + 2,
+                                                       snapshot['sequence'] + 3]
+    deltas = {delta['kind']: delta for delta in deltas}
+    assert [p['total_weight'] for p in deltas['stock']['products']] == [600, 300]
+    assert deltas['availability']['meals'][0]['portions'] == 3
+    assert deltas['activity']['servings'][0]['portion_count'] == 2
+    assert deltas['activity']['meals_served_today'] == 1
+    assert api_client.get(reverse('monthlyreport-dashboard')).data['sequence'] == snapshot['sequence'] + 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_multiplexed_socket_subscriptions(in_memory_channel_layer, admin_user, cook_user, meal_plov,
+                                          meal_ingredient_beef, meal_ingredient_potato, product_beef):
+    admin_token = str(AccessToken.for_user(admin_user))
+    cook_token = str(AccessToken.for_user(cook_user))
+
+    async def run():
+        anonymous = connect_to("/ws/")
+        connected, _ = await anonymous.connect()
+        assert not connected
+        dashboard = connect_to(f"/ws/dashboard/?token={cook_token}")
+        connected, _ = await dashboard.connect()
+        assert not connected
+
+        cook = connect_to(f"/ws/?token={cook_token}")
+        assert (await cook.connect())[0]
+        await cook.send_json_to({"action": "subscribe", "topic": "dashboard"})
+        assert (await cook.receive_json_from())['error'] == "Not allowed"
+        await cook.send_json_to({"action": "subscribe", "topic": "meal:abc"})
+        assert (await cook.receive_json_from())['error'] == "Unknown topic"
+        await cook.disconnect()
+
+        client = connect_to(f"/ws/?token={admin_token}")
+        assert (await client.connect())[0]
+        for topic in ("dashboard", "inventory", f"meal:{meal_plov.id}"):
+            await client.send_json_to({"action": "subscribe", "topic": topic})
+            reply = await client.receive_json_from()
+            assert (reply['type'], reply['topic']) == ("subscribed", topic)
+
+        product_beef.total_weight = 400
+        await database_sync_to_async(product_beef.save)()
+        received = [await client.receive_json_from(timeout=5) for _ in range(4)]
+        print("MULTIPLEXED:", received)
+        assert sorted(message['topic'] for message in received) == [
+            "dashboard", "dashboard", "inventory", f"meal:{meal_plov.id}"
+        ]
+        meal_message = next(message for message in received if message['topic'] == f"meal:{meal_plov.id}")
+        assert meal_message['data']['max_portions'] == 2
+
+        await client.send_json_to({"action": "unsubscribe", "topic": "inventory"})
+        assert (await client.receive_json_from())['type'] == "unsubscribed"
+        product_beef.total_weight = 1000
+        await database_sync_to_async(product_beef.save)()
+        received = [await client.receive_json_from(timeout=5) for _ in range(3)]
+        assert "inventory" not in {message['topic'] for message in received}
+        assert await client.receive_nothing()
+        await client.disconnect()
+
+    async_to_sync(run)()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_meal_estimates_go_to_the_requester_only(in_memory_channel_layer, count_queries, cook_user, meal_plov,
+                                                 meal_ingredient_beef, meal_ingredient_potato, product_beef):
+    token = str(AccessToken.for_user(cook_user))
+
+    async def run():
+        watcher, bystander = connect_to(f"/ws/meals/?token={token}"), connect_to(f"/ws/meals/?token={token}")
+        assert (await watcher.connect())[0] and (await bystander.connect())[0]
+
+        await watcher.send_json_to({"meal_id": meal_plov.id})
+        estimate = await watcher.receive_json_from()
+        assert estimate == {"type": "meal_estimate",
+                            "data": {"meal_id": meal_plov.id, "max_portions": 5, "bottleneck": "Beef"}}
+        assert await bystander.receive_nothing()
+
+        # Asking again is answered from memory until the stock changes
+        count_queries.clear()
+        await watcher.send_json_to({"meal_id": meal_plov.id})
+        assert (await watcher.receive_json_from()) == estimate
+        assert count_queries == []
+
+        product_beef.total_weight = 400
+        await database_sync_to_async(product_beef.save)()
+        update = await watcher.receive_json_from(timeout=5)
+        print("MEAL WATCH:", update)
+        assert update["type"] == "meal_update"
+        assert update["data"]["max_portions"] == 2
+        assert await bystander.receive_nothing()
+
+        count_queries.clear()
+        await watcher.send_json_to({"meal_id": meal_plov.id})
+        assert (await watcher.receive_json_from())["data"]["max_portions"] == 2
+        assert count_queries == []
+
+        await watcher.send_json_to({"action": "unwatch", "meal_id": meal_plov.id})
+        product_beef.total_weight = 1000
+        await database_sync_to_async(product_beef.save)()
+        assert await watcher.receive_nothing()
+        await watcher.disconnect()
+        await bystander.disconnect()
+
+    async_to_sync(run)()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_websocket_benchmark_command(admin_user, meal_plov, meal_ingredient_beef, meal_ingredient_potato,
+                                     product_beef, capsys):
+    movements = set(StockMovement.objects.values_list('id', flat=True))
+    call_command('benchmark_websockets', '--clients', '30', '--changes', '3')
+    output = capsys.readouterr().out
+    print(output)
+    assert "Every client received every change" in output
+    assert "/ws/dashboard/" in output and "Event loop blocked" in output
+    # The run's product, meal and ledger rows are gone; the catalog is untouched
+    assert list(Product.objects.values_list('name', 'total_weight')) == [("Beef", 1000), ("Potato", 500)]
+    assert list(Meal.objects.values_list('name', flat=True)) == ["Plov"]
+    assert set(StockMovement.objects.values_list('id', flat=True)) == movements
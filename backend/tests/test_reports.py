@@ -0,0 +1,248 @@
+import json
+import time
+import pytest
+from datetime import date, timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from inventory.models import Product, ProductCategory
+from meals.models import Meal, MealIngredient
+from reports import dashboard, jobs
+from reports.generation import generate_monthly_report
+from reports.models import MonthlyReport, DailyMealRollup, DailyProductRollup, ReportJob
+from rest_framework.test import APIClient
+
+
+@pytest.mark.django_db
+def test_generate_report_is_idempotent_and_records_usage(api_client, admin_user, cook_user, meal_plov,
+                                                         meal_ingredient_beef, meal_ingredient_potato,
+                                                         product_beef, product_potato, eager_celery,
+                                                         django_capture_on_commit_callbacks, serve_url):
+    api_client.force_authenticate(cook_user)
+    assert api_client.post(serve_url(meal_plov.id), {"portion_count": 2}).status_code == 200
+    today = timezone.localdate()
+
+    api_client.force_authenticate(admin_user)
+    url = reverse('monthlyreport-generate-report')
+    for _ in range(2):
+        with django_capture_on_commit_callbacks(execute=True):
+            resp = api_client.post(url, {"year": today.year, "month": today.month})
+        print("GENERATE REPORT:", resp.status_code, resp.data)
+        assert resp.status_code == 202
+        job = ReportJob.objects.get(pk=resp.data['id'])
+        assert (job.status, job.chunks_done, job.created_by) == (ReportJob.DONE, 1, admin_user)
+
+    report = MonthlyReport.objects.get()
+    assert report.month_year == f"{today.year}-{today.month:02d}"
+    assert report.portions_served == 2
+    assert report.generated_by == admin_user
+    assert report.ingredients_used == {
+        str(product_beef.id): {"product": "Beef", "unit": "g", "quantity": 400},
+        str(product_potato.id): {"product": "Potato", "unit": "g", "quantity": 200},
+    }
+
+
+@pytest.mark.django_db
+def test_generate_report_query_count_is_independent_of_meals(admin_user, product_category, product_beef):
+    counts = []
+    for month, meal_count in ((1, 2), (2, 20)):
+        meals = Meal.objects.bulk_create([
+            Meal(name=f"Meal {month}-{i}", created_by=admin_user, category=product_category)
+            for i in range(meal_count)
+        ])
+        MealIngredient.objects.bulk_create([
+            MealIngredient(meal=meal, product=product_beef, quantity=10, created_by=admin_user) for meal in meals
+        ])
+        with CaptureQueriesContext(connection) as ctx:
+            written = generate_monthly_report(2026, month, admin_user)
+        assert written == MonthlyReport.objects.filter(month_year=f"2026-{month:02d}").count()
+        counts.append(len(ctx.captured_queries))
+    print("REPORT QUERIES:", counts)
+    assert counts[0] == counts[1]
+
+
+@pytest.mark.django_db
+def test_report_job_generates_months_in_chunks_and_stores_the_result(api_client, admin_user, cook_user, meal_plov,
+                                                                     meal_ingredient_beef, meal_ingredient_potato,
+                                                                     eager_celery, monkeypatch,
+                                                                     django_capture_on_commit_callbacks, serve_url):
+    notified = []
+    monkeypatch.setattr(jobs, 'publish', lambda group, event_type, ids, build: notified.append(build(ids)[0]))
+    api_client.force_authenticate(cook_user)
+    assert api_client.post(serve_url(meal_plov.id), {"portion_count": 2}).status_code == 200
+    today = timezone.localdate()
+    first = date(today.year - 1, today.month, 1)
+    start_month, end_month = first.strftime("%Y-%m"), today.strftime("%Y-%m")
+
+    url = reverse('reportjob-list')
+    assert api_client.post(url, {"start_month": start_month, "end_month": end_month}).status_code == 403
+    api_client.force_authenticate(admin_user)
+    for bad in ({"start_month": end_month, "end_month": start_month},
+                {"start_month": "2026-13", "end_month": "2027-01"},
+                {"start_month": "2000-01", "end_month": "2026-01"}):
+        assert api_client.post(url, bad).status_code == 400
+    assert not ReportJob.objects.exists()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = api_client.post(url, {"start_month": start_month, "end_month": end_month})
+    assert resp.status_code == 202
+    assert (resp.data['status'], resp.data['chunks_total'], resp.data['progress']) == (ReportJob.PENDING, 13, 0)
+
+    resp = api_client.get(reverse('reportjob-detail', args=[resp.data['id']]))
+    print("REPORT JOB:", resp.data['status'], resp.data['progress'], resp.data['result']['reports'])
+    assert (resp.data['status'], resp.data['chunks_done'], resp.data['progress']) == (ReportJob.DONE, 13, 100)
+    assert [month['month'] for month in resp.data['result']['months']][::12] == [start_month, end_month]
+    assert resp.data['result']['reports'] == 13 == MonthlyReport.objects.count()
+    assert resp.data['result']['portions_served'] == 2
+    assert resp.data['started_at'] is not None and resp.data['finished_at'] is not None
+
+    # One progress message per chunk, then the finished job, on the "reports" topic
+    assert len(notified) == 14
+    assert all(group == "reports" for group, message in notified)
+    progress = [json.loads(message['text'])['job'] for group, message in notified]
+    assert [job['chunks_done'] for job in progress[:13]] == list(range(1, 14))
+    assert progress[-1]['status'] == ReportJob.DONE
+
+
+@pytest.mark.django_db
+def test_ingredient_usage_report_compares_usage_and_deliveries(api_client, admin_user, product_beef,
+                                                               product_potato):
+    roots = ProductCategory.objects.create(name="Roots")
+    Product.objects.filter(pk=product_potato.pk).update(category=roots)
+    DailyProductRollup.objects.bulk_create([
+        DailyProductRollup(day=date(2026, 9, 1), product=product_beef, quantity_used=300, quantity_delivered=1000),
+        DailyProductRollup(day=date(2026, 9, 20), product=product_beef, quantity_used=200),
+        DailyProductRollup(day=date(2026, 10, 1), product=product_potato, quantity_used=50, quantity_delivered=80),
+    ])
+    api_client.force_authenticate(admin_user)
+    url = reverse('ingredient-usage-report')
+
+    resp = api_client.get(url)
+    print("INGREDIENT USAGE REPORT:", resp.data)
+    assert {row['name']: (row['used'], row['delivered'], row['unit']) for row in resp.data} == {
+        "Beef": (500, 1000, "g"), "Potato": (50, 80, "g")
+    }
+    resp = api_client.get(url, {"start_date": "2026-09-10", "end_date": "2026-09-30"})
+    assert {row['name']: (row['used'], row['delivered']) for row in resp.data} == {
+        "Beef": (200, 0), "Potato": (0, 0)
+    }
+    resp = api_client.get(url, {"category": roots.id})
+    assert [row['name'] for row in resp.data] == ["Potato"]
+    assert api_client.get(url, {"start_date": "September"}).status_code == 400
+    assert api_client.get(url, {"end_date": "2026-02-30"}).status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('count', [30, 5000])
+def test_ingredient_usage_report_is_one_query(api_client, admin_user, unit_gram, count, make_catalog):
+    make_catalog(admin_user, unit_gram, count)
+    start = date(2026, 9, 1)
+    DailyProductRollup.objects.bulk_create([
+        DailyProductRollup(day=start + timedelta(days=day), product_id=product_id, quantity_used=10,
+                           quantity_delivered=5)
+        for product_id in Product.objects.values_list('id', flat=True)
+        for day in range(3)
+    ], batch_size=5000)
+    api_client.force_authenticate(admin_user)
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get(reverse('ingredient-usage-report'), {"start_date": "2026-09-02"})
+    print("INGREDIENT USAGE REPORT:", count, "products,", len(ctx.captured_queries), "queries")
+    assert resp.status_code == 200
+    assert len(resp.data) == count
+    assert all((row['used'], row['delivered']) == (20, 10) for row in resp.data)
+    assert len(ctx.captured_queries) == 1
+
+
+@pytest.mark.django_db
+def test_usage_analytics_buckets_and_pivots(api_client, admin_user, cook_user, meal_plov, meal_ingredient_beef,
+                                            meal_ingredient_potato, product_beef, product_potato, serve_url):
+    DailyProductRollup.objects.bulk_create([
+        # Tuesday and Sunday of the week starting Monday 2026-09-07, then the next Monday
+        DailyProductRollup(day=date(2026, 9, 8), product=product_beef, quantity_used=100),
+        DailyProductRollup(day=date(2026, 9, 13), product=product_beef, quantity_used=50),
+        DailyProductRollup(day=date(2026, 9, 21), product=product_potato, quantity_used=30),
+    ])
+    DailyMealRollup.objects.bulk_create([
+        DailyMealRollup(day=date(2026, 9, 8), meal=meal_plov, portions=4, servings=2),
+        DailyMealRollup(day=date(2026, 10, 2), meal=meal_plov, portions=1, servings=1),
+    ])
+    api_client.force_authenticate(admin_user)
+    url = reverse('usage-analytics')
+
+    resp = api_client.get(url, {"bucket": "week", "by": "product",
+                                "start_date": "2026-09-07", "end_date": "2026-09-27"})
+    print("USAGE ANALYTICS:", resp.status_code, resp.data)
+    assert resp.status_code == 200
+    assert resp.data['buckets'] == [date(2026, 9, 7), date(2026, 9, 14), date(2026, 9, 21)]
+    assert [(series['name'], series['values']) for series in resp.data['series']] == [
+        ("Beef", [150, 0, 0]), ("Potato", [0, 0, 30])
+    ]
+
+    resp = api_client.get(url, {"measure": "servings", "bucket": "month", "by": "category",
+                                "start_date": "2026-09-01", "end_date": "2026-10-31"})
+    assert resp.data['buckets'] == [date(2026, 9, 1), date(2026, 10, 1)]
+    assert [series['values'] for series in resp.data['series']] == [[4, 1]]
+
+    # Usage per meal comes from the usage rows themselves
+    api_client.force_authenticate(cook_user)
+    assert api_client.post(serve_url(meal_plov.id), {"portion_count": 2}).status_code == 200
+    api_client.force_authenticate(admin_user)
+    today = timezone.localdate()
+    resp = api_client.get(url, {"by": "meal", "start_date": today.isoformat(), "end_date": today.isoformat()})
+    assert resp.data['buckets'] == [today]
+    assert resp.data['series'] == [{"id": meal_plov.id, "name": "Plov", "values": [600]}]
+
+    # Without dates, a recent window ending today
+    resp = api_client.get(url)
+    assert resp.data['buckets'] == [today - timedelta(days=days) for days in range(89, -1, -1)]
+    assert resp.data['series'][0]['values'][-1] == 600
+
+    assert api_client.get(url, {"measure": "servings", "by": "product"}).status_code == 400
+    assert api_client.get(url, {"bucket": "hour"}).status_code == 400
+    assert api_client.get(url, {"end_date": "2026-02-30"}).status_code == 400
+    # Too many buckets is refused before the grouped query runs
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get(url, {"start_date": "2000-01-01", "end_date": "2026-01-01"})
+    assert resp.status_code == 400
+    assert not any('DailyProductRollup' in query['sql'] for query in ctx.captured_queries)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_dashboard_snapshot_is_computed_once_per_change(admin_user, meal_plov, meal_ingredient_beef,
+                                                        meal_ingredient_potato, product_beef, monkeypatch,
+                                                        run_concurrently):
+    builds = []
+    build_dashboard = dashboard.build_dashboard
+
+    def counting_build(sequence):
+        builds.append(sequence)
+        # Slow enough for the other requests to arrive while it runs
+        time.sleep(0.2)
+        return build_dashboard(sequence)
+
+    monkeypatch.setattr(dashboard, 'build_dashboard', counting_build)
+    url = reverse('monthlyreport-dashboard')
+    responses = []
+
+    def load(i):
+        client = APIClient()
+        client.force_authenticate(admin_user)
+        resp = client.get(url)
+        assert resp.status_code == 200
+        responses.append(resp.data)
+
+    assert run_concurrently(load, 10) == []
+    print("DASHBOARD BUILDS:", builds)
+    assert len(builds) == 1
+    assert all(data == responses[0] for data in responses)
+    assert responses[0]['available_portions'][0]['portions'] == 5
+
+    # A stock change moves the dashboard to a new version
+    product_beef.total_weight = 400
+    product_beef.save()
+    assert run_concurrently(load, 10) == []
+    assert len(builds) == 2
+    assert responses[-1]['sequence'] > responses[0]['sequence']
+    assert responses[-1]['available_portions'][0]['portions'] == 2
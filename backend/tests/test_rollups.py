@@ -0,0 +1,78 @@
+import pytest
+from datetime import date
+from django.core.management import call_command, CommandError
+from django.utils import timezone
+from inventory.models import DeliveryLog
+from operations.models import MealServing, IngredientUsage
+from reports.models import DailyMealRollup, DailyProductRollup
+
+
+def rollups():
+    meals = {(row.day, row.meal_id): (row.portions, row.servings) for row in DailyMealRollup.objects.all()}
+    products = {
+        (row.day, row.product_id): (row.quantity_used, row.quantity_delivered)
+        for row in DailyProductRollup.objects.all()
+    }
+    return meals, products
+
+
+@pytest.mark.django_db
+def test_rollups_follow_servings_and_deliveries(api_client, admin_user, cook_user, meal_plov, meal_ingredient_beef,
+                                                meal_ingredient_potato, product_beef, product_potato, supplier,
+                                                serve_url):
+    today = timezone.localdate()
+    api_client.force_authenticate(cook_user)
+    assert api_client.post(serve_url(meal_plov.id), {"portion_count": 2}).status_code == 200
+    resp = api_client.post('/operations/meal-servings/serve-batch/', {"servings": [
+        {"meal": meal_plov.id, "portion_count": 1},
+        {"meal": meal_plov.id, "portion_count": 1, "served_at": "2026-03-02T09:00:00Z"},
+    ]}, format='json')
+    assert resp.status_code == 201
+    DeliveryLog.objects.create(product=product_beef, supplier=supplier, quantity_received=250,
+                               delivery_date=date(2026, 3, 2), received_by=admin_user)
+
+    meals, products = rollups()
+    print("ROLLUPS:", meals, products)
+    assert meals == {(today, meal_plov.id): (3, 2), (date(2026, 3, 2), meal_plov.id): (1, 1)}
+    assert products[(today, product_beef.id)] == (600, 0)
+    assert products[(date(2026, 3, 2), product_beef.id)] == (200, 250)
+
+    # Edits move the old amounts out, deletes take them away
+    serving = MealServing.objects.get(served_at__date=date(2026, 3, 2))
+    serving.portion_count = 4
+    serving.save()
+    IngredientUsage.objects.filter(meal_serving=serving, product=product_potato).delete()
+    assert rollups()[0][(date(2026, 3, 2), meal_plov.id)] == (4, 1)
+    assert rollups()[1][(date(2026, 3, 2), product_potato.id)] == (0, 0)
+
+    # A rebuild from the source tables agrees with the incremental totals
+    incremental = rollups()
+    call_command('rebuild_report_rollups')
+    rebuilt = rollups()
+    for totals in (incremental, rebuilt):
+        for table in totals:
+            for key in [key for key, values in table.items() if not any(values)]:
+                del table[key]
+    assert rebuilt == incremental
+
+    with pytest.raises(CommandError):
+        call_command('rebuild_report_rollups', '--start', '2026-02-30')
+
+
+@pytest.mark.django_db
+def test_usage_report_reads_rollups(api_client, admin_user, cook_user, meal_plov, meal_ingredient_beef,
+                                    meal_ingredient_potato, serve_url):
+    api_client.force_authenticate(cook_user)
+    assert api_client.post(serve_url(meal_plov.id), {"portion_count": 2}).status_code == 200
+    today = timezone.localdate().isoformat()
+    api_client.force_authenticate(admin_user)
+    url = '/operations/ingredient-usages/usage-report/'
+    resp = api_client.get(url, {"start_date": today, "end_date": today})
+    print("USAGE REPORT:", resp.status_code, resp.data)
+    assert resp.status_code == 200
+    assert resp.data['usage_data'] == [
+        {"product__name": "Beef", "total_used": 400}, {"product__name": "Potato", "total_used": 200}
+    ]
+    assert api_client.get(url, {"start_date": "2026-01-01", "end_date": "2026-01-31"}).data['usage_data'] == []
+    assert api_client.get(url, {"start_date": "yesterday", "end_date": today}).status_code == 400
+    assert api_client.get(url, {"start_date": "2026-02-30", "end_date": today}).status_code == 400
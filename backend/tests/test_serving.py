@@ -0,0 +1,151 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from inventory.models import Product
+from meals.models import Meal, MealIngredient
+from operations.models import MealServing, IngredientUsage
+
+
+@pytest.fixture
+def make_recipe(db, admin_user, unit_gram, product_category):
+    def make(name, ingredient_count):
+        meal = Meal.objects.create(name=name, created_by=admin_user, category=product_category)
+        products = Product.objects.bulk_create([
+            Product(name=f"{name} product {i}", total_weight=10000, unit=unit_gram, created_by=admin_user)
+            for i in range(ingredient_count)
+        ])
+        MealIngredient.objects.bulk_create([
+            MealIngredient(meal=meal, product=product, quantity=10, created_by=admin_user)
+            for product in products
+        ])
+        return meal
+    return make
+
+
+@pytest.mark.django_db
+def test_serve_meal_links_usages_to_serving(api_client, cook_user, meal_plov, meal_ingredient_beef,
+                                            meal_ingredient_potato, product_beef, product_potato, serve_url):
+    api_client.force_authenticate(cook_user)
+    resp = api_client.post(serve_url(meal_plov.id), {"portion_count": 2})
+    print("SERVE MEAL:", resp.status_code, resp.data)
+    assert resp.status_code == 200
+    serving = MealServing.objects.get()
+    assert serving.portion_count == 2
+    usages = {usage.product_id: usage.quantity_used for usage in IngredientUsage.objects.filter(meal_serving=serving)}
+    assert usages == {product_beef.id: 400, product_potato.id: 200}
+    product_beef.refresh_from_db()
+    assert product_beef.total_weight == 600
+
+
+@pytest.mark.django_db
+def test_serve_meal_insufficient_writes_nothing(api_client, cook_user, meal_plov, meal_ingredient_beef,
+                                                meal_ingredient_potato, product_beef, serve_url):
+    api_client.force_authenticate(cook_user)
+    resp = api_client.post(serve_url(meal_plov.id), {"portion_count": 6})
+    print("SERVE MEAL INSUFFICIENT:", resp.status_code, resp.data)
+    assert resp.status_code == 400
+    assert not MealServing.objects.exists()
+    assert not IngredientUsage.objects.exists()
+    product_beef.refresh_from_db()
+    assert product_beef.total_weight == 1000
+
+
+@pytest.mark.django_db
+def test_serve_meal_query_count_is_independent_of_recipe_size(api_client, cook_user, make_recipe, serve_url):
+    api_client.force_authenticate(cook_user)
+    counts = []
+    for name, size in (("Small", 2), ("Large", 15)):
+        meal = make_recipe(name, size)
+        with CaptureQueriesContext(connection) as ctx:
+            resp = api_client.post(serve_url(meal.id), {"portion_count": 1})
+        assert resp.status_code == 200
+        assert IngredientUsage.objects.filter(meal_serving__meal=meal).count() == size
+        counts.append(len(ctx.captured_queries))
+    print("SERVE QUERIES:", counts)
+    assert counts[0] == counts[1]
+
+
+@pytest.mark.django_db
+def test_serve_batch_deducts_aggregated_totals(api_client, cook_user, meal_plov, meal_ingredient_beef,
+                                               meal_ingredient_potato, product_beef, product_potato,
+                                               monkeypatch):
+    notified = []
+    monkeypatch.setattr('operations.serving.notify_meals', notified.append)
+    api_client.force_authenticate(cook_user)
+    resp = api_client.post('/operations/meal-servings/serve-batch/', {"servings": [
+        {"meal": meal_plov.id, "portion_count": 2, "notes": "Group A"},
+        {"meal": meal_plov.id, "portion_count": 3, "served_at": "2026-10-16T12:00:00Z"},
+    ]}, format='json')
+    print("SERVE BATCH:", resp.status_code, resp.data)
+    assert resp.status_code == 201
+    assert resp.data['portions'] == 5
+    # One notification for the whole batch
+    assert notified == [{meal_plov.id}]
+    assert MealServing.objects.count() == 2
+    assert IngredientUsage.objects.count() == 4
+    product_beef.refresh_from_db()
+    product_potato.refresh_from_db()
+    assert (product_beef.total_weight, product_potato.total_weight) == (0, 0)
+
+
+@pytest.mark.django_db
+def test_serve_batch_is_checked_as_a_whole(api_client, cook_user, meal_plov, meal_ingredient_beef,
+                                           meal_ingredient_potato, product_beef):
+    api_client.force_authenticate(cook_user)
+    # Each line fits on its own, together they need 1200g of beef
+    resp = api_client.post('/operations/meal-servings/serve-batch/', {"servings": [
+        {"meal": meal_plov.id, "portion_count": 3},
+        {"meal": meal_plov.id, "portion_count": 3},
+    ]}, format='json')
+    print("SERVE BATCH INSUFFICIENT:", resp.status_code, resp.data)
+    assert resp.status_code == 400
+    assert resp.data['shortages'][0]['product'] == "Beef"
+    assert not MealServing.objects.exists()
+    product_beef.refresh_from_db()
+    assert product_beef.total_weight == 1000
+
+
+@pytest.mark.django_db
+def test_serve_batch_query_count_is_independent_of_batch_size(api_client, cook_user, make_recipe):
+    api_client.force_authenticate(cook_user)
+    meals = [make_recipe(f"Meal {i}", 4) for i in range(20)]
+    counts = []
+    for size in (2, 20):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = api_client.post('/operations/meal-servings/serve-batch/', {"servings": [
+                {"meal": meal.id, "portion_count": 1} for meal in meals[:size]
+            ]}, format='json')
+        assert resp.status_code == 201
+        counts.append(len(ctx.captured_queries))
+    print("SERVE BATCH QUERIES:", counts)
+    assert counts[0] == counts[1]
+
+
+@pytest.mark.django_db
+def test_offline_sync_replays_idempotently(api_client, cook_user, meal_plov, meal_ingredient_beef,
+                                           meal_ingredient_potato, product_beef):
+    api_client.force_authenticate(cook_user)
+    url = '/operations/meal-servings/offline-sync/'
+    events = [
+        {"idempotency_key": "tablet-1-001", "meal": meal_plov.id, "portion_count": 2},
+        {"idempotency_key": "tablet-1-002", "meal": meal_plov.id, "portion_count": 2},
+        # Only 1 portion of stock is left by now
+        {"idempotency_key": "tablet-1-003", "meal": meal_plov.id, "portion_count": 2},
+        {"idempotency_key": "tablet-1-001", "meal": meal_plov.id, "portion_count": 2},
+        {"idempotency_key": "tablet-1-004", "meal": 999999, "portion_count": 1},
+    ]
+    resp = api_client.post(url, {"events": events}, format='json')
+    print("OFFLINE SYNC:", resp.status_code, resp.data)
+    assert resp.status_code == 200
+    statuses = [event['status'] for event in resp.data['events']]
+    assert statuses == ['applied', 'applied', 'rejected', 'duplicate', 'rejected']
+    assert resp.data['events'][3]['serving_id'] == resp.data['events'][0]['serving_id']
+    product_beef.refresh_from_db()
+    assert product_beef.total_weight == 200
+
+    # The tablet retries the whole queue after a dropped response
+    resp = api_client.post(url, {"events": events[:2]}, format='json')
+    assert [event['status'] for event in resp.data['events']] == ['duplicate', 'duplicate']
+    assert MealServing.objects.count() == 2
+    product_beef.refresh_from_db()
+    assert product_beef.total_weight == 200
@@ -0,0 +1,81 @@
+import pytest
+from rest_framework.test import APIClient
+from inventory.models import Product
+from inventory.stock import deduct_stock, required_amount, InsufficientStock
+from meals.models import MealAvailability
+
+
+def test_required_amount_rounds_up_whole_units():
+    assert required_amount(200, 3) == 600
+    assert required_amount(1.1, 10) == 11
+    assert required_amount(0.5, 3) == 2
+
+
+@pytest.mark.django_db
+def test_deduct_stock_is_all_or_nothing(product_beef, product_salt):
+    with pytest.raises(InsufficientStock) as exc:
+        deduct_stock({product_beef.id: 100, product_salt.id: 50})
+    assert exc.value.shortages[0]['product'] == "Salt"
+    product_beef.refresh_from_db()
+    assert product_beef.total_weight == 1000
+
+    deduct_stock({product_beef.id: 100, product_salt.id: 10})
+    product_beef.refresh_from_db()
+    product_salt.refresh_from_db()
+    assert (product_beef.total_weight, product_salt.total_weight) == (900, 0)
+
+
+@pytest.mark.django_db
+def test_deduct_stock_refreshes_meal_availability(meal_plov, meal_ingredient_beef, meal_ingredient_potato,
+                                                  product_beef):
+    deduct_stock({product_beef.id: 600})
+    assert MealAvailability.objects.get(meal=meal_plov).max_portions == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_deductions_lose_no_updates(product_beef, product_potato, run_concurrently):
+    product_beef.total_weight = 10000
+    product_beef.save()
+
+    def serve(i):
+        for _ in range(5):
+            deduct_stock({product_beef.id: 7, product_potato.id: 3})
+
+    errors = run_concurrently(serve, 8)
+    assert errors == []
+    product_beef.refresh_from_db()
+    product_potato.refresh_from_db()
+    assert product_beef.total_weight == 10000 - 8 * 5 * 7
+    assert product_potato.total_weight == 500 - 8 * 5 * 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_deductions_never_overdraw(product_beef, run_concurrently):
+    # 1000g of beef covers exactly 10 of the 20 competing deductions
+    errors = run_concurrently(lambda i: deduct_stock({product_beef.id: 100}), 20)
+    assert len(errors) == 10
+    assert all(isinstance(e, InsufficientStock) for e in errors)
+    product_beef.refresh_from_db()
+    assert product_beef.total_weight == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_meal_servings_through_api(cook_user, meal_plov, meal_ingredient_beef, meal_ingredient_potato,
+                                              product_beef, product_potato, run_concurrently):
+    Product.objects.filter(id__in=[product_beef.id, product_potato.id]).update(total_weight=100000)
+    # Both apps register a 'mealserving' route, so address the meals one directly
+    url = '/meals/meal-servings/'
+
+    def serve(i):
+        client = APIClient()
+        client.force_authenticate(cook_user)
+        for _ in range(3):
+            resp = client.post(url, {"meal": meal_plov.id, "portions_served": 1})
+            assert resp.status_code == 201, resp.data
+
+    errors = run_concurrently(serve, 6)
+    assert errors == []
+    product_beef.refresh_from_db()
+    product_potato.refresh_from_db()
+    assert product_beef.total_weight == 100000 - 18 * 200
+    assert product_potato.total_weight == 100000 - 18 * 100
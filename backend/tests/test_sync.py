@@ -0,0 +1,61 @@
+import pytest
+from django.urls import reverse
+from datetime import timedelta
+from django.utils import timezone
+from inventory.models import Product, Unit, ProductCategory
+from meals.models import Meal, MealIngredient
+from inventory.stock import deduct_stock
+from sync.models import Tombstone
+from sync.views import CURSOR_OVERLAP
+
+
+@pytest.mark.django_db
+def test_full_sync_returns_whole_catalog(api_client, cook_user, meal_plov, meal_ingredient_beef, product_potato):
+    api_client.force_authenticate(cook_user)
+    resp = api_client.get(reverse('sync-changes'))
+    print("FULL SYNC:", resp.status_code, resp.data)
+    assert resp.status_code == 200
+    assert resp.data['full'] is True
+    assert {p['name'] for p in resp.data['products']} == {"Beef", "Potato"}
+    assert resp.data['meal_ingredients'][0]['product_id'] == meal_ingredient_beef.product_id
+    assert len(resp.data['units']) == 1 and len(resp.data['product_categories']) == 1
+
+
+@pytest.mark.django_db
+def test_delta_sync_returns_only_changes_and_tombstones(api_client, cook_user, meal_plov, meal_ingredient_beef,
+                                                        meal_ingredient_potato, product_beef, product_potato):
+    api_client.force_authenticate(cook_user)
+    # Pretend the catalog was last synced well before the overlap window
+    old = timezone.now() - timedelta(hours=1)
+    for model in (Product, Meal, MealIngredient, Unit, ProductCategory):
+        model.objects.update(updated_at=old)
+    cursor = (timezone.now() - CURSOR_OVERLAP - timedelta(minutes=1)).isoformat()
+
+    deduct_stock({product_beef.id: 100})
+    deleted_id = meal_ingredient_potato.id
+    meal_ingredient_potato.delete()
+
+    resp = api_client.get(reverse('sync-changes'), {"since": cursor})
+    print("DELTA SYNC:", resp.status_code, resp.data)
+    assert resp.status_code == 200
+    assert resp.data['full'] is False
+    assert [p['id'] for p in resp.data['products']] == [product_beef.id]
+    assert resp.data['products'][0]['total_weight'] == 900
+    assert resp.data['meals'] == [] and resp.data['units'] == []
+    assert resp.data['deleted']['meal_ingredients'] == [deleted_id]
+
+
+@pytest.mark.django_db
+def test_sync_rejects_bad_cursor(api_client, cook_user):
+    api_client.force_authenticate(cook_user)
+    for since in ("yesterday", "2026-02-30T00:00:00"):
+        assert api_client.get(reverse('sync-changes'), {"since": since}).status_code == 400
+    # Naive cursors are read in local time
+    assert api_client.get(reverse('sync-changes'), {"since": "2026-02-01T00:00:00"}).status_code == 200
+
+
+@pytest.mark.django_db
+def test_deleting_meal_records_tombstones(meal_plov, meal_ingredient_beef):
+    expected = {('meal', meal_plov.id), ('meal_ingredient', meal_ingredient_beef.id)}
+    meal_plov.delete()
+    assert set(Tombstone.objects.values_list('model', 'object_id')) == expected
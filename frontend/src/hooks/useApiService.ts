@@ -212,7 +212,17 @@ export const useApiService = () => {
     }),
 
     // Products
-    getProducts: () => fetchWithAuth('/inventory/products/'),
+    // One page of the catalog, { count, next, previous, results }; the backend allows at most 500 per page
+    getProducts: (params: { page?: number; page_size?: number; search?: string } = {}) => {
+      const query = new URLSearchParams();
+      Object.entries(params).forEach(([key, value]) => {
+        if (value !== undefined && value !== '') query.set(key, String(value));
+      });
+      return fetchWithAuth(`/inventory/products/?${query}`);
+    },
+    // Every product as { id, name, unit_abbreviation }, for dropdowns
+    getProductLookup: () => fetchWithAuth('/inventory/products/lookup/'),
+    getProductWarnings: () => fetchWithAuth('/inventory/products/warnings/'),
     getProduct: (id: number) => fetchWithAuth(`/inventory/products/${id}/`),
     addProduct: (data: any) => fetchWithAuth('/inventory/products/', {
       method: 'POST',
@@ -302,10 +312,21 @@ export const useApiService = () => {
 
     // Reports
     getMonthlyReports: () => fetchWithAuth('/reports/monthly-reports/'),
+    // Report jobs run in the background: poll getReportJob or subscribe to the "reports" topic
+    createReportJob: (data: { start_month: string; end_month: string }) => fetchWithAuth('/reports/report-jobs/', {
+      method: 'POST',
+      body: JSON.stringify(data)
+    }),
+    getReportJob: (id: number) => fetchWithAuth(`/reports/report-jobs/${id}/`),
 
     // Ingredients Usage for Reports
     getIngredientUsage: () => fetchWithAuth('/reports/ingredients-usage/'),
 
+    // Usage analytics for charts: { buckets: [...dates], series: [{ id, name, values: [...] }] }
+    getUsageAnalytics: (params: { measure?: 'usage' | 'servings'; bucket?: 'day' | 'week' | 'month';
+                                  by?: 'product' | 'meal' | 'category'; start_date?: string; end_date?: string }) =>
+      fetchWithAuth(`/reports/analytics/?${new URLSearchParams(params as Record<string, string>)}`),
+
     // Users management
     getCurrentUser: () => fetchWithAuth('/users/profile/'),
     getUsers: () => fetchWithAuth('/users/users/'),
@@ -329,6 +350,7 @@ export const useApiService = () => {
     apiBaseUrl,
     updateApiBaseUrl,
     isAuthenticated: !!authState.token,
+    token: authState.token,
     user: authState.user,
     userRole: authState.role,
     login,
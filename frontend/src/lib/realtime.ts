@@ -0,0 +1,93 @@
+// One shared websocket per tab; pages subscribe to topics instead of opening their own sockets.
+type Handler = (msg: any) => void;
+
+const RECONNECT_DELAY = 2000;
+
+let socket: WebSocket | null = null;
+let socketUrl: string | null = null;
+let reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+const handlers = new Map<string, Set<Handler>>();
+
+function realtimeUrl(apiBaseUrl: string, token: string) {
+  const wsProtocol = apiBaseUrl.startsWith('https') ? 'wss' : 'ws';
+  return `${wsProtocol}://${apiBaseUrl.replace(/^https?:\/\//, '')}/ws/?token=${encodeURIComponent(token)}`;
+}
+
+function sendSubscription(action: 'subscribe' | 'unsubscribe', topic: string) {
+  if (socket && socket.readyState === WebSocket.OPEN) {
+    socket.send(JSON.stringify({ action, topic }));
+  }
+}
+
+function open(url: string) {
+  const ws = new WebSocket(url);
+  socket = ws;
+  socketUrl = url;
+
+  ws.onopen = () => {
+    // (Re)subscribe everything, the server forgets subscriptions with the connection
+    handlers.forEach((_set, topic) => sendSubscription('subscribe', topic));
+  };
+  ws.onmessage = (event) => {
+    try {
+      const msg = JSON.parse(event.data);
+      if (msg.type === 'error') {
+        console.error('Realtime error:', msg.topic, msg.error);
+        return;
+      }
+      handlers.get(msg.topic)?.forEach(handler => handler(msg));
+    } catch (e) {}
+  };
+  ws.onclose = () => {
+    if (socket !== ws) return;
+    socket = null;
+    if (handlers.size > 0) {
+      reconnectTimer = setTimeout(() => {
+        reconnectTimer = null;
+        if (!socket && handlers.size > 0) open(url);
+      }, RECONNECT_DELAY);
+    }
+  };
+}
+
+function close() {
+  if (reconnectTimer) {
+    clearTimeout(reconnectTimer);
+    reconnectTimer = null;
+  }
+  const ws = socket;
+  socket = null;
+  socketUrl = null;
+  ws?.close();
+}
+
+/**
+ * Subscribe `handler` to a topic ('dashboard', 'inventory', 'meals' or 'meal:<id>').
+ * The handler also receives the 'subscribed' reply, whose `sequence` lets the page
+ * check it has not missed anything since its snapshot. Returns an unsubscribe function.
+ */
+export function subscribe(apiBaseUrl: string, token: string, topic: string, handler: Handler) {
+  const url = realtimeUrl(apiBaseUrl, token);
+  if (socketUrl !== url) {
+    // Server or user changed: start over on a new connection
+    close();
+  }
+  const topicHandlers = handlers.get(topic) || new Set<Handler>();
+  const isNewTopic = topicHandlers.size === 0;
+  topicHandlers.add(handler);
+  handlers.set(topic, topicHandlers);
+
+  if (!socket) {
+    open(url);
+  } else if (isNewTopic) {
+    sendSubscription('subscribe', topic);
+  }
+
+  return () => {
+    topicHandlers.delete(handler);
+    if (topicHandlers.size > 0 || handlers.get(topic) !== topicHandlers) return;
+    handlers.delete(topic);
+    sendSubscription('unsubscribe', topic);
+    if (handlers.size === 0) close();
+  };
+}
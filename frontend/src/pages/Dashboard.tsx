@@ -8,6 +8,7 @@ import {
   Activity
 } from "lucide-react";
 import { useApiService } from '@/hooks/useApiService';
+import { subscribe } from '@/lib/realtime';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
 
 // Utility to format date/time ago
@@ -21,17 +22,70 @@ function timeAgo(dateString: string) {
   return `${Math.floor(diff / 86400)} days ago`;
 }
 
+const RECENT_ACTIVITY_LIMIT = 5;
+
+// Apply one websocket delta (see backend realtime.sequences) to the dashboard snapshot
+function applyDashboardDelta(data: any, delta: any) {
+  switch (delta.kind) {
+    case 'stock': {
+      const changed = new Set([...delta.products.map((p: any) => p.id), ...delta.deleted]);
+      const stillLow = (data.low_stock_ingredients || []).filter((item: any) => !changed.has(item.id));
+      const nowLow = delta.products
+        .filter((p: any) => p.is_active && p.below_threshold)
+        .map((p: any) => ({
+          id: p.id, name: p.name, total_weight: p.total_weight, threshold: p.threshold, unit: p.unit
+        }));
+      return {
+        ...data,
+        ingredient_count: delta.ingredient_count,
+        low_stock_count: delta.low_stock_count,
+        low_stock_ingredients: [...stillLow, ...nowLow].sort((a: any, b: any) => a.id - b.id),
+      };
+    }
+    case 'availability': {
+      const changed = new Map(delta.meals.map((m: any) => [m.meal_id, m]));
+      const removed = new Set(delta.deleted);
+      const portions = (data.available_portions || [])
+        .filter((item: any) => !removed.has(item.meal_id))
+        .map((item: any) => {
+          const meal: any = changed.get(item.meal_id);
+          changed.delete(item.meal_id);
+          return meal ? { ...item, meal: meal.meal, portions: meal.portions, bottleneck: meal.bottleneck, is_active: meal.is_active } : item;
+        });
+      changed.forEach((meal: any) => portions.push({
+        meal_id: meal.meal_id, meal: meal.meal, portions: meal.portions, bottleneck: meal.bottleneck, is_active: meal.is_active
+      }));
+      return {
+        ...data,
+        active_meals: delta.active_meals,
+        available_portions: portions.filter((item: any) => item.is_active !== false),
+      };
+    }
+    case 'activity': {
+      const changed = new Set([...delta.servings.map((s: any) => s.id), ...delta.deleted]);
+      const recent = [...delta.servings, ...(data.recent_activities || []).filter((item: any) => !changed.has(item.id))]
+        .sort((a: any, b: any) => new Date(b.served_at).getTime() - new Date(a.served_at).getTime())
+        .slice(0, RECENT_ACTIVITY_LIMIT);
+      return { ...data, meals_served_today: delta.meals_served_today, recent_activities: recent };
+    }
+    default:
+      return data;
+  }
+}
+
 const Dashboard = () => {
-  const { api, apiBaseUrl } = useApiService();
+  const { api, apiBaseUrl, token } = useApiService();
 
   // Unified dashboard state
   const [dashboardData, setDashboardData] = useState<any>(null);
-  const wsRef = useRef<WebSocket | null>(null);
+  // Sequence of the last delta applied; null until the first snapshot is loaded
+  const sequenceRef = useRef<number | null>(null);
 
-  // Fetch dashboard data from backend
+  // Fetch the full dashboard snapshot; only needed on load and after a missed delta
   const fetchDashboard = async () => {
     try {
       const data = await api.getDashboardSummary();
+      sequenceRef.current = data.sequence ?? 0;
       setDashboardData(data);
     } catch (e) {
       console.error('Error loading dashboard:', e);
@@ -41,33 +95,28 @@ const Dashboard = () => {
   useEffect(() => {
     fetchDashboard();
 
-    // Setup WebSocket for dashboard updates (secure if needed)
-    const wsProtocol = apiBaseUrl.startsWith('https') ? 'wss' : 'ws';
-    const wsUrl = `${wsProtocol}://${apiBaseUrl.replace(/^https?:\/\//, '')}/ws/dashboard/`;
-    const ws = new WebSocket(wsUrl);
-    wsRef.current = ws;
-
-    ws.onopen = () => {
-      // console.log('Dashboard WebSocket connected');
-    };
-    ws.onmessage = (event) => {
-      const msg = JSON.parse(event.data);
-      if (msg.type === 'dashboard_update') {
+    if (!token) return;
+    // Dashboard deltas arrive on the shared realtime socket
+    return subscribe(apiBaseUrl, token, 'dashboard', (msg) => {
+      if (sequenceRef.current === null) return;
+      if (msg.type === 'subscribed') {
+        // Deltas sent before the subscription went through are lost
+        if (msg.sequence !== sequenceRef.current) fetchDashboard();
+        return;
+      }
+      if (msg.type !== 'dashboard_delta') return;
+      // Already contained in the snapshot
+      if (msg.sequence <= sequenceRef.current) return;
+      if (msg.sequence !== sequenceRef.current + 1 || msg.kind === 'resync') {
+        // Missed a delta: fall back to a fresh snapshot
         fetchDashboard();
+        return;
       }
-    };
-    ws.onerror = (err) => {
-      console.error('WebSocket error:', err);
-    };
-    ws.onclose = () => {
-      // Optionally: try to reconnect after some time
-    };
-
-    return () => {
-      ws.close();
-    };
+      sequenceRef.current = msg.sequence;
+      setDashboardData((current: any) => current && applyDashboardDelta(current, msg));
+    });
     // eslint-disable-next-line
-  }, [apiBaseUrl]);
+  }, [apiBaseUrl, token]);
 
   // Loading state
   if (!dashboardData) return <div>Loading...</div>;
@@ -194,8 +243,8 @@ const Dashboard = () => {
         </CardHeader>
         <CardContent>
           <div className="space-y-4">
-            {recentActivities.map((item: any, idx: number) => (
-              <div className="flex items-center gap-4" key={idx}>
+            {recentActivities.map((item: any) => (
+              <div className="flex items-center gap-4" key={item.id}>
                 <div className="bg-primary/10 p-2 rounded-full">
                   <UtensilsCrossed className="h-4 w-4 text-primary" />
                 </div>
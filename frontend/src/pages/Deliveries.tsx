@@ -28,7 +28,7 @@ import {
   SelectValue,
 } from "@/components/ui";
 import { PlusCircle, PackageOpen } from "lucide-react";
-import { DeliveryLog, Product, Supplier, User } from '@/types';
+import { DeliveryLog, ProductOption, Supplier, User } from '@/types';
 import { useApiService } from "@/hooks/useApiService";
 import { format } from 'date-fns';
 import { toast } from "@/components/ui/sonner";
@@ -42,7 +42,7 @@ function extractArray<T>(data: any): T[] {
 const Deliveries = () => {
   const { api } = useApiService();
   const [deliveryLogs, setDeliveryLogs] = useState<DeliveryLog[]>([]);
-  const [products, setProducts] = useState<Product[]>([]);
+  const [products, setProducts] = useState<ProductOption[]>([]);
   const [suppliers, setSuppliers] = useState<Supplier[]>([]);
   const [currentUser, setCurrentUser] = useState<User | null>(null);
   const [isAddDialogOpen, setIsAddDialogOpen] = useState(false);
@@ -61,11 +61,11 @@ const Deliveries = () => {
       try {
         const [logsData, productsData, suppliersData, userData] = await Promise.all([
           api.getDeliveryLogs(),
-          api.getProducts(),
+          api.getProductLookup(),
           api.getSuppliers(),
           api.getCurrentUser()
         ]);
-        setProducts(extractArray<Product>(productsData.products || productsData));
+        setProducts(extractArray<ProductOption>(productsData));
         setSuppliers(extractArray<Supplier>(suppliersData));
         setDeliveryLogs(extractArray<DeliveryLog>(logsData));
         setCurrentUser(userData);
@@ -104,10 +104,10 @@ const Deliveries = () => {
       // Refresh data
       const [logsData, productsData, suppliersData] = await Promise.all([
         api.getDeliveryLogs(),
-        api.getProducts(),
+        api.getProductLookup(),
         api.getSuppliers()
       ]);
-      setProducts(extractArray<Product>(productsData.products || productsData));
+      setProducts(extractArray<ProductOption>(productsData));
       setSuppliers(extractArray<Supplier>(suppliersData));
       setDeliveryLogs(extractArray<DeliveryLog>(logsData));
 
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useRef } from 'react';
+import React, { useState, useEffect, useRef, useCallback } from 'react';
 import {
   Table,
   TableBody,
@@ -31,18 +31,37 @@ import { PlusCircle, Search, AlertTriangle } from "lucide-react";
 import { Product, Unit } from '@/types';
 import { toast } from "@/components/ui/sonner";
 import { useApiService } from '@/hooks/useApiService';
+import { subscribe } from '@/lib/realtime';
 
 const getProductsList = (productsData: any): Product[] => {
   if (Array.isArray(productsData)) return productsData;
-  if (productsData && Array.isArray(productsData.products)) return productsData.products;
+  if (productsData && Array.isArray(productsData.results)) return productsData.results;
   return [];
 };
 
+// Ingredients shown per page; the list is paginated and searched by the backend
+const PAGE_SIZE = 50;
+
 const Ingredients = () => {
   const { apiBaseUrl, user, api } = useApiService();
   const [products, setProducts] = useState<Product[]>([]);
+  // Latest list for the realtime handler, whose closure outlives renders
+  const productsRef = useRef<Product[]>(products);
+  productsRef.current = products;
   const [units, setUnits] = useState<Unit[]>([]);
   const [searchTerm, setSearchTerm] = useState('');
+  // searchTerm as sent to the backend, once typing pauses
+  const [search, setSearch] = useState('');
+  const [page, setPage] = useState(1);
+  const [count, setCount] = useState(0);
+  const pageCount = Math.max(1, Math.ceil(count / PAGE_SIZE));
+  // Page on display, for the realtime handler and to drop responses for a page no longer shown
+  const queryRef = useRef({ page, search, last: true });
+  queryRef.current = { ...queryRef.current, page, search };
+  // Sequence of the last inventory delta applied; null until the first page is loaded
+  const sequenceRef = useRef<number | null>(null);
+  // Topic sequence from the last 'subscribed' reply, which may arrive before the page
+  const subscribedRef = useRef<number | null>(null);
   const [isAddDialogOpen, setIsAddDialogOpen] = useState(false);
 
   // Edit dialog state
@@ -63,9 +82,6 @@ const Ingredients = () => {
     threshold: 0,
   });
 
-  // WebSocket ref to avoid multiple connections
-  const wsRef = useRef<WebSocket | null>(null);
-
   // Get token from user or localStorage
   const token = (() => {
     if (user && (user as any).token) return (user as any).token;
@@ -79,49 +95,95 @@ const Ingredients = () => {
     return null;
   })();
 
-  useEffect(() => {
-    const loadData = async () => {
-      try {
-        const [productsData, unitsData] = await Promise.all([
-          api.getProducts(),
-          api.getUnits()
-        ]);
-        setProducts(getProductsList(productsData));
-        setUnits(Array.isArray(unitsData) ? unitsData : []);
-      } catch (error) {
-        console.error('Error loading data:', error);
-        toast.error('Failed to load ingredients data');
-        setProducts([]);
-        setUnits([]);
+  const loadProducts = useCallback(async () => {
+    const { page, search } = queryRef.current;
+    let data;
+    try {
+      data = await api.getProducts({ page, page_size: PAGE_SIZE, search });
+    } catch (error) {
+      // A page past the end (e.g. after deletions) is a 404; start again from the first
+      if (page > 1) {
+        setPage(1);
+        return;
       }
-    };
-    loadData();
+      throw error;
+    }
+    if (queryRef.current.page !== page || queryRef.current.search !== search) return;
+    queryRef.current.last = !data?.next;
+    // The inventory sequence read before the page (see backend realtime.sequences)
+    sequenceRef.current = data?.sequence ?? 0;
+    setProducts(getProductsList(data));
+    setCount(data?.count ?? 0);
+    // Read before the subscription went through, with changes sent in between that are not replayed
+    if (subscribedRef.current !== null && subscribedRef.current > sequenceRef.current) await loadProducts();
+  }, [api]);
+
+  // Search from the first page once typing pauses
+  useEffect(() => {
+    const timer = setTimeout(() => {
+      setSearch(searchTerm.trim());
+      setPage(1);
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
 
-    // Setup inventory websocket for real-time updates
-    const wsProtocol = apiBaseUrl.startsWith('https') ? 'wss' : 'ws';
-    let wsUrl = `${wsProtocol}://${apiBaseUrl.replace(/^https?:\/\//, '')}/ws/inventory/`;
-    if (token) wsUrl += `?token=${encodeURIComponent(token)}`;
+  useEffect(() => {
+    loadProducts().catch(error => {
+      console.error('Error loading ingredients:', error);
+      toast.error('Failed to load ingredients data');
+      setProducts([]);
+    });
+  }, [page, search, loadProducts]);
 
-    const ws = new WebSocket(wsUrl);
-    wsRef.current = ws;
+  useEffect(() => {
+    api.getUnits()
+      .then(unitsData => setUnits(Array.isArray(unitsData) ? unitsData : []))
+      .catch(error => {
+        console.error('Error loading units:', error);
+        toast.error('Failed to load ingredients data');
+        setUnits([]);
+      });
 
-    ws.onmessage = (event) => {
-      try {
-        const msg = JSON.parse(event.data);
-        if (msg.type === "inventory_update") {
-          api.getProducts().then(data => setProducts(getProductsList(data)));
-        }
-      } catch (e) {}
-    };
-
-    ws.onerror = (err) => {
-      // Optional logging
-    };
-
-    return () => {
-      ws.close();
-    };
-  }, [apiBaseUrl, token]);
+    if (!token) return;
+    // Inventory deltas arrive on the shared realtime socket
+    const reload = () => loadProducts().catch(error => console.error('Error reloading ingredients:', error));
+    subscribedRef.current = null;
+    return subscribe(apiBaseUrl, token, 'inventory', (msg) => {
+      if (msg.type === 'subscribed') {
+        subscribedRef.current = msg.sequence;
+        // Changes made between loading the page and subscribing are not replayed
+        if (sequenceRef.current !== null && msg.sequence > sequenceRef.current) reload();
+        return;
+      }
+      // Until the page loads, which checks the subscription itself
+      if (msg.type !== "inventory_update" || sequenceRef.current === null) return;
+      // Already contained in the page
+      if (msg.sequence <= sequenceRef.current) return;
+      if (msg.sequence !== sequenceRef.current + 1) {
+        // Missed a delta: reload the page instead of patching it
+        reload();
+        return;
+      }
+      sequenceRef.current = msg.sequence;
+      const changed = new Map<number, any>(msg.products.map((p: any) => [p.id, p]));
+      const shown = new Set(productsRef.current.map(product => product.id));
+      const deleted = (msg.deleted as number[]).some(id => shown.has(id));
+      const added = queryRef.current.last && [...changed.keys()].some(id => !shown.has(id));
+      if (deleted || added) {
+        // The page's rows shift, or a product this page has not seen may belong on it (the
+        // list is in id order, so new products land on the last page); deltas lack its unit
+        reload();
+        return;
+      }
+      // Changes to products on other pages are picked up when those pages load
+      setProducts(current => current.map(product => {
+        const update = changed.get(product.id);
+        return update
+          ? { ...product, name: update.name, total_weight: update.total_weight, threshold: update.threshold, is_active: update.is_active }
+          : product;
+      }));
+    });
+  }, [apiBaseUrl, token, loadProducts]);
 
   // --- ADD ---
   const handleInputChange = (e: React.ChangeEvent<HTMLInputElement>) => {
@@ -156,8 +218,7 @@ const Ingredients = () => {
       });
 
       // Optimistic refresh
-      const productsData = await api.getProducts();
-      setProducts(getProductsList(productsData));
+      await loadProducts();
 
       setFormData({ name: '', totalWeight: 0, unitId: 0, threshold: 0 });
       setIsAddDialogOpen(false);
@@ -212,8 +273,7 @@ const Ingredients = () => {
       });
 
       // Refresh products list
-      const productsData = await api.getProducts();
-      setProducts(getProductsList(productsData));
+      await loadProducts();
 
       setIsEditDialogOpen(false);
       setEditProductId(null);
@@ -224,12 +284,6 @@ const Ingredients = () => {
     }
   };
 
-  const filteredProducts = searchTerm
-    ? products.filter(product =>
-        product.name.toLowerCase().includes(searchTerm.toLowerCase())
-      )
-    : products;
-
   return (
     <div className="space-y-6">
       <div className="flex flex-col sm:flex-row justify-between gap-4">
@@ -426,8 +480,8 @@ const Ingredients = () => {
             </TableRow>
           </TableHeader>
           <TableBody>
-            {filteredProducts.length > 0 ? (
-              filteredProducts.map((product) => {
+            {products.length > 0 ? (
+              products.map((product) => {
                 const percentage = product.threshold
                   ? Math.min(100, (product.total_weight / product.threshold) * 100)
                   : 100;
@@ -463,6 +517,19 @@ const Ingredients = () => {
           </TableBody>
         </Table>
       </div>
+
+      <div className="flex items-center justify-between text-sm text-muted-foreground">
+        <span>{count} ingredients</span>
+        <div className="flex items-center gap-2">
+          <Button variant="outline" size="sm" disabled={page <= 1} onClick={() => setPage(page - 1)}>
+            Previous
+          </Button>
+          <span>Page {page} of {pageCount}</span>
+          <Button variant="outline" size="sm" disabled={page >= pageCount} onClick={() => setPage(page + 1)}>
+            Next
+          </Button>
+        </div>
+      </div>
     </div>
   );
 };
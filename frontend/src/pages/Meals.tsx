@@ -22,7 +22,7 @@ import { AlertDialog, AlertDialogAction, AlertDialogCancel, AlertDialogContent,
 import { UtensilsCrossed, PlusCircle, Trash2, AlertTriangle } from 'lucide-react';
 import { useApiService } from '@/hooks/useApiService';
 import { toast } from "@/components/ui/sonner";
-import { Meal, Product } from '@/types';
+import { Meal, ProductOption } from '@/types';
 
 // Helper to extract product categories from paginated or flat backend response
 const getProductCategoriesList = (categoriesData: any): any[] => {
@@ -31,13 +31,6 @@ const getProductCategoriesList = (categoriesData: any): any[] => {
   if (categoriesData && Array.isArray(categoriesData.categories)) return categoriesData.categories;
   return [];
 };
-// Helper to extract products from paginated or flat backend response
-const getProductsList = (productsData: any): Product[] => {
-  if (Array.isArray(productsData)) return productsData;
-  if (productsData && Array.isArray(productsData.products)) return productsData.products;
-  if (productsData && Array.isArray(productsData.results)) return productsData.results;
-  return [];
-};
 // Helper to extract meals from paginated or flat backend response
 const getMealsList = (data: any) => {
   if (Array.isArray(data)) return data;
@@ -50,7 +43,7 @@ const Meals = () => {
   const { apiBaseUrl, api, fetchWithAuth } = useApiService();
   const [meals, setMeals] = useState<Meal[]>([]);
   const [productCategories, setProductCategories] = useState<any[]>([]);
-  const [products, setProducts] = useState<Product[]>([]);
+  const [products, setProducts] = useState<ProductOption[]>([]);
   const [possiblePortions, setPossiblePortions] = useState<{ [mealId: number]: number }>({});
   const [servingMealId, setServingMealId] = useState<number | null>(null);
   const [portionCount, setPortionCount] = useState(1);
@@ -95,12 +88,12 @@ const Meals = () => {
         const [mealsData, categoriesData, productsDataRaw] = await Promise.all([
           api.getMeals(),
           api.getProductCategories(),
-          api.getProducts()
+          api.getProductLookup()
         ]);
         if (!cancelled) {
           setMeals(getMealsList(mealsData));
           setProductCategories(getProductCategoriesList(categoriesData));
-          setProducts(getProductsList(productsDataRaw));
+          setProducts(Array.isArray(productsDataRaw) ? productsDataRaw : []);
           if (Array.isArray(getMealsList(mealsData))) {
             await fetchPossiblePortions(getMealsList(mealsData));
           }
@@ -416,7 +409,7 @@ const Meals = () => {
                           ) : (
                             products.map(product => (
                               <SelectItem key={product.id} value={String(product.id)}>
-                                {product.name} ({product.unit?.abbreviation || ''})
+                                {product.name} ({product.unit_abbreviation})
                               </SelectItem>
                             ))
                           )}
@@ -37,6 +37,13 @@ export interface Product {
   isActive: boolean;
 }
 
+// Entry of the product lookup used by dropdowns
+export interface ProductOption {
+  id: number;
+  name: string;
+  unit_abbreviation: string;
+}
+
 export interface DeliveryLog {
   id: number;
   product: Product;